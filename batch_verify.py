@@ -0,0 +1,260 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+import _thread
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from z3 import Context
+from program_ast import parse_program
+from singleStaticForm import (
+    QUANTIFIER_STRATEGIES, collect_loops, infer_loop_bounds, unroll_statements, build_ssa, iter_ssa,
+)
+from z3_convertor import check_ssa_portfolio, prove_ssa, write_smtlib
+from ssa_optimizer import SSAOptimizer, slice_ssa
+from bmc import run_bmc
+from path_splitting import check_ssa_split
+
+# Each worker process keeps one Z3 context for all the files it checks
+worker_context = None
+
+def init_worker():
+    global worker_context
+    worker_context = Context()
+
+def find_programs(paths, pattern='*.txt'):
+    """Expand files and directories (searched recursively for pattern) into a sorted list of files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.join(dirpath, name) for name in filenames if fnmatch.fnmatch(name, pattern))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def load_bounds(bounds_file):
+    # {"while (x < n)": 5, ...}; loops that are not listed use --bound
+    if not bounds_file:
+        return {}
+    with open(bounds_file) as f:
+        return {header: int(count) for header, count in json.load(f).items()}
+
+class Deadline:
+    """Stops the current file after timeout seconds.
+
+    Z3 is interrupted through its context, and Python stages get a
+    KeyboardInterrupt in the worker's main thread. A lock makes sure nothing
+    is interrupted once the file has finished.
+    """
+    def __init__(self, ctx, timeout):
+        self.ctx = ctx
+        self.lock = threading.Lock()
+        self.done = False
+        self.expired = False
+        self.timer = threading.Timer(timeout, self.expire) if timeout else None
+
+    def expire(self):
+        with self.lock:
+            if self.done:
+                return
+            self.expired = True
+            self.ctx.interrupt()
+            _thread.interrupt_main()
+
+    def __enter__(self):
+        if self.timer:
+            self.timer.start()
+        return self
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.done = True
+        if self.timer:
+            self.timer.cancel()
+        # Swallow our own interrupt; a real Ctrl-C still propagates
+        return self.expired and exc[0] is KeyboardInterrupt
+
+def loop_bounds(program, bound, bounds, infer_bounds=True):
+    """Return (unroll counts of every loop, the inferred exact ones among them).
+
+    Loops listed in bounds use that count, other loops with a constant trip
+    count use that, and the rest use bound.
+    """
+    inferred = infer_loop_bounds(program) if infer_bounds else {}
+    inferred = {header: count for header, count in inferred.items() if header not in bounds}
+    counts = {header: inferred.get(header, bounds.get(header, bound)) for header in collect_loops(program)}
+    return counts, inferred
+
+def verdict_status(found, output):
+    """The status of a check that looked for a counterexample; only 'safe' passes."""
+    if output and output[0].startswith("Error in Z3"):
+        return 'error'
+    if output and output[0].startswith("Unknown result"):
+        return 'unknown'
+    return 'counterexample' if found else 'safe'
+
+def check_program(code_lines, mode, bound, bounds, ctx, rlimit=None, portfolio=False, timeout=None, smt_path=None,
+                  optimize=False, slicing=True, arrays='scalar', quantifiers='expand', infer_bounds=True,
+                  split_jobs=None):
+    record = {}
+    array_theory = arrays == 'theory'
+    if mode == 'bmc':
+        found, reached, output, _ = run_bmc(code_lines, bound, ctx, array_theory, quantifiers, rlimit)
+        status = verdict_status(found, output)
+        record.update(status=status, passed=status == 'safe', bound=reached)
+    else:
+        program = parse_program(code_lines)
+        counts, inferred = loop_bounds(program, bound, bounds, infer_bounds)
+        unrolled = unroll_statements(program, counts, exact_counts=inferred)
+        if smt_path:
+            # Streamed straight from the SSA builder, so the script is never held in memory
+            try:
+                with open(smt_path, 'w') as f:
+                    write_smtlib(iter_ssa(unrolled, array_theory, quantifiers), f, array_theory)
+            except ValueError as e:
+                # The script cannot express everything the solver checks; still verify
+                record['smt_error'] = str(e)
+        ssa = build_ssa(unrolled, array_theory, quantifiers)
+        if optimize:
+            optimizer = SSAOptimizer()
+            ssa = optimizer.optimize(ssa)
+            record['optimization'] = dict(optimizer.counts, ssa_nodes=[optimizer.size_before[0], optimizer.size_after[0]])
+        elif slicing:
+            ssa = slice_ssa(ssa)
+        if mode == 'split':
+            # Partitions are checked in other processes too, unless only one worker is needed
+            found, output = check_ssa_split(ssa, split_jobs, timeout * 1000 if timeout else None, rlimit,
+                                            array_theory, ctx=ctx)
+        elif portfolio:
+            # The portfolio runs in its own processes, so it gets the timeout as a solver limit
+            found, output = check_ssa_portfolio(ssa, timeout=timeout * 1000 if timeout else None, rlimit=rlimit,
+                                                array_theory=array_theory, check=prove_ssa)
+        else:
+            found, output = prove_ssa(ssa, ctx, rlimit=rlimit, array_theory=array_theory)
+        status = verdict_status(found, output)
+        record.update(status=status, passed=status == 'safe', loops=counts)
+        if inferred:
+            record['inferred'] = sorted(inferred)
+    record['output'] = output
+    return record
+
+def read_program(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def verify_file(path, mode='verify', bound=1, bounds=None, timeout=None, rlimit=None, portfolio=False, smt_dir=None,
+                optimize=False, slicing=True, arrays='scalar', quantifiers='expand', infer_bounds=True,
+                split_jobs=None):
+    """Run the pipeline on one file and return a JSON-serializable record."""
+    smt_path = os.path.join(smt_dir, os.path.splitext(os.path.basename(path))[0] + '.smt2') if smt_dir else None
+
+    def work(ctx):
+        return check_program(read_program(path), mode, bound, bounds or {}, ctx, rlimit, portfolio, timeout, smt_path,
+                             optimize, slicing, arrays, quantifiers, infer_bounds, split_jobs)
+
+    return run_with_deadline(work, {'file': path}, timeout)
+
+def run_with_deadline(work, record, timeout=None):
+    """Add the dict work(ctx) returns to record, giving up after timeout seconds.
+
+    ctx is the worker's Z3 context. Errors and timeouts are recorded as a
+    failed check, and the elapsed time is added as 'seconds'.
+    """
+    if worker_context is None:
+        init_worker()
+    start = time.perf_counter()
+    deadline = Deadline(worker_context, timeout)
+    try:
+        with deadline:
+            record.update(work(worker_context))
+    except KeyboardInterrupt:
+        if not deadline.expired:
+            raise
+    except Exception as e:
+        record.update(status='error', passed=False, output=[str(e)])
+    if deadline.expired:
+        record.update(status='timeout', passed=False, output=[f"Timed out after {timeout} seconds."])
+    record['seconds'] = round(time.perf_counter() - start, 6)
+    return record
+
+def run_batch(files, mode='verify', bound=1, bounds=None, timeout=None, jobs=None, out=sys.stdout,
+              rlimit=None, portfolio=False, smt_dir=None, optimize=False, slicing=True, arrays='scalar',
+              quantifiers='expand', infer_bounds=True, split_jobs=None):
+    """Verify files on a process pool, writing one JSON line per file as results arrive in order.
+
+    Returns the number of files that did not pass.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    task = partial(verify_file, mode=mode, bound=bound, bounds=bounds, timeout=timeout, rlimit=rlimit,
+                   portfolio=portfolio, smt_dir=smt_dir, optimize=optimize, slicing=slicing, arrays=arrays,
+                   quantifiers=quantifiers, infer_bounds=infer_bounds, split_jobs=split_jobs)
+    failures = 0
+
+    def emit(record):
+        nonlocal failures
+        failures += not record['passed']
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    if jobs == 1:
+        for path in files:
+            emit(task(path))
+        return failures
+    # Small chunks keep IPC overhead low for many tiny programs while results still stream
+    chunksize = max(1, min(32, len(files) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as pool:
+        for record in pool.map(task, files, chunksize=chunksize):
+            emit(record)
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify programs without the GUI and print JSON-lines results.")
+    parser.add_argument('paths', nargs='+', help="program files or directories")
+    parser.add_argument('--pattern', default='*.txt', help="file pattern used inside directories (default: *.txt)")
+    parser.add_argument('--mode', choices=('verify', 'bmc', 'split'), default='verify')
+    parser.add_argument('--bound', type=int, default=1,
+                        help="unroll count for loops without an entry in --bounds; the maximum k in bmc mode")
+    parser.add_argument('--bounds', help="JSON file mapping loop headers to unroll counts")
+    parser.add_argument('--timeout', type=float, help="seconds allowed per file")
+    parser.add_argument('--rlimit', type=int, help="Z3 resource limit per query")
+    parser.add_argument('--portfolio', action='store_true',
+                        help="race several solver configurations per query (verify mode)")
+    parser.add_argument('--jobs', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--split-jobs', type=int,
+                        help="processes checking the path partitions of each file in split mode "
+                             "(default: number of CPUs)")
+    parser.add_argument('--output', help="write results to this file instead of stdout")
+    parser.add_argument('--optimize', action='store_true',
+                        help="fold constants and drop dead definitions before solving (verify mode)")
+    parser.add_argument('--no-slice', dest='slicing', action='store_false',
+                        help="check every SSA definition instead of the cone of influence of the assertions")
+    parser.add_argument('--arrays', choices=('scalar', 'theory'), default='scalar',
+                        help="encode array elements as scalar variables, or arrays with the SMT array theory")
+    parser.add_argument('--quantifiers', choices=QUANTIFIER_STRATEGIES, default='expand',
+                        help="expand range assertions with a constant bound into a conjunction, "
+                             "or keep every one as a bounded forall")
+    parser.add_argument('--no-infer-bounds', dest='infer_bounds', action='store_false',
+                        help="unroll loops with a constant trip count like any other loop instead of exactly "
+                             "(verify mode)")
+    parser.add_argument('--smt-dir', help="also write the SMT-LIB script of every program here (verify mode)")
+    args = parser.parse_args(argv)
+
+    files = find_programs(args.paths, args.pattern)
+    if args.smt_dir:
+        os.makedirs(args.smt_dir, exist_ok=True)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        failures = run_batch(files, args.mode, args.bound, load_bounds(args.bounds), args.timeout, args.jobs, out,
+                             args.rlimit, args.portfolio, args.smt_dir, args.optimize, args.slicing, args.arrays,
+                             args.quantifiers, args.infer_bounds, args.split_jobs)
+    finally:
+        if args.output:
+            out.close()
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
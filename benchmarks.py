@@ -0,0 +1,445 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import z3
+from singleStaticForm import (
+    QUANTIFIER_STRATEGIES, convert_to_ssa, build_ssa, collect_loops, collect_loops_recursive, infer_loop_bounds,
+    iter_ssa, unroll_loop, unroll_statements,
+)
+from program_ast import parse_program, render_program
+from z3 import Not, Solver, sat
+from z3_convertor import Z3Builder, convert_expr_to_smt, convert_ssa_to_smtlib, check_with_z3, check_ssa_with_z3, write_smtlib
+from pipeline_cache import PipelineCache, run_pipeline
+from bmc import run_bmc
+from live_analysis import LiveAnalyzer
+from ssa_optimizer import optimize_ssa, slice_ssa
+from path_splitting import check_ssa_split
+
+def generate_branching_program(num_vars):
+    # num_vars scalars and array elements, all reassigned inside one branch
+    lines = []
+    for k in range(num_vars):
+        lines.append(f"v{k} := {k};")
+        lines.append(f"arr[j{k}] := v{k};")
+    lines.append("if (v0 < n) {")
+    for k in range(num_vars):
+        lines.append(f"v{k} := v{k} + arr[j{k}] + v{(k + 1) % num_vars};")
+    lines.append("}")
+    lines.append(f"assert(v0 + v{num_vars - 1} > 0);")
+    return lines
+
+def generate_straight_line_program(num_assignments, num_vars=8):
+    # A long unrolled-style branch that keeps reassigning a handful of variables
+    lines = [f"v{k} := {k};" for k in range(num_vars)]
+    lines.append("if (v0 < n) {")
+    for k in range(num_assignments):
+        lines.append(f"v{k % num_vars} := v{(k + 1) % num_vars} + {k};")
+    lines.append("}")
+    lines.append("assert(v0 > 0);")
+    return lines
+
+def generate_counter_loop(bound):
+    lines = ["x := 0;", "s := 0;", "while (x < n) {", "s := s + x;", "x := x + 1;", "}", "assert(s >= 0);"]
+    return lines, {"while (x < n)": bound}
+
+def generate_else_if_chain(arms, num_vars=8):
+    # One long if / else if chain; each arm sets y and one of num_vars other variables
+    lines = [f"v{k} := 0;" for k in range(num_vars)]
+    for arm in range(arms):
+        keyword = "if" if arm == 0 else "} else if"
+        lines.append(f"{keyword} (x == {arm}) {{")
+        lines.append(f"y := {arm};")
+        lines.append(f"v{arm % num_vars} := y + {arm};")
+    lines.extend(["} else {", "y := x;", "}", "assert(y >= 0 || v0 >= 0);"])
+    return lines
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_ssa_renaming(sizes=(100, 200, 400, 800, 1600)):
+    print("=== SSA RENAMING ===")
+    print(f"{'variables':>10} {'seconds':>10} {'us/variable':>12}")
+    for size in sizes:
+        elapsed = time_call(convert_to_ssa, generate_branching_program(size))
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>12.1f}")
+
+def benchmark_version_table(sizes=(10000, 20000, 40000, 80000)):
+    print("=== SSA VERSION TRACKING ===")
+    print(f"{'assignments':>12} {'seconds':>10} {'us/assign':>10} {'peak KiB':>10} {'B/assign':>10}")
+    for size in sizes:
+        program = generate_straight_line_program(size)
+        elapsed = time_call(convert_to_ssa, program, repeat=1)
+        peak = peak_memory(convert_to_ssa, program)
+        print(f"{size:>12} {elapsed:>10.4f} {elapsed / size * 1e6:>10.1f} {peak / 1024:>10.0f} {peak / size:>10.0f}")
+
+def benchmark_z3_backends(bounds=(50, 100, 200)):
+    print("=== Z3 BACKENDS (SMT-LIB text vs direct expressions) ===")
+    print(f"{'unroll':>8} {'text s':>10} {'direct s':>10}")
+    for bound in bounds:
+        lines, counts = generate_counter_loop(bound)
+        ssa = build_ssa(unroll_statements(parse_program(lines), counts))
+        text = time_call(lambda: check_with_z3(*convert_ssa_to_smtlib(ssa)), repeat=1)
+        direct = time_call(check_ssa_with_z3, ssa, repeat=1)
+        print(f"{bound:>8} {text:>10.4f} {direct:>10.4f}")
+
+def benchmark_unrolling(bounds=(200, 400, 800, 1600)):
+    print("=== LOOP UNROLLING (nested loops) ===")
+    print(f"{'unroll':>8} {'unroll s':>10} {'render s':>10} {'lines':>8}")
+    lines = ["x := 0;", "while (x < n) {", "j := 0;", "while (j < m) {", "s := s + j;", "j := j + 1;", "}",
+             "x := x + 1;", "}", "assert(s >= 0);"]
+    program = parse_program(lines)
+    for bound in bounds:
+        counts = {"while (x < n)": bound, "while (j < m)": 5}
+        unroll = time_call(unroll_statements, program, counts)
+        unrolled = unroll_statements(program, counts)
+        render = time_call(render_program, unrolled)
+        print(f"{bound:>8} {unroll:>10.4f} {render:>10.4f} {len(render_program(unrolled)):>8}")
+
+def bmc_from_scratch(lines, max_bound):
+    # What BMC would cost without reuse: unroll, convert and check every bound anew
+    program = parse_program(lines)
+    for bound in range(1, max_bound + 1):
+        counts = dict.fromkeys(collect_loops(program), bound)
+        constraints, prop = Z3Builder().encode(build_ssa(unroll_statements(program, counts, assume_exit=True)))
+        solver = Solver()
+        solver.add(constraints)
+        if solver.check(Not(prop)) == sat:
+            return bound
+
+def benchmark_bmc(bounds=(25, 50, 100)):
+    print("=== BOUNDED MODEL CHECKING (incremental vs from scratch) ===")
+    print(f"{'max k':>8} {'incr s':>10} {'scratch s':>10}")
+    lines, _ = generate_counter_loop(0)
+    for bound in bounds:
+        incremental = time_call(run_bmc, lines, bound, repeat=1)
+        scratch = time_call(bmc_from_scratch, lines, bound, repeat=1)
+        print(f"{bound:>8} {incremental:>10.4f} {scratch:>10.4f}")
+
+def benchmark_pipeline_cache(bounds=(50, 100, 200)):
+    print("=== PIPELINE CACHE (cold vs warm) ===")
+    print(f"{'unroll':>8} {'cold s':>10} {'warm s':>10}")
+    for bound in bounds:
+        lines, counts = generate_counter_loop(bound)
+        cache = PipelineCache()
+        cold = time_call(run_pipeline, lines, counts, cache, repeat=1)
+        warm = time_call(run_pipeline, lines, counts, cache)
+        print(f"{bound:>8} {cold:>10.4f} {warm:>10.6f}")
+
+def benchmark_else_if_chains(arms=(50, 100, 200, 400)):
+    print("=== ELSE-IF CHAINS (phi trees) ===")
+    print(f"{'arms':>8} {'ssa s':>10} {'smt s':>10} {'smt KiB':>10} {'ite terms':>10} {'z3 s':>10}")
+    for count in arms:
+        program = parse_program(generate_else_if_chain(count))
+        ssa = build_ssa(program)
+        ssa_time = time_call(build_ssa, program)
+        smt_time = time_call(convert_ssa_to_smtlib, ssa)
+        text = convert_ssa_to_smtlib(ssa)[0]
+        z3_time = time_call(check_ssa_with_z3, ssa, repeat=1)
+        print(f"{count:>8} {ssa_time:>10.4f} {smt_time:>10.4f} {len(text) / 1024:>10.0f} {text.count('(ite'):>10} "
+              f"{z3_time:>10.4f}")
+
+def benchmark_ssa_optimizer(bounds=(10, 20, 40)):
+    print("=== SSA OPTIMIZER (concrete loop bounds) ===")
+    print(f"{'unroll':>8} {'nodes':>8} {'optimized':>10} {'opt s':>10} {'z3 s':>10} {'opt z3 s':>10}")
+    for bound in bounds:
+        # A loop with a concrete trip count folds down to the assertion
+        lines = ["x := 0;", "s := 0;", f"while (x < {bound}) {{", "s := s + x;", "x := x + 1;", "}",
+                 f"assert(s == {bound * (bound - 1) // 2});"]
+        ssa = build_ssa(unroll_statements(parse_program(lines), {f"while (x < {bound})": bound}))
+        optimized, _ = optimize_ssa(ssa)
+        optimize = time_call(optimize_ssa, ssa)
+        plain = time_call(check_ssa_with_z3, ssa, repeat=1)
+        folded = time_call(check_ssa_with_z3, optimized, repeat=1)
+        print(f"{bound:>8} {len(ssa):>8} {len(optimized):>10} {optimize:>10.4f} {plain:>10.4f} {folded:>10.4f}")
+
+def benchmark_slicing(bounds=(50, 100, 200)):
+    print("=== CONE-OF-INFLUENCE SLICING ===")
+    print(f"{'unroll':>8} {'nodes':>8} {'sliced':>8} {'z3 s':>10} {'sliced s':>10}")
+    for bound in bounds:
+        # t, u and the array writes are loop scratch values the assertion never reads
+        lines = ["x := 0;", "s := 0;", "t := a;", "u := b;", "while (x < n) {", "t := t + u + x;", "u := u - t;",
+                 "tmp[x] := t + u;", "s := s + x;", "x := x + 1;", "}", "assert(s >= 0);"]
+        ssa = build_ssa(unroll_statements(parse_program(lines), {"while (x < n)": bound}))
+        sliced = slice_ssa(ssa)
+        plain = time_call(check_ssa_with_z3, ssa, repeat=1)
+        cone = time_call(check_ssa_with_z3, sliced, repeat=1)
+        print(f"{bound:>8} {len(ssa):>8} {len(sliced):>8} {plain:>10.4f} {cone:>10.4f}")
+
+def benchmark_array_theory(sizes=(3, 4, 5)):
+    print("=== ARRAY ENCODING (element variables vs array theory) ===")
+    print(f"{'n':>8} {'nodes':>8} {'theory':>8} {'z3 s':>10} {'theory s':>10}")
+    for n in sizes:
+        lines, counts = generate_bubble_sort(n)
+        unrolled = unroll_statements(parse_program(lines), counts)
+        scalar, theory = build_ssa(unrolled), build_ssa(unrolled, array_theory=True)
+        plain = time_call(check_ssa_with_z3, scalar, repeat=1)
+        arrays = time_call(lambda: check_ssa_with_z3(theory, array_theory=True), repeat=1)
+        print(f"{n:>8} {len(scalar):>8} {len(theory):>8} {plain:>10.4f} {arrays:>10.4f}")
+
+def benchmark_range_assertions(bounds=(8, 16, 32)):
+    print("=== RANGE ASSERTIONS (expanded vs bounded forall) ===")
+    print(f"{'n':>8} {'expand s':>10} {'forall s':>10}")
+    for bound in bounds:
+        lines = [f"n := {bound};", "max := arr[0];", "for (i := 1; i < n; i := i + 1) {", "if (arr[i] > max) {",
+                 "max := arr[i];", "}", "}", "assert(for (i in range (n)):arr[i] <= max);"]
+        unrolled = unroll_statements(parse_program(lines), {"for (i := 1; i < n; i := i + 1)": bound})
+        times = [time_call(check_ssa_with_z3, build_ssa(unrolled, quantifiers=strategy), repeat=1)
+                 for strategy in QUANTIFIER_STRATEGIES]
+        print(f"{bound:>8} " + " ".join(f"{seconds:>10.4f}" for seconds in times))
+
+def benchmark_live_edits(sizes=(100, 200, 400)):
+    print("=== LIVE RE-ANALYSIS (edit near the end) ===")
+    print(f"{'blocks':>8} {'full s':>10} {'live s':>10}")
+    for size in sizes:
+        lines = ["s := 0;"]
+        for k in range(size):
+            lines += [f"a{k} := x + {k};", f"if (a{k} > {k}) {{", f"s := s + a{k};", "} else {", "s := s - 1;", "}",
+                      f"assert(a{k} >= {k} - 100);"]
+        lines.append("assert(s != s + 1);")
+        edited = lines[:-1] + ["s := s + 1;"] + lines[-1:]
+        live = LiveAnalyzer()
+        live.update(lines)
+        full = time_call(run_pipeline, edited, {}, repeat=1)
+        # Every call but the first only rolls back and redoes the last two statements
+        incremental = time_call(lambda: (live.update(lines), live.update(edited)), repeat=1) / 2
+        print(f"{size:>8} {full:>10.4f} {incremental:>10.4f}")
+
+def benchmark_bound_inference(bounds=(10, 25, 50)):
+    print("=== LOOP BOUND INFERENCE (4x over-unrolled vs exact trip count) ===")
+    print(f"{'trips':>8} {'nodes':>8} {'exact':>8} {'z3 s':>10} {'exact s':>10}")
+    for bound in bounds:
+        lines = ["s := 0;", f"for (i := 0; i < {bound}; i := i + 1) {{", "if (a[i] > 0) {", "s := s + a[i];", "}", "}",
+                 "assert(s >= 0);"]
+        program = parse_program(lines)
+        guessed = build_ssa(unroll_statements(program, dict.fromkeys(collect_loops(program), 4 * bound)))
+        exact = build_ssa(unroll_statements(program, {}, exact_counts=infer_loop_bounds(program)))
+        plain = time_call(check_ssa_with_z3, guessed, repeat=1)
+        inferred = time_call(check_ssa_with_z3, exact, repeat=1)
+        print(f"{bound:>8} {len(guessed):>8} {len(exact):>8} {plain:>10.4f} {inferred:>10.4f}")
+
+def generate_branch_sequence(branches):
+    # branches independent ifs in a row, so there are 2 ** branches paths to the assertion
+    lines = ["x := a;", "y := b;"]
+    for k in range(branches):
+        lines += [f"if (c{k} > {k}) {{", f"x := x * y + {k};", "} else {", f"y := y * x - {k};", "}"]
+    lines.append("assert(x * x + y * y >= x * y);")
+    return lines
+
+def benchmark_path_splitting(branches=(4, 8, 12), jobs=None):
+    jobs = jobs or max(2, os.cpu_count() or 1)
+    print(f"=== PATH SPLITTING (one proof query vs path partitions on {jobs} workers) ===")
+    print(f"{'branches':>8} {'nodes':>8} {'single s':>10} {'split s':>10}")
+    for count in branches:
+        ssa = slice_ssa(build_ssa(parse_program(generate_branch_sequence(count))))
+        # One job checks the whole verification condition at once, in this process
+        single = time_call(check_ssa_split, ssa, 1, repeat=1)
+        split = time_call(check_ssa_split, ssa, jobs, repeat=1)
+        print(f"{count:>8} {len(ssa):>8} {single:>10.4f} {split:>10.4f}")
+
+def generate_nested_phi(depth):
+    # A φ merge nested depth times, as one SSA right-hand side
+    expr = "x_0"
+    for k in range(depth):
+        expr = f"(φ{k + 1} ? {expr} : -x_{k + 1} + arr[i] * 2)"
+    return expr
+
+def benchmark_expr_conversion(depths=(1000, 2000, 4000, 8000)):
+    print("=== SSA EXPRESSION TO SMT (nested phi ternaries) ===")
+    print(f"{'depth':>8} {'KiB':>8} {'seconds':>10} {'us/char':>10}")
+    for depth in depths:
+        expr = generate_nested_phi(depth)
+        elapsed = time_call(convert_expr_to_smt, expr, {})
+        print(f"{depth:>8} {len(expr) / 1024:>8.0f} {elapsed:>10.4f} {elapsed / len(expr) * 1e6:>10.3f}")
+
+def smt_text_in_memory(unrolled):
+    return convert_ssa_to_smtlib(build_ssa(unrolled))[0]
+
+def smt_text_streamed(unrolled):
+    with open(os.devnull, 'w') as sink:
+        write_smtlib(iter_ssa(unrolled), sink)
+
+def benchmark_smt_streaming(bounds=(500, 1000, 2000)):
+    print("=== SMT-LIB EXPORT (whole text vs streamed) ===")
+    print(f"{'unroll':>8} {'text s':>10} {'stream s':>10} {'text KiB':>10} {'stream KiB':>10}")
+    for bound in bounds:
+        lines, counts = generate_counter_loop(bound)
+        unrolled = unroll_statements(parse_program(lines), counts)
+        text = time_call(smt_text_in_memory, unrolled, repeat=1)
+        stream = time_call(smt_text_streamed, unrolled, repeat=1)
+        text_peak = peak_memory(smt_text_in_memory, unrolled)
+        stream_peak = peak_memory(smt_text_streamed, unrolled)
+        print(f"{bound:>8} {text:>10.4f} {stream:>10.4f} {text_peak / 1024:>10.0f} {stream_peak / 1024:>10.0f}")
+
+# === Stage suite ===
+
+def generate_program(chain_length=2, nesting_depth=1, loop_bound=2, num_arrays=1, num_elements=2):
+    """A program in the tool's language with the given shape, plus unroll counts for its loops.
+
+    It initializes num_elements elements of each of num_arrays arrays,
+    classifies x with an if/else if chain of chain_length arms, and sums the
+    elements inside nesting_depth nested for loops, each unrolled loop_bound times.
+    """
+    lines = []
+    for a in range(num_arrays):
+        for e in range(num_elements):
+            lines.append(f"a{a}[{e}] := {e} + x;")
+    for k in range(chain_length):
+        opener = "if" if k == 0 else "} else if"
+        lines.append(f"{opener} (x < {k * 10}) {{")
+        lines.append(f"y := x + {k};")
+    if chain_length:
+        lines.append("} else {")
+        lines.append("y := x;")
+        lines.append("}")
+    lines.append("s := 0;")
+    counts = {}
+    for d in range(nesting_depth):
+        header = f"for (i{d} := 0; i{d} < n; i{d} := i{d} + 1)"
+        counts[header] = loop_bound
+        lines.append(f"{header} {{")
+    terms = " + ".join(f"a{a}[{e}]" for a in range(num_arrays) for e in range(num_elements)) or "1"
+    lines.append(f"s := s + {terms};")
+    lines.extend("}" for _ in range(nesting_depth))
+    lines.append("assert(s >= 0);")
+    return lines, counts
+
+def generate_bubble_sort(n):
+    lines = ["for (i := 0; i < n; i := i + 1) {",
+             "for (j := 0; j < n - i - 1; j := j + 1) {",
+             "if (arr[j] > arr[j+1]) {",
+             "temp := arr[j];",
+             "arr[j] := arr[j+1];",
+             "arr[j+1] := temp;",
+             "}",
+             "}",
+             "}",
+             "assert(arr[0] <= arr[1]);"]
+    return lines, {"for (i := 0; i < n; i := i + 1)": n, "for (j := 0; j < n - i - 1; j := j + 1)": n}
+
+# Each parameter is swept on its own from the generate_program defaults
+SUITE_SWEEPS = {
+    'chain_length': (1, 4, 16, 64),
+    'nesting_depth': (1, 2, 3),
+    'loop_bound': (2, 8, 32),
+    'num_arrays': (1, 4, 16),
+    'num_elements': (2, 8, 32),
+}
+BUBBLE_SORT_SIZES = (2, 4, 8)
+SUITE_STAGES = ('collect_loops_recursive', 'unroll_loop', 'convert_to_ssa', 'convert_ssa_to_smtlib', 'check_with_z3')
+
+def suite_cases():
+    for parameter, values in SUITE_SWEEPS.items():
+        for value in values:
+            yield f"{parameter}={value}", generate_program(**{parameter: value})
+    for n in BUBBLE_SORT_SIZES:
+        yield f"bubble_sort={n}", generate_bubble_sort(n)
+
+def measure(func, *args, repeat=3):
+    # Best wall time over repeat runs, then one more run under tracemalloc for the peak
+    result = func(*args)
+    seconds = time_call(func, *args, repeat=repeat)
+    return result, {'seconds': round(seconds, 6), 'peak_bytes': peak_memory(func, *args)}
+
+def benchmark_stages(lines, counts, repeat=3):
+    """Time the text-level pipeline one stage at a time."""
+    stages = {}
+    loops, stages['collect_loops_recursive'] = measure(collect_loops_recursive, lines, repeat=repeat)
+    loops = {header: counts.get(header, 1) for header in loops}
+    unrolled, stages['unroll_loop'] = measure(unroll_loop, lines, loops, repeat=repeat)
+    ssa, stages['convert_to_ssa'] = measure(convert_to_ssa, unrolled, repeat=repeat)
+    ssa_lines = ssa.splitlines()
+    smt, stages['convert_ssa_to_smtlib'] = measure(convert_ssa_to_smtlib, ssa_lines, repeat=repeat)
+    verdict, stages['check_with_z3'] = measure(check_with_z3, *smt, repeat=1)
+    sizes = {'source_lines': len(lines), 'unrolled_lines': len(unrolled), 'ssa_lines': len(ssa_lines),
+             'smt_bytes': len(smt[0]), 'result': verdict[1][0]}
+    return {'stages': stages, 'sizes': sizes}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(output_path=None, repeat=3):
+    """Run every suite case and return the results; with output_path they are also written as JSON."""
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'z3': z3.get_version_string(),
+        'cases': {},
+    }
+    print(f"{'case':<20} " + " ".join(f"{stage[:14]:>14}" for stage in SUITE_STAGES))
+    for name, (lines, counts) in suite_cases():
+        case = benchmark_stages(lines, counts, repeat)
+        results['cases'][name] = case
+        print(f"{name:<20} " + " ".join(f"{case['stages'][stage]['seconds']:>14.5f}" for stage in SUITE_STAGES))
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    return results
+
+def compare_results(old_path, new_path, threshold=1.2):
+    """Print per-stage time ratios between two result files, flagging slowdowns above threshold."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    regressions = 0
+    for name, case in new['cases'].items():
+        before = old['cases'].get(name)
+        if before is None:
+            continue
+        for stage, numbers in case['stages'].items():
+            old_seconds = before['stages'][stage]['seconds']
+            ratio = numbers['seconds'] / old_seconds if old_seconds else float('inf')
+            flag = "  <- slower" if ratio > threshold else ""
+            regressions += ratio > threshold
+            print(f"{name:<20} {stage:<24} {old_seconds:>10.5f} {numbers['seconds']:>10.5f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    parser.add_argument('--suite', action='store_true', help="run the stage suite instead of the micro benchmarks")
+    parser.add_argument('--output', help="write suite results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two suite result files")
+    args = parser.parse_args()
+    if args.compare:
+        compare_results(*args.compare)
+    elif args.suite:
+        run_suite(args.output)
+    else:
+        benchmark_ssa_renaming()
+        benchmark_version_table()
+        benchmark_z3_backends()
+        benchmark_unrolling()
+        benchmark_pipeline_cache()
+        benchmark_bmc()
+        benchmark_smt_streaming()
+        benchmark_else_if_chains()
+        benchmark_ssa_optimizer()
+        benchmark_slicing()
+        benchmark_array_theory()
+        benchmark_range_assertions()
+        benchmark_live_edits()
+        benchmark_expr_conversion()
+        benchmark_bound_inference()
+        benchmark_path_splitting()
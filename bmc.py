@@ -0,0 +1,121 @@
+from z3 import And, Not, sat, unsat
+from program_ast import Assume, Loop, parse_program
+from singleStaticForm import SSABuilder, collect_loops, negate, unroll_statements
+from z3_convertor import IncrementalSolver, Z3Builder, format_model
+
+def split_at_first_loop(statements):
+    """Return (before, loop, after) around the first top-level loop, or (statements, None, ())."""
+    for i, stmt in enumerate(statements):
+        if isinstance(stmt, Loop):
+            return tuple(statements[:i]), stmt, tuple(statements[i + 1:])
+    return tuple(statements), None, ()
+
+class BoundedModelChecker:
+    """Looks for a counterexample by raising one unroll bound k for every loop.
+
+    When the first top-level loop has no nested loops and no loop (say one
+    inside an if) comes before it, the statements before it are converted and
+    asserted once, and every iteration is entered as an open branch of the
+    SSA builder that stays in the shared prefix, so going from k to k + 1 only
+    emits and asserts the new iteration. Otherwise the whole program is
+    unrolled to k for every bound. What depends on
+    k (the φ merges closing the iterations, the loop exit assumption and the
+    rest of the program unrolled to k) is checked inside push/pop on the same
+    live solver and rolled back before the next bound. The formula at bound k
+    is the same as for the program unrolled k times. array_theory selects the
+    array encoding, as for SSABuilder and Z3Builder, and quantifiers how range
+    assertions are compiled; rlimit applies to every bound's check.
+    """
+    def __init__(self, program, ctx=None, array_theory=False, quantifiers='expand', rlimit=None):
+        self.program = tuple(program)
+        self.loops = collect_loops(self.program)
+        self.builder = SSABuilder(array_theory, quantifiers)
+        self.z3 = Z3Builder(ctx, array_theory)
+        self.checker = IncrementalSolver(ctx, rlimit=rlimit)
+        self.properties = []  # properties of the shared prefix
+
+    def add_prefix(self, statements=None, branch=None):
+        start = len(self.builder.ssa)
+        if branch is not None:
+            self.builder.open_branch(*branch)
+        else:
+            self.builder.emit(statements)
+        constraints, prop = self.z3.encode(self.builder.ssa[start:])
+        self.checker.add(constraints)
+        if prop is not None:
+            self.properties.append(prop)
+
+    def check_suffix(self, statements, bound):
+        """Close the open iterations, add statements and check; return (status, output lines, SSA nodes)."""
+        builder = self.builder
+        mark = builder.mark()
+        builder.close_branches()
+        builder.emit(statements)
+        ssa = list(builder.ssa)
+        constraints, prop = self.z3.encode(builder.ssa[mark[0]:])
+        builder.rollback(mark)
+        properties = self.properties + ([prop] if prop is not None else [])
+        if not properties:
+            return 'safe', [], ssa
+
+        solver = self.checker.solver
+        solver.push()
+        try:
+            solver.add(constraints)
+            result = solver.check(Not(And(properties)))
+            if result == sat:
+                return 'counterexample', format_model(solver.model(), f"Counterexample at bound {bound}:"), ssa
+            if result == unsat:
+                return 'safe', [], ssa
+            return 'unknown', [f"Unknown result from solver at bound {bound}.",
+                               f"Reason: {solver.reason_unknown()}"], ssa
+        finally:
+            solver.pop()
+
+    def run(self, max_bound, progress=None):
+        """Deepen k from 1 to max_bound; return (found_counterexample, bound, output lines, SSA nodes).
+
+        progress(k) is called before bound k is checked.
+        """
+        before, loop, after = split_at_first_loop(self.program)
+        if not self.loops:
+            status, output, ssa = self.check_suffix(self.program, 0)
+            return self.report(status, output, ssa, 0)
+
+        # Only a loop without inner loops can grow one iteration at a time, and only when no loop
+        # (e.g. one nested in an if) precedes it, since the prefix is asserted once without unrolling
+        deepen_loop = loop is not None and not collect_loops(loop.body) and not collect_loops(before)
+        if deepen_loop:
+            self.add_prefix(before + ((loop.init,) if loop.init is not None else ()))
+            iteration_body = unroll_statements(loop.body, {}) + ((loop.inc,) if loop.inc is not None else ())
+        else:
+            after = self.program
+
+        status, output, ssa, bound = 'safe', [], [], 0
+        for bound in range(1, max_bound + 1):
+            if progress is not None:
+                progress(bound)
+            counts = dict.fromkeys(self.loops, bound)
+            suffix = unroll_statements(after, counts, assume_exit=True)
+            if deepen_loop:
+                self.add_prefix(branch=(loop.cond, iteration_body))
+                suffix = (Assume(negate(loop.cond)),) + suffix
+            status, output, ssa = self.check_suffix(suffix, bound)
+            if status != 'safe':
+                break
+        return self.report(status, output, ssa, bound)
+
+    def report(self, status, output, ssa, bound):
+        if status == 'safe':
+            if bound:
+                output = [f"No counterexample found up to bound {bound}.",
+                          "Assertions hold for every execution that leaves its loops within that bound."]
+            else:
+                output = ["No counterexample found. Assertions hold for every execution."]
+        return status == 'counterexample', bound, output, ssa
+
+def run_bmc(code_lines, max_bound, ctx=None, array_theory=False, quantifiers='expand', rlimit=None):
+    try:
+        return BoundedModelChecker(parse_program(code_lines), ctx, array_theory, quantifiers, rlimit).run(max_bound)
+    except Exception as e:
+        return False, 0, [f"Error in Z3: {str(e)}"], []
@@ -0,0 +1,199 @@
+from z3 import Solver, sat, unsat
+from program_ast import Assert, Assume, Binary, BoolConst, Index, RangeAll, SSADef, Store, Ternary, Unary, Var
+from singleStaticForm import SSABuilder, versioned
+from instrumentation import NO_STATS
+from z3_convertor import COMPOUND_EXPRS, Z3Builder, expr_children
+
+ASSERTIONS_OUTPUT = "<assertions>"
+
+def rename_vars(expr, mapping, memo=None):
+    """Replace every variable that has an entry in mapping by the mapped name.
+
+    Works bottom-up with an explicit stack, and renames each shared subterm
+    once: memo maps id(node) -> (node, renamed node) and may be passed again
+    with the same mapping, as long as the names already renamed keep their
+    entries.
+    """
+    if memo is None:
+        memo = {}
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if id(node) in memo:
+            stack.pop()
+            continue
+        if isinstance(node, COMPOUND_EXPRS):
+            # A quantifier's body is renamed on its own, without its bound variable
+            children = (node.bound,) if isinstance(node, RangeAll) else expr_children(node)
+            pending = [child for child in children if id(child) not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+        stack.pop()
+        memo[id(node)] = (node, renamed_node(node, mapping, memo))
+    return memo[id(expr)][1]
+
+def renamed_node(node, mapping, memo):
+    # node with its children already renamed in memo
+    if isinstance(node, Var):
+        name = mapping.get(node.name)
+        return node if name is None else Var(name)
+    if isinstance(node, Index):
+        return Index(mapping.get(node.array, node.array), memo[id(node.index)][1])
+    if isinstance(node, Unary):
+        return Unary(node.op, memo[id(node.operand)][1])
+    if isinstance(node, Binary):
+        return Binary(node.op, memo[id(node.left)][1], memo[id(node.right)][1])
+    if isinstance(node, Ternary):
+        return Ternary(memo[id(node.cond)][1], memo[id(node.then)][1], memo[id(node.orelse)][1])
+    if isinstance(node, Store):
+        return Store(mapping.get(node.array, node.array), memo[id(node.index)][1], memo[id(node.value)][1])
+    if isinstance(node, RangeAll):
+        inner = {name: new for name, new in mapping.items() if name != node.var}
+        return RangeAll(node.var, memo[id(node.bound)][1], rename_vars(node.body, inner))
+    return node
+
+def conjunction(exprs):
+    result = None
+    for expr in exprs:
+        result = expr if result is None else Binary('&&', result, expr)
+    return result
+
+def final_values(builder):
+    # Program variable -> its last SSA version, for every variable the program assigns
+    versions = builder.versions
+    return {name: versioned(name, versions.current[var_id])
+            for var_id, name in enumerate(versions.names) if versions.current[var_id]}
+
+class Miter:
+    """Two SSA programs joined into one formula that is satisfiable iff some output differs.
+
+    Both programs read the same inputs (variables they never assign). Every
+    definition of the first program is renamed to p1!name. A definition of the
+    second program whose renamed value is identical to one already built is
+    mapped onto it instead of being copied, so identical SSA segments exist
+    once and outputs that end up on the same name are equal without asking
+    the solver. Only the definitions in the cone of the remaining outputs
+    (and of the assumptions) are kept.
+    """
+    def __init__(self, statements1, statements2, outputs=None):
+        builders = []
+        for statements in (statements1, statements2):
+            builder = SSABuilder()
+            builder.emit(statements)
+            builders.append(builder)
+        self.ssa1, self.ssa2 = builders[0].ssa, builders[1].ssa
+
+        definitions = {}  # new name -> SSADef
+        by_value = {}     # renamed value -> new name
+        assumes = []
+        asserts = ([], [])
+        mappings = ({}, {})
+        for index, ssa in enumerate((self.ssa1, self.ssa2)):
+            mapping = mappings[index]
+            for node in ssa:
+                if isinstance(node, SSADef):
+                    value = rename_vars(node.value, mapping)
+                    shared = by_value.get(value)
+                    if shared is not None:
+                        mapping[node.name] = shared
+                        continue
+                    name = f"p{index + 1}!{node.name}"
+                    mapping[node.name] = name
+                    by_value[value] = name
+                    definitions[name] = SSADef(name, value, node.kind)
+                elif isinstance(node, Assume):
+                    assumes.append(Assume(rename_vars(node.expr, mapping)))
+                elif isinstance(node, Assert):
+                    asserts[index].append(rename_vars(node.expr, mapping))
+
+        values1, values2 = final_values(builders[0]), final_values(builders[1])
+        if outputs is None:
+            # Variables only one program assigns (such as temporaries) are not compared
+            outputs = [name for name in values1 if name in values2]
+        self.pairs = []
+        for name in outputs:
+            left = rename_vars(values1.get(name, Var(name)), mappings[0])
+            right = rename_vars(values2.get(name, Var(name)), mappings[1])
+            self.pairs.append((name, left, right))
+        if asserts[0] or asserts[1]:
+            true = BoolConst(True)
+            self.pairs.append((ASSERTIONS_OUTPUT, conjunction(asserts[0]) or true, conjunction(asserts[1]) or true))
+
+        self.identical = [name for name, left, right in self.pairs if left == right]
+        self.compared = [(name, left, right) for name, left, right in self.pairs if left != right]
+        self.ssa = self.cone(definitions, assumes, [expr for _, left, right in self.compared for expr in (left, right)])
+        if self.compared:
+            differs = [Unary('!', Binary('==', left, right)) for _, left, right in self.compared]
+            miter = differs[0]
+            for expr in differs[1:]:
+                miter = Binary('||', miter, expr)
+            self.ssa.append(Assert(miter))
+
+    @staticmethod
+    def cone(definitions, assumes, roots):
+        """The definitions reachable from roots and the assumptions, in definition order, then the assumptions."""
+        needed = set()
+        seen = set()  # ids of compound nodes already walked, so shared subterms are walked once
+        stack = list(roots) + [node.expr for node in assumes]
+        while stack:
+            expr = stack.pop()
+            if isinstance(expr, Var):
+                if expr.name in definitions and expr.name not in needed:
+                    needed.add(expr.name)
+                    stack.append(definitions[expr.name].value)
+            elif isinstance(expr, COMPOUND_EXPRS) and id(expr) not in seen:
+                seen.add(id(expr))
+                stack.extend(expr_children(expr))
+                if isinstance(expr, (Index, Store)):
+                    # With the array theory, the array is an SSA version too
+                    stack.append(Var(expr.array))
+        return [node for name, node in definitions.items() if name in needed] + assumes
+
+def check_equivalence(statements1, statements2, outputs=None, ctx=None, stats=NO_STATS):
+    """Check two loop-free programs for equivalence with a single solver query.
+
+    Returns (equivalent, output lines, miter SSA nodes).
+    """
+    try:
+        with stats.stage('miter'):
+            miter = Miter(statements1, statements2, outputs)
+    except Exception as e:
+        return False, [f"Error in Z3: {str(e)}"], []
+    stats.count('miter definitions', len(miter.ssa))
+    stats.count('identical outputs', len(miter.identical))
+
+    summary = f"{len(miter.identical)} of {len(miter.pairs)} outputs identical after sharing common SSA definitions."
+    if not miter.compared:
+        return True, ["Programs are equivalent.", summary], miter.ssa
+
+    try:
+        builder = Z3Builder(ctx)
+        with stats.stage('z3 encode'):
+            constraints, prop = builder.encode(miter.ssa)
+        stats.count('declared constants', len(builder.constants))
+        solver = Solver(ctx=ctx)
+        with stats.stage('solve'):
+            solver.add(constraints)
+            result = solver.check(prop)
+        if stats.enabled:
+            stats.add_solver_statistics(solver.statistics())
+        if result == unsat:
+            return True, ["Programs are equivalent.", summary], miter.ssa
+        if result != sat:
+            return False, ["Unknown result from solver."], miter.ssa
+
+        model = solver.model()
+        output = ["Programs are NOT equivalent. Counterexample:", "Inputs:"]
+        for decl in sorted(model.decls(), key=lambda d: d.name()):
+            if '!' not in decl.name() and decl.arity() == 0:
+                output.append(f"  {decl.name()} = {model[decl]}")
+        output.append("Outputs (program 1 / program 2):")
+        for name, left, right in miter.compared:
+            left_value = model.eval(builder.expr(left), model_completion=True)
+            right_value = model.eval(builder.expr(right), model_completion=True)
+            marker = "" if str(left_value) == str(right_value) else "   <- differs"
+            output.append(f"  {name} = {left_value} / {right_value}{marker}")
+        return False, output, miter.ssa
+    except Exception as e:
+        return False, [f"Error in Z3: {str(e)}"], miter.ssa
@@ -1,14 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, simpledialog
-from singleStaticForm import collect_loops_recursive, unroll_loop, convert_to_ssa
-from z3_convertor import convert_ssa_to_smtlib, convert_to_z3_and_check
-import re
+from singleStaticForm import QUANTIFIER_STRATEGIES, collect_loops, infer_loop_bounds, unroll_statements, build_ssa
+from z3_convertor import convert_ssa_to_smtlib
+from program_ast import count_program_lines, parse_program, render_program, render_ssa
+from instrumentation import PipelineStats
+from pipeline_cache import PipelineCache, run_pipeline
+from bmc import BoundedModelChecker
+from live_analysis import LiveAnalyzer
+from equivalence import check_equivalence
+from path_splitting import check_ssa_split
+from ssa_optimizer import slice_ssa
+import queue
+import threading
+import time
+from z3 import Context
+
+# Milliseconds without an edit before live mode re-checks the program
+LIVE_DELAY_MS = 300
 
 class FMToolGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("FM GUI TOOL")
         self.root.geometry("1200x800")
+        self.cache = PipelineCache()
 
         # Configure styles with colors
         self.style = ttk.Style()
@@ -51,7 +66,7 @@ class FMToolGUI:
         mode_label.pack(side=tk.LEFT, padx=5)
 
         modes = ttk.Combobox(mode_frame, textvariable=self.mode_var, 
-                            values=["Verify", "Equivalence"], width=15, state="readonly")
+                            values=["Verify", "Equivalence", "BMC", "Split Paths"], width=15, state="readonly")
         modes.pack(side=tk.LEFT, padx=5)
         modes.bind("<<ComboboxSelected>>", self.mode_changed)
 
@@ -74,12 +89,54 @@ class FMToolGUI:
         examples.pack(side=tk.LEFT, padx=5)
         examples.bind("<<ComboboxSelected>>", self.load_example)
 
+        # Simplify the SSA before it is checked (Verify mode)
+        self.optimize_var = tk.BooleanVar(value=False)
+        optimize_check = ttk.Checkbutton(control_frame, text="Optimize SSA", variable=self.optimize_var)
+        optimize_check.pack(side=tk.LEFT, padx=10)
+
+        # Encode arrays with the SMT array theory (store/select) instead of one variable per element
+        self.array_theory_var = tk.BooleanVar(value=False)
+        array_check = ttk.Checkbutton(control_frame, text="Array theory", variable=self.array_theory_var)
+        array_check.pack(side=tk.LEFT, padx=10)
+
+        # How range assertions are compiled: a conjunction per index, or a bounded quantifier
+        quantifier_frame = ttk.Frame(control_frame, style='TFrame')
+        quantifier_frame.pack(side=tk.LEFT, padx=10)
+
+        quantifier_label = ttk.Label(quantifier_frame, text="Range Asserts:", style='Header.TLabel')
+        quantifier_label.pack(side=tk.LEFT, padx=5)
+
+        self.quantifier_var = tk.StringVar(value="expand")
+        quantifiers = ttk.Combobox(quantifier_frame, textvariable=self.quantifier_var,
+                                   values=list(QUANTIFIER_STRATEGIES), width=8, state="readonly")
+        quantifiers.pack(side=tk.LEFT, padx=5)
+
+        # Re-check Program 1 while it is edited (Verify mode)
+        self.live_var = tk.BooleanVar(value=False)
+        live_check = ttk.Checkbutton(control_frame, text="Live", variable=self.live_var, command=self.live_toggled)
+        live_check.pack(side=tk.LEFT, padx=10)
+
         # Run button
         run_frame = ttk.Frame(control_frame, style='TFrame')
         run_frame.pack(side=tk.LEFT, padx=10)
 
         self.run_btn = ttk.Button(run_frame, text="RUN", command=self.run_tool, style='TButton')
         self.run_btn.pack(padx=5)
+
+        # Progress of the background run
+        self.status_var = tk.StringVar(value="Ready")
+        status_label = ttk.Label(run_frame, textvariable=self.status_var, style='TLabel')
+        status_label.pack(padx=5)
+        self.worker = None
+        self.events = queue.Queue()
+        self.polling = False
+        self.cancel_event = threading.Event()
+        self.z3_context = None
+        self.live = None          # LiveAnalyzer, created when live mode is switched on
+        self.live_thread = None
+        self.live_after = None    # Pending debounce timer
+        self.live_pending = False  # Edits arrived while a live check was running
+        self.live_counts = {}     # Unroll counts entered for the last RUN, reused while editing
         # Program input area
         program_frame = ttk.Frame(self.input_frame, style='TFrame')
         program_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -94,6 +151,7 @@ class FMToolGUI:
         self.input1 = scrolledtext.ScrolledText(prog_a_frame, width=50, height=20, 
                                               font=('Courier New', 10), bg='#ffffff', fg='#000000')
         self.input1.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.input1.bind("<<Modified>>", self.input_modified)
         self.input1.insert("1.0", """x := 3;
 if (x < 5) {
     y := x + 1;
@@ -121,13 +179,14 @@ if (x < 5) {
 }
 assert(y > 0);""")
 
-        # Initially hide Program 2 for Verify mode
-        if self.mode_var.get() == "Verify":
+        # Program 2 is only used in Equivalence mode
+        if self.mode_var.get() != "Equivalence":
             self.prog_b_frame.pack_forget()
 
         # === Results Frame ===
         results_notebook = ttk.Notebook(self.results_frame)
         results_notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.results_notebook = results_notebook
 
         # Unrolled Code tab
         unrolled_frame = ttk.Frame(results_notebook, style='TFrame')
@@ -173,8 +232,25 @@ assert(y > 0);""")
                                                    font=('Courier New', 10), bg='#ffffff', fg='#000000')
         self.smt_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        # Performance tab
+        perf_frame = ttk.Frame(results_notebook, style='TFrame')
+        results_notebook.add(perf_frame, text="Performance")
+
+        perf_label = ttk.Label(perf_frame, text="Pipeline Performance:", style='Header.TLabel')
+        perf_label.pack(anchor='w', padx=5, pady=5)
+
+        self.perf_display = scrolledtext.ScrolledText(perf_frame, width=100, height=20, 
+                                                    font=('Courier New', 10), bg='#ffffff', fg='#000000')
+        self.perf_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.stats = PipelineStats()
+
+        # SMT-LIB text is only an export of what Z3 checks, so it is generated when its tab is opened
+        self.smt_frame = smt_frame
+        self.pending_smt = []
+        results_notebook.bind("<<NotebookTabChanged>>", self.show_smt_code)
+
     def mode_changed(self, event=None):
-        if self.mode_var.get() == "Verify":
+        if self.mode_var.get() != "Equivalence":
             self.prog_b_frame.pack_forget()
         else:
             self.prog_b_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
@@ -229,132 +305,349 @@ assert(for (i in range (n)):arr[i] <= max);""")
             self.input2.delete("1.0", tk.END)
             self.input2.insert("1.0", self.input1.get("1.0", tk.END))
 
+    def show_smt_code(self, event=None):
+        if not self.pending_smt or self.results_notebook.select() != str(self.smt_frame):
+            return
+        pending, self.pending_smt = self.pending_smt, []
+        for title, ssa_code, array_theory in pending:
+            if title:
+                self.smt_display.insert(tk.END, f"=== {title} SMT CODE ===\n")
+            try:
+                with self.stats.stage('smt text'):
+                    smt_code, _, _ = convert_ssa_to_smtlib(ssa_code, array_theory)
+                self.stats.count('smt bytes', self.stats.counters.get('smt bytes', 0) + len(smt_code))
+            except Exception as e:
+                smt_code = f"Error generating SMT code: {str(e)}"
+            self.smt_display.insert(tk.END, smt_code + "\n\n")
+        self.show_stats()
+
+    def show_stats(self):
+        self.perf_display.delete("1.0", tk.END)
+        self.perf_display.insert(tk.END, "\n".join(self.stats.format()))
+
+    def ask_unroll_counts(self, loops, inferred=()):
+        # Loops with a constant trip count are unrolled exactly, so only symbolic ones need a count
+        loop_unroll_counts = {}
+        for loop in loops:
+            if loop in inferred:
+                continue
+            while True:
+                try:
+                    count = simpledialog.askinteger("Unroll Loop", f"How many times to unroll:\n{loop}", 
+                                                  parent=self.root, minvalue=0)
+                    if count is not None:
+                        loop_unroll_counts[loop] = count
+                        break
+                    else:
+                        messagebox.showwarning("Warning", "Unroll count is required.")
+                except Exception:
+                    messagebox.showerror("Error", "Invalid number entered.")
+        return loop_unroll_counts
+
     def run_tool(self):
+        # While a run is in progress the button cancels it
+        if self.worker is not None:
+            self.cancel_run()
+            return
         try:
             code1 = [line.strip() for line in self.input1.get("1.0", tk.END).strip().splitlines() if line.strip()]
             code2 = [line.strip() for line in self.input2.get("1.0", tk.END).strip().splitlines() if line.strip()]
 
-            # Clear outputs
-            self.unrolled_display.delete("1.0", tk.END)
-            self.ssa_display.delete("1.0", tk.END)
-            self.result_display.delete("1.0", tk.END)
-            self.smt_display.delete("1.0", tk.END)
-
-            # Switch to Results tab
-            self.notebook.select(1)
-
+            # Dialogs have to run on the Tk thread, so every input is collected before the worker starts
             if self.mode_var.get() == "Verify":
-                # Single program verification
-                loops = collect_loops_recursive(code1)
-                loop_unroll_counts = {}
-                for loop in loops:
-                    while True:
-                        try:
-                            count = simpledialog.askinteger("Unroll Loop", f"How many times to unroll:\n{loop}", 
-                                                          parent=self.root, minvalue=0)
-                            if count is not None:
-                                loop_unroll_counts[loop] = count
-                                break
-                            else:
-                                messagebox.showwarning("Warning", "Unroll count is required.")
-                        except Exception:
-                            messagebox.showerror("Error", "Invalid number entered.")
-
-                unrolled_code = unroll_loop(code1, loop_unroll_counts)
-                self.unrolled_display.insert(tk.END, "=== CODE AFTER LOOP UNROLLING ===\n")
-                self.unrolled_display.insert(tk.END, "\n".join(unrolled_code))
-
-                ssa_code = convert_to_ssa(unrolled_code).strip().split('\n')
-                self.ssa_display.insert(tk.END, "=== SSA FORM ===\n")
-                self.ssa_display.insert(tk.END, "\n".join(ssa_code))
-
-                is_sat, z3_result = convert_to_z3_and_check(ssa_code)
-                self.result_display.insert(tk.END, "=== Z3 ANALYSIS RESULTS ===\n")
-                self.result_display.insert(tk.END, "\n".join(z3_result))
-
-                smt_code, _, _ = convert_ssa_to_smtlib(ssa_code)
-                self.smt_display.insert(tk.END, smt_code)
-
+                program = parse_program(code1)
+                loop_unroll_counts = self.ask_unroll_counts(collect_loops(program), infer_loop_bounds(program))
+                self.live_counts.update(loop_unroll_counts)
+                job = (self.verify_job, code1, program, loop_unroll_counts, self.optimize_var.get(),
+                       self.array_theory_var.get(), self.quantifier_var.get())
+            elif self.mode_var.get() == "BMC":
+                program = parse_program(code1)
+                max_bound = simpledialog.askinteger("Bounded Model Checking", "Maximum unroll bound:",
+                                                    parent=self.root, minvalue=1, initialvalue=10)
+                if max_bound is None:
+                    return
+                job = (self.bmc_job, program, max_bound, self.array_theory_var.get(), self.quantifier_var.get())
+            elif self.mode_var.get() == "Split Paths":
+                program = parse_program(code1)
+                inferred = infer_loop_bounds(program)
+                loop_unroll_counts = self.ask_unroll_counts(collect_loops(program), inferred)
+                job = (self.split_job, program, loop_unroll_counts, inferred, self.array_theory_var.get(),
+                       self.quantifier_var.get())
             else:
-                # Program equivalence checking
                 if not code2 or all(line.startswith('#') for line in code2):
                     messagebox.showerror("Error", "Please enter both programs for equivalence checking.")
                     return
-
-                # Process Program 1
-                loops1 = collect_loops_recursive(code1)
-                loop_unroll_counts1 = {}
-                for loop in loops1:
-                    while True:
-                        try:
-                            count = simpledialog.askinteger("Unroll Loop", f"How many times to unroll:\n{loop}", 
-                                                          parent=self.root, minvalue=0)
-                            if count is not None:
-                                loop_unroll_counts1[loop] = count
-                                break
-                            else:
-                                messagebox.showwarning("Warning", "Unroll count is required.")
-                        except Exception:
-                            messagebox.showerror("Error", "Invalid number entered.")
-
-                unrolled_code1 = unroll_loop(code1, loop_unroll_counts1)
-                self.unrolled_display.insert(tk.END, "=== Program 1 (UNROLLED) ===\n")
-                self.unrolled_display.insert(tk.END, "\n".join(unrolled_code1))
-
-                ssa_code1 = convert_to_ssa(unrolled_code1).strip().split('\n')
-                self.ssa_display.insert(tk.END, "=== Program 1 (SSA FORM) ===\n")
-                self.ssa_display.insert(tk.END, "\n".join(ssa_code1))
-
-                # Process Program 2
-                loops2 = collect_loops_recursive(code2)
-                loop_unroll_counts2 = {}
-                for loop in loops2:
-                    while True:
-                        try:
-                            count = simpledialog.askinteger("Unroll Loop", f"How many times to unroll:\n{loop}", 
-                                                          parent=self.root, minvalue=0)
-                            if count is not None:
-                                loop_unroll_counts2[loop] = count
-                                break
-                            else:
-                                messagebox.showwarning("Warning", "Unroll count is required.")
-                        except Exception:
-                            messagebox.showerror("Error", "Invalid number entered.")
-
-                unrolled_code2 = unroll_loop(code2, loop_unroll_counts2)
-                self.unrolled_display.insert(tk.END, "\n\n=== Program 2 (UNROLLED) ===\n")
-                self.unrolled_display.insert(tk.END, "\n".join(unrolled_code2))
-
-                ssa_code2 = convert_to_ssa(unrolled_code2).strip().split('\n')
-                self.ssa_display.insert(tk.END, "\n\n=== Program 2 (SSA FORM) ===\n")
-                self.ssa_display.insert(tk.END, "\n".join(ssa_code2))
-
-                # Equivalence checking (simplified for demo)
-                is_sat1, z3_result1 = convert_to_z3_and_check(ssa_code1)
-                is_sat2, z3_result2 = convert_to_z3_and_check(ssa_code2)
-
-                self.result_display.insert(tk.END, "=== EQUIVALENCE ANALYSIS ===\n\n")
-                self.result_display.insert(tk.END, "Program 1 Results:\n")
-                self.result_display.insert(tk.END, "\n".join(z3_result1) + "\n\n")
-                self.result_display.insert(tk.END, "Program 2 Results:\n")
-                self.result_display.insert(tk.END, "\n".join(z3_result2) + "\n\n")
-
-                if is_sat1 == is_sat2:
-                    self.result_display.insert(tk.END, "=== SUMMARY ===\nPrograms may be equivalent (same satisfiability).\n")
-                else:
-                    self.result_display.insert(tk.END, "=== SUMMARY ===\nPrograms are NOT equivalent (different satisfiability).\n")
-
-                smt_code1, _, _ = convert_ssa_to_smtlib(ssa_code1)
-                smt_code2, _, _ = convert_ssa_to_smtlib(ssa_code2)
-                self.smt_display.insert(tk.END, "=== Program 1 SMT CODE ===\n")
-                self.smt_display.insert(tk.END, smt_code1 + "\n\n")
-                self.smt_display.insert(tk.END, "=== Program 2 SMT CODE ===\n")
-                self.smt_display.insert(tk.END, smt_code2)
-
+                program1 = parse_program(code1)
+                loop_unroll_counts1 = self.ask_unroll_counts(collect_loops(program1), infer_loop_bounds(program1))
+                program2 = parse_program(code2)
+                loop_unroll_counts2 = self.ask_unroll_counts(collect_loops(program2), infer_loop_bounds(program2))
+                job = (self.equivalence_job, program1, loop_unroll_counts1, program2, loop_unroll_counts2)
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
             import traceback
             traceback.print_exc()
+            return
+
+        # Clear outputs
+        self.unrolled_display.delete("1.0", tk.END)
+        self.ssa_display.delete("1.0", tk.END)
+        self.result_display.delete("1.0", tk.END)
+        self.smt_display.delete("1.0", tk.END)
+        self.perf_display.delete("1.0", tk.END)
+        self.pending_smt = []
+        self.stats = PipelineStats()
+
+        # Switch to Results tab
+        self.notebook.select(1)
+        self.start_worker(*job)
+
+    # === Background runs ===
+    # The worker never touches widgets: it posts callbacks to self.events, and
+    # poll_worker runs them on the Tk thread through root.after.
+
+    def start_worker(self, job, *args):
+        self.cancel_event = threading.Event()
+        self.z3_context = Context()
+        self.run_btn.configure(text="Cancel")
+        self.status_var.set("Running...")
+
+        def work():
+            try:
+                job(*args)
+                self.post(self.show_stats)
+                self.post(self.status_var.set, "Done")
+            except RunCancelled:
+                self.post(self.status_var.set, "Cancelled")
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                self.post(self.status_var.set, "Failed")
+                self.post(messagebox.showerror, "Error", f"An error occurred: {str(e)}")
+            finally:
+                self.post(self.finish_worker)
+
+        self.worker = threading.Thread(target=work, daemon=True)
+        self.worker.start()
+        self.start_polling()
+
+    def post(self, func, *args):
+        self.events.put((func, args))
+
+    def start_polling(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(50, self.poll_worker)
+
+    def poll_worker(self):
+        while True:
+            try:
+                func, args = self.events.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        if self.worker is not None or self.live_thread is not None:
+            self.root.after(50, self.poll_worker)
+        else:
+            self.polling = False
+
+    def finish_worker(self):
+        self.worker = None
+        self.z3_context = None
+        self.run_btn.configure(text="RUN")
+
+    def cancel_run(self):
+        self.cancel_event.set()
+        if self.z3_context is not None:
+            self.z3_context.interrupt()
+        self.status_var.set("Cancelling...")
+
+    def checkpoint(self, status=None):
+        # Called by the worker between stages
+        if self.cancel_event.is_set():
+            raise RunCancelled()
+        if status:
+            self.post(self.status_var.set, status)
+
+    def show_text(self, display, text):
+        display.insert(tk.END, text)
+
+    def verify_job(self, code, program, loop_unroll_counts, optimize=False, array_theory=False, quantifiers='expand'):
+        def on_stage(stage, entry):
+            self.checkpoint()
+            if stage == 'unrolled':
+                text = "=== CODE AFTER LOOP UNROLLING ===\n"
+                if entry['inferred']:
+                    text += "".join(f"# {header} runs exactly {count} times\n" for header, count in entry['inferred'].items())
+                text += "\n".join(render_program(entry['unrolled']))
+                self.post(self.show_text, self.unrolled_display, text)
+                self.checkpoint("Converting to SSA...")
+            elif stage == 'ssa':
+                text = "=== SSA FORM ===\n" + "\n".join(render_ssa(entry['ssa']))
+                self.post(self.show_text, self.ssa_display, text)
+                self.checkpoint("Optimizing SSA..." if optimize else "Solving...")
+            elif stage == 'optimized':
+                text = ("=== SSA FORM ===\n" + "\n".join(render_ssa(entry['ssa'])) + "\n\n" +
+                        "\n".join(entry['optimization']) + "\n\n=== OPTIMIZED SSA FORM ===\n" +
+                        "\n".join(render_ssa(entry['optimized'])))
+                self.post(self.show_text, self.ssa_display, text)
+                self.checkpoint("Solving...")
+            elif stage == 'verdict':
+                _, z3_result = entry['verdict']
+                checked = entry['optimized'] if optimize else entry['sliced']
+                text = "=== Z3 ANALYSIS RESULTS ===\n"
+                if not optimize:
+                    text += f"Checked {len(checked)} of {len(entry['ssa'])} SSA nodes after slicing to the assertions.\n\n"
+                self.post(self.show_text, self.result_display, text + "\n".join(z3_result))
+                self.post(self.show_pending_smt, [(None, checked, array_theory)])
+
+        self.checkpoint("Unrolling loops...")
+        run_pipeline(code, loop_unroll_counts, cache=self.cache, program=program,
+                     ctx=self.z3_context, on_stage=on_stage, stats=self.stats, optimize=optimize,
+                     array_theory=array_theory, quantifiers=quantifiers)
+
+    def bmc_job(self, program, max_bound, array_theory=False, quantifiers='expand'):
+        # Bounded model checking: deepen one bound for every loop instead of asking per loop
+        def progress(bound):
+            self.checkpoint(f"Checking bound {bound} of {max_bound}...")
+
+        with self.stats.stage('bounded model checking'):
+            checker = BoundedModelChecker(program, self.z3_context, array_theory, quantifiers)
+            found, bound, bmc_result, ssa_code = checker.run(max_bound, progress)
+        self.checkpoint()
+        self.stats.count('final bound', bound)
+        self.stats.count('ssa nodes', len(ssa_code))
+
+        unrolled_code = unroll_statements(program, dict.fromkeys(collect_loops(program), bound), assume_exit=True)
+        text = f"=== CODE AFTER LOOP UNROLLING (BOUND {bound}) ===\n" + "\n".join(render_program(unrolled_code))
+        self.post(self.show_text, self.unrolled_display, text)
+        self.post(self.show_text, self.ssa_display, f"=== SSA FORM (BOUND {bound}) ===\n" + "\n".join(render_ssa(ssa_code)))
+        self.post(self.show_text, self.result_display, "=== BOUNDED MODEL CHECKING RESULTS ===\n" + "\n".join(bmc_result))
+        self.post(self.show_pending_smt, [(None, ssa_code, array_theory)])
+
+    def split_job(self, program, loop_unroll_counts, inferred, array_theory=False, quantifiers='expand'):
+        # Path splitting: the partitions of the paths are checked by worker processes in parallel
+        self.checkpoint("Unrolling loops...")
+        with self.stats.stage('unroll'):
+            unrolled_code = unroll_statements(program, loop_unroll_counts, exact_counts=inferred)
+        text = "=== CODE AFTER LOOP UNROLLING ===\n"
+        text += "".join(f"# {header} runs exactly {count} times\n" for header, count in inferred.items())
+        self.post(self.show_text, self.unrolled_display, text + "\n".join(render_program(unrolled_code)))
+
+        self.checkpoint("Converting to SSA...")
+        with self.stats.stage('ssa'):
+            ssa_code = slice_ssa(build_ssa(unrolled_code, array_theory, quantifiers))
+        self.stats.count('ssa nodes', len(ssa_code))
+        self.post(self.show_text, self.ssa_display, "=== SSA FORM ===\n" + "\n".join(render_ssa(ssa_code)))
+
+        self.checkpoint("Solving path partitions...")
+        with self.stats.stage('path splitting'):
+            _, split_result = check_ssa_split(ssa_code, array_theory=array_theory, ctx=self.z3_context,
+                                              stop=self.cancel_event)
+        self.checkpoint()
+        self.post(self.show_text, self.result_display, "=== PATH SPLITTING RESULTS ===\n" + "\n".join(split_result))
+        self.post(self.show_pending_smt, [(None, ssa_code, array_theory)])
+
+    def equivalence_job(self, program1, loop_unroll_counts1, program2, loop_unroll_counts2):
+        self.checkpoint("Unrolling loops...")
+        with self.stats.stage('unroll'):
+            unrolled_code1 = unroll_statements(program1, loop_unroll_counts1, exact_counts=infer_loop_bounds(program1))
+            unrolled_code2 = unroll_statements(program2, loop_unroll_counts2, exact_counts=infer_loop_bounds(program2))
+        self.stats.count('unrolled lines', count_program_lines(unrolled_code1) + count_program_lines(unrolled_code2))
+        text = ("=== Program 1 (UNROLLED) ===\n" + "\n".join(render_program(unrolled_code1)) +
+                "\n\n=== Program 2 (UNROLLED) ===\n" + "\n".join(render_program(unrolled_code2)))
+        self.post(self.show_text, self.unrolled_display, text)
+
+        self.checkpoint("Converting to SSA...")
+        text = ("=== Program 1 (SSA FORM) ===\n" + "\n".join(render_ssa(build_ssa(unrolled_code1))) +
+                "\n\n=== Program 2 (SSA FORM) ===\n" + "\n".join(render_ssa(build_ssa(unrolled_code2))))
+        self.post(self.show_text, self.ssa_display, text)
+
+        # One query over both programs with shared inputs, asking whether any output can differ
+        self.checkpoint("Solving...")
+        equivalent, equivalence_result, miter_ssa = check_equivalence(unrolled_code1, unrolled_code2,
+                                                                      ctx=self.z3_context, stats=self.stats)
+        self.checkpoint()
+        self.post(self.show_text, self.result_display, "=== EQUIVALENCE ANALYSIS ===\n\n" + "\n".join(equivalence_result) + "\n")
+        self.post(self.show_pending_smt, [("Miter", miter_ssa, False)])
+
+    def show_pending_smt(self, pending):
+        self.pending_smt = pending
+        self.show_smt_code()
+
+    # === Live mode ===
+    # Edits are debounced, then a LiveAnalyzer on its own thread re-checks
+    # Program 1, reusing everything before the first changed statement. One
+    # check runs at a time; edits made meanwhile trigger one more check.
+
+    def live_toggled(self):
+        if self.live_var.get():
+            self.schedule_live_update()
+        elif self.live_after is not None:
+            self.root.after_cancel(self.live_after)
+            self.live_after = None
+
+    def input_modified(self, event=None):
+        self.input1.edit_modified(False)
+        if self.live_var.get():
+            self.schedule_live_update()
+
+    def schedule_live_update(self):
+        if self.live_after is not None:
+            self.root.after_cancel(self.live_after)
+        self.live_after = self.root.after(LIVE_DELAY_MS, self.start_live_update)
+
+    def start_live_update(self):
+        self.live_after = None
+        if not self.live_var.get() or self.mode_var.get() != "Verify" or self.worker is not None:
+            return
+        if self.live_thread is not None:
+            self.live_pending = True
+            return
+        code = [line.strip() for line in self.input1.get("1.0", tk.END).strip().splitlines() if line.strip()]
+        array_theory, quantifiers = self.array_theory_var.get(), self.quantifier_var.get()
+        live = self.live
+        if live is None or (live.array_theory, live.quantifiers) != (array_theory, quantifiers):
+            live = self.live = LiveAnalyzer(Context(), array_theory=array_theory, quantifiers=quantifiers)
+        counts = dict(self.live_counts)
+
+        def work():
+            try:
+                start = time.perf_counter()
+                entry = live.update(code, counts)
+                self.post(self.show_live_result, entry, time.perf_counter() - start, live.array_theory)
+            except Exception as e:
+                # Half-typed programs do not parse; keep the last result on screen
+                self.post(self.status_var.set, f"Live: {str(e)}")
+            finally:
+                self.post(self.finish_live_update)
+
+        self.status_var.set("Live: checking...")
+        self.live_thread = threading.Thread(target=work, daemon=True)
+        self.live_thread.start()
+        self.start_polling()
+
+    def finish_live_update(self):
+        self.live_thread = None
+        if self.live_pending:
+            self.live_pending = False
+            self.start_live_update()
+
+    def show_live_result(self, entry, seconds, array_theory):
+        displays = (
+            (self.unrolled_display, "=== CODE AFTER LOOP UNROLLING ===\n" + "\n".join(render_program(entry['unrolled']))),
+            (self.ssa_display, "=== SSA FORM ===\n" + "\n".join(render_ssa(entry['ssa']))),
+            (self.result_display, "=== Z3 ANALYSIS RESULTS ===\n" + "\n".join(entry['verdict'][1])),
+        )
+        for display, text in displays:
+            display.delete("1.0", tk.END)
+            display.insert(tk.END, text)
+        self.smt_display.delete("1.0", tk.END)
+        self.show_pending_smt([(None, entry['ssa'], array_theory)])
+        self.status_var.set(f"Live: reused {entry['reused']} of {len(entry['program'])} statements, "
+                            f"{seconds * 1000:.0f} ms")
+
+class RunCancelled(Exception):
+    pass
 
 if __name__ == '__main__':
     try:
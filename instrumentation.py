@@ -0,0 +1,101 @@
+import time
+
+class PipelineStats:
+    """Wall and CPU time per pipeline stage, size counters and Z3 statistics for one run.
+
+    Pass an instance as stats= to the pipeline functions and read it back
+    with as_dict() or format(). CPU time is measured for the calling thread,
+    so it includes Z3 but not other threads of the process. Repeated stages
+    add up.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}     # stage -> [wall seconds, cpu seconds]
+        self.counters = {}
+        self.solver_statistics = {}
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+    def record(self, name, wall, cpu):
+        totals = self.stages.setdefault(name, [0.0, 0.0])
+        totals[0] += wall
+        totals[1] += cpu
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def add_solver_statistics(self, statistics):
+        for key in statistics.keys():
+            self.solver_statistics[key] = statistics.get_key_value(key)
+
+    def as_dict(self):
+        return {
+            'stages': {name: {'wall': wall, 'cpu': cpu} for name, (wall, cpu) in self.stages.items()},
+            'counters': dict(self.counters),
+            'solver_statistics': dict(self.solver_statistics),
+        }
+
+    def format(self):
+        lines = ["=== PIPELINE PERFORMANCE ===", f"{'stage':<24} {'wall ms':>10} {'cpu ms':>10}"]
+        for name, (wall, cpu) in self.stages.items():
+            lines.append(f"{name:<24} {wall * 1000:>10.2f} {cpu * 1000:>10.2f}")
+        total_wall = sum(wall for wall, _ in self.stages.values())
+        total_cpu = sum(cpu for _, cpu in self.stages.values())
+        lines.append(f"{'total':<24} {total_wall * 1000:>10.2f} {total_cpu * 1000:>10.2f}")
+        if self.counters:
+            lines.append("")
+            lines.append("=== SIZES ===")
+            lines.extend(f"{name:<24} {str(value):>10}" for name, value in self.counters.items())
+        if self.solver_statistics:
+            lines.append("")
+            lines.append("=== Z3 STATISTICS ===")
+            lines.extend(f"{key:<24} {str(value):>10}" for key, value in self.solver_statistics.items())
+        return lines
+
+class StageTimer:
+    __slots__ = ('stats', 'name', 'wall', 'cpu')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+        return False
+
+class NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+class DisabledStats(PipelineStats):
+    """Stand-in used when nothing is being measured; every hook is a no-op."""
+    enabled = False
+
+    def stage(self, name):
+        return NULL_STAGE
+
+    def record(self, name, wall, cpu):
+        pass
+
+    def count(self, name, value):
+        pass
+
+    def add_solver_statistics(self, statistics):
+        pass
+
+# Default for every stats= parameter; callers check stats.enabled before computing counters
+NO_STATS = DisabledStats()
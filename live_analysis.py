@@ -0,0 +1,121 @@
+from z3 import And
+from program_ast import parse_program
+from singleStaticForm import SSABuilder, collect_loops, infer_loop_bounds, unroll_statements
+from z3_convertor import IncrementalSolver, Z3Builder
+from instrumentation import NO_STATS
+
+class LiveBlock:
+    """One top-level statement as it was last analyzed."""
+    __slots__ = ('key', 'unrolled', 'mark', 'z3_mark', 'prop')
+
+    def __init__(self, key, unrolled, mark, z3_mark, prop):
+        self.key = key            # (statement, (header, unroll count, inferred) of its loops)
+        self.unrolled = unrolled
+        self.mark = mark          # SSABuilder mark taken before the statement
+        self.z3_mark = z3_mark    # Z3Builder mark taken before the statement
+        self.prop = prop          # conjunction of its assertions, or None
+
+class LiveAnalyzer:
+    """Re-checks a program after every edit, reusing the work for unchanged top-level statements.
+
+    Every top-level statement is a block with its own SSABuilder mark and
+    solver scope. update() diffs the parsed program against the previous
+    one: the blocks before the first changed statement keep their unrolled
+    code, SSA nodes and asserted constraints, and only the statements from
+    there on are rolled back, converted and asserted again. Unrolled code is
+    also reused for later statements that did not change. The property is
+    checked in a scope of its own, so the solver keeps its learned clauses
+    from one edit to the next. The Z3 terms of rolled back statements and
+    the property literals of earlier checks are dropped again, so a long
+    editing session does not keep growing the analyzer.
+
+    Loops without an entry in loop_unroll_counts are unrolled default_bound
+    times. With infer_bounds, loops with a constant trip count are unrolled
+    exactly, as in run_pipeline; the count is part of a block's key, so an
+    edit that changes it re-analyzes the loop. There is no slicing or optimization; the verdict is the one
+    check_ssa_with_z3 gives for the whole program.
+    """
+    def __init__(self, ctx=None, default_bound=1, array_theory=False, quantifiers='expand', infer_bounds=True):
+        self.ctx = ctx
+        self.default_bound = default_bound
+        self.infer_bounds = infer_bounds
+        self.array_theory = array_theory
+        self.quantifiers = quantifiers
+        self.reset()
+
+    def reset(self):
+        # Rolled back SSA names are never reused, so a full rebuild also frees what they held on to
+        self.builder = SSABuilder(self.array_theory, self.quantifiers)
+        self.z3 = Z3Builder(self.ctx, self.array_theory)
+        self.checker = IncrementalSolver(self.ctx)
+        self.blocks = []
+
+    def update(self, code_lines, loop_unroll_counts=None, stats=NO_STATS):
+        """Analyze the current program text.
+
+        Returns a dict like run_pipeline's entry, with 'program', 'unrolled',
+        'ssa' and 'verdict', plus 'reused', the number of leading blocks that
+        were kept from the previous update.
+        """
+        loop_unroll_counts = loop_unroll_counts or {}
+        with stats.stage('parse'):
+            program = parse_program(code_lines)
+        inferred = infer_loop_bounds(program) if self.infer_bounds else {}
+        keys = []
+        for stmt in program:
+            counts = tuple((header, inferred[header], True) if header in inferred else
+                           (header, loop_unroll_counts.get(header, self.default_bound), False)
+                           for header in collect_loops((stmt,)))
+            keys.append((stmt, counts))
+
+        reused = 0
+        while reused < min(len(keys), len(self.blocks)) and self.blocks[reused].key == keys[reused]:
+            reused += 1
+        stale = self.blocks[reused:]
+        if not reused:
+            self.reset()
+        elif stale:
+            self.builder.rollback(stale[0].mark)
+            self.z3.rollback(stale[0].z3_mark)
+            self.checker.solver.pop(len(stale))
+            del self.blocks[reused:]
+        unrolled_before = {block.key: block.unrolled for block in stale}
+        stats.count('reused blocks', reused)
+        stats.count('changed blocks', len(keys) - reused)
+
+        builder = self.builder
+        for key in keys[reused:]:
+            stmt, counts = key
+            unrolled = unrolled_before.get(key)
+            if unrolled is None:
+                with stats.stage('unroll'):
+                    unrolled = unroll_statements((stmt,), {header: count for header, count, _ in counts},
+                                                 exact_counts={header: count for header, count, exact in counts if exact})
+            mark, z3_mark = builder.mark(), self.z3.mark()
+            self.checker.solver.push()
+            with stats.stage('ssa'):
+                builder.emit(unrolled)
+            with stats.stage('z3 encode'):
+                constraints, prop = self.z3.encode(builder.ssa[mark[0]:])
+            self.checker.add(constraints)
+            self.blocks.append(LiveBlock(key, unrolled, mark, z3_mark, prop))
+
+        properties = [block.prop for block in self.blocks if block.prop is not None]
+        prop = None if not properties else properties[0] if len(properties) == 1 else And(properties)
+        solver = self.checker.solver
+        with stats.stage('solve'):
+            # The property literal is dropped again with this scope
+            literals = len(self.checker.literals)
+            solver.push()
+            try:
+                verdict = self.checker.check(prop)
+            finally:
+                solver.pop()
+                self.checker.forget_literals(literals)
+        return {
+            'program': program,
+            'unrolled': tuple(stmt for block in self.blocks for stmt in block.unrolled),
+            'ssa': list(builder.ssa),
+            'verdict': verdict,
+            'reused': reused,
+        }
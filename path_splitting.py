@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import queue
+from z3 import Not, sat, unsat
+from program_ast import Assert, SSADef
+from z3_convertor import IncrementalSolver, Z3Builder, format_model
+
+# At most 2 ** MAX_SPLIT_VARS partitions, however many workers there are
+MAX_SPLIT_VARS = 8
+# Partitions per worker, so a worker that drew easy paths can take over more of the others
+PARTITIONS_PER_WORKER = 4
+
+def split_conditions(ssa, count):
+    """The first count branch variables φk of ssa, outermost branches first.
+
+    The disjunctions φ merges test (φ3_5) are left out; they follow from
+    the branch variables.
+    """
+    names = []
+    for node in ssa:
+        if len(names) == count:
+            break
+        if isinstance(node, SSADef) and node.kind == 'cond' and '_' not in node.name:
+            names.append(node.name)
+    return names
+
+def describe_cube(split_vars, index):
+    return " && ".join(name if index >> i & 1 else f"!{name}" for i, name in enumerate(split_vars))
+
+def split_worker(ssa, split_vars, tasks, results, timeout, rlimit, array_theory, ctx=None):
+    """Check partitions taken from tasks until it yields None, reporting (index, status, output) for each.
+
+    The program and the negated property are encoded and asserted once;
+    every partition is one check under its cube of branch literals.
+    """
+    try:
+        builder = Z3Builder(ctx, array_theory)
+        constraints, prop = builder.encode(ssa)
+        checker = IncrementalSolver(ctx, timeout, rlimit)
+        checker.add(constraints)
+        checker.add(Not(prop))
+        literals = [builder.constant(name) for name in split_vars]
+    except Exception as e:
+        results.put((None, 'error', [f"Error in Z3: {str(e)}"]))
+        return
+    solver = checker.solver
+    while True:
+        index = tasks.get()
+        if index is None:
+            return
+        cube = [literal if index >> i & 1 else Not(literal) for i, literal in enumerate(literals)]
+        result = solver.check(cube)
+        path = f" on path {describe_cube(split_vars, index)}" if split_vars else ""
+        if result == sat:
+            results.put((index, 'counterexample', format_model(solver.model(), f"Counterexample{path}:")))
+        elif result == unsat:
+            results.put((index, 'safe', []))
+        else:
+            results.put((index, 'unknown', [f"Unknown result from solver{path}.",
+                                            f"Reason: {solver.reason_unknown()}"]))
+
+def check_ssa_split(ssa, jobs=None, timeout=None, rlimit=None, array_theory=False, max_split_vars=MAX_SPLIT_VARS,
+                    ctx=None, stop=None):
+    """Look for a counterexample path by path, on jobs processes at once.
+
+    The executions are partitioned into cubes over the first branch
+    variables (every combination of φk and !φk), so each partition's
+    verification condition only contains the paths through its branches.
+    Workers take partitions from a shared queue, and the first
+    counterexample kills the remaining workers. timeout (milliseconds) and
+    rlimit apply to each partition's check. ctx is only used when a single
+    worker runs in this process; setting the event stop kills the workers
+    and ends the search as undecided.
+
+    Returns (found_counterexample, output lines) like run_bmc; if no
+    partition has a counterexample but one could not be decided, the output
+    starts with its unknown (or error) result.
+    """
+    ssa = list(ssa)
+    if not any(isinstance(node, Assert) for node in ssa):
+        return False, ["No counterexample found. Assertions hold for every execution."]
+    jobs = jobs or os.cpu_count() or 1
+    split_count = min(max_split_vars, (PARTITIONS_PER_WORKER * jobs - 1).bit_length()) if jobs > 1 else 0
+    split_vars = split_conditions(ssa, split_count)
+    partitions = 1 << len(split_vars)
+    workers = min(jobs, partitions)
+
+    if workers == 1:
+        # Nothing to run in parallel; the one worker runs here, on plain queues
+        tasks, results = queue.Queue(), queue.Queue()
+        processes = []
+    else:
+        # spawn, because forking a process that already runs Z3 or GUI threads is unsafe
+        mp = multiprocessing.get_context('spawn')
+        tasks, results = mp.Queue(), mp.Queue()
+    for index in range(partitions):
+        tasks.put(index)
+    for _ in range(workers):
+        tasks.put(None)
+    if workers == 1:
+        split_worker(ssa, split_vars, tasks, results, timeout, rlimit, array_theory, ctx)
+    else:
+        processes = [mp.Process(target=split_worker, daemon=True,
+                                args=(ssa, split_vars, tasks, results, timeout, rlimit, array_theory))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+    summary = [f"Checked {partitions} path partitions on {workers} workers."] if partitions > 1 else []
+    undecided = None
+    pending = partitions
+    try:
+        while pending:
+            try:
+                index, status, output = results.get(timeout=0.1)
+            except queue.Empty:
+                if stop is not None and stop.is_set():
+                    return False, ["Unknown result from solver.", "Reason: canceled"]
+                # A worker that died without answering (e.g. out of memory) must not hang the search
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    undecided = undecided or ["Unknown result from solver.", "Reason: a path worker stopped"]
+                    break
+                continue
+            if status == 'counterexample':
+                return True, output
+            if status == 'error':
+                return False, output
+            pending -= 1
+            if status == 'unknown' and undecided is None:
+                undecided = output
+        if undecided is not None:
+            return False, undecided + summary
+        return False, ["No counterexample found. Assertions hold for every execution."] + summary
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+            process.join()
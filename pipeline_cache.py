@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+from collections import OrderedDict
+from instrumentation import NO_STATS
+from program_ast import SSADef, count_program_lines, parse_program, strip_line_numbers
+from singleStaticForm import collect_loops, infer_loop_bounds, unroll_statements, build_ssa
+from z3_convertor import convert_ssa_to_smtlib, check_ssa_with_z3
+from ssa_optimizer import optimize_ssa, slice_with_stats
+
+# Bump when the layout of cached entries changes so old disk entries are ignored
+CACHE_VERSION = 3
+COMMENT_PATTERN = re.compile(r'#[^\n]*|//[^\n]*')
+SPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_source(code_lines):
+    """Canonical program text: no line numbers, comments, blank lines or repeated spaces."""
+    source = code_lines if isinstance(code_lines, str) else "\n".join(code_lines)
+    source = COMMENT_PATTERN.sub('', strip_line_numbers(source))
+    lines = (SPACE_PATTERN.sub(' ', line).strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line)
+
+def program_key(code_lines, loop_unroll_counts, optimize=False, slice_ssa=True, array_theory=False,
+                quantifiers='expand', infer_bounds=True):
+    options = [CACHE_VERSION, normalize_source(code_lines), sorted(loop_unroll_counts.items())]
+    # Optimized and unsliced runs keep their own entries, since their models list other variables
+    if optimize:
+        options.append('optimize')
+    if not slice_ssa:
+        options.append('unsliced')
+    if array_theory:
+        options.append('array theory')
+    if quantifiers != 'expand':
+        options.append(quantifiers)
+    if not infer_bounds:
+        options.append('no bound inference')
+    payload = json.dumps(options)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PipelineCache:
+    """Two-tier cache of pipeline results keyed by program_key.
+
+    Entries are dicts holding the output of every stage that has run so far
+    ('program', 'loops', 'inferred', 'unrolled', 'ssa', 'sliced', 'optimized', 'optimization',
+    'smt', 'verdict'). The memory tier
+    is an LRU of max_entries; the optional disk tier pickles entries into
+    cache_dir and evicts the least recently used files once they exceed
+    max_disk_bytes.
+    """
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        if not self.cache_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)  # Mark as recently used for eviction
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key, entry):
+        self.remember(key, entry)
+        if self.cache_dir:
+            path = self.disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except (OSError, pickle.PickleError, RecursionError):
+                # Very deeply unrolled programs may not pickle; they stay memory-only
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self.evict_disk()
+
+    def evict_disk(self):
+        files = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        self.entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+def count_ssa_nodes(ssa, stats):
+    kinds = {'assign': 0, 'cond': 0, 'phi': 0}
+    for node in ssa:
+        if isinstance(node, SSADef):
+            kinds[node.kind] += 1
+    stats.count('ssa assignments', kinds['assign'])
+    stats.count('phi nodes', kinds['phi'])
+    stats.count('branch conditions', kinds['cond'])
+
+def run_pipeline(code_lines, loop_unroll_counts, cache=None, with_smt=False, program=None, ctx=None, on_stage=None,
+                 stats=NO_STATS, optimize=False, slice_ssa=True, array_theory=False, quantifiers='expand',
+                 infer_bounds=True):
+    """Parse, unroll, convert to SSA and check a program, reusing cached stages.
+
+    Returns the cache entry dict; 'verdict' is the (is_sat, output) pair from
+    check_ssa_with_z3, and 'smt' is only filled in when with_smt is set.
+    With slice_ssa, only the cone of influence of the assertions ('sliced')
+    is converted and checked. With optimize, the SSA goes through
+    optimize_ssa instead, which slices as well: 'optimized' holds the nodes
+    that are checked and 'optimization' the report lines. array_theory
+    encodes arrays as SMT arrays with select and store, and quantifiers
+    picks how range assertions are compiled (both are SSABuilder options).
+    With infer_bounds, loops with a constant trip count ('inferred', see
+    infer_loop_bounds) are unrolled exactly that often and without guards,
+    whatever loop_unroll_counts says about them.
+    program may be passed in when the caller has already parsed code_lines.
+    on_stage(stage, entry) is called as 'unrolled', 'ssa', 'sliced' or
+    'optimized', 'smt' and 'verdict' become available, whether they were
+    computed or found in the cache.
+    Stages are timed into stats; stages served from the cache are not.
+    """
+    with stats.stage('cache lookup'):
+        key = program_key(code_lines, loop_unroll_counts, optimize, slice_ssa, array_theory, quantifiers, infer_bounds)
+        cached = cache.get(key) if cache is not None else None
+    entry = dict(cached or {})
+    stats.count('cache hit', cached is not None)
+
+    def finished(stage):
+        if on_stage is not None:
+            on_stage(stage, entry)
+
+    if 'ssa' not in entry:
+        if program is None:
+            with stats.stage('parse'):
+                program = parse_program(code_lines)
+        entry['program'] = program
+        entry['loops'] = list(collect_loops(program))
+        with stats.stage('unroll'):
+            entry['inferred'] = infer_loop_bounds(program) if infer_bounds else {}
+            entry['unrolled'] = unroll_statements(program, loop_unroll_counts, exact_counts=entry['inferred'])
+    if stats.enabled:
+        stats.count('unrolled lines', count_program_lines(entry['unrolled']))
+        stats.count('inferred loop bounds', len(entry['inferred']))
+    finished('unrolled')
+    if 'ssa' not in entry:
+        with stats.stage('ssa'):
+            entry['ssa'] = build_ssa(entry['unrolled'], array_theory, quantifiers)
+    if stats.enabled:
+        count_ssa_nodes(entry['ssa'], stats)
+    finished('ssa')
+    checked = entry['ssa']
+    if optimize:
+        if 'optimized' not in entry:
+            entry['optimized'], entry['optimization'] = optimize_ssa(entry['ssa'], stats)
+        checked = entry['optimized']
+        finished('optimized')
+    elif slice_ssa:
+        if 'sliced' not in entry:
+            entry['sliced'] = slice_with_stats(entry['ssa'], stats)
+        checked = entry['sliced']
+        finished('sliced')
+    if with_smt:
+        if 'smt' not in entry:
+            with stats.stage('smt text'):
+                entry['smt'] = convert_ssa_to_smtlib(checked, array_theory)[0]
+        stats.count('smt bytes', len(entry['smt']))
+        finished('smt')
+    if 'verdict' not in entry:
+        entry['verdict'] = check_ssa_with_z3(checked, ctx, stats=stats, array_theory=array_theory)
+    finished('verdict')
+
+    if cache is not None and entry.keys() != (cached or {}).keys():
+        stored = entry
+        if entry['verdict'][1][0].startswith("Unknown result"):
+            # An interrupted or timed out solve says nothing about the program
+            stored = {stage: value for stage, value in entry.items() if stage != 'verdict'}
+        cache.put(key, stored)
+    return entry
@@ -0,0 +1,681 @@
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+# === Expressions ===
+
+@dataclass(frozen=True)
+class Num:
+    value: int
+
+@dataclass(frozen=True)
+class BoolConst:
+    value: bool
+
+@dataclass(frozen=True)
+class Var:
+    name: str
+
+@dataclass(frozen=True)
+class Index:
+    array: str
+    index: 'Expr'
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    operand: 'Expr'
+
+@dataclass(frozen=True)
+class Binary:
+    op: str
+    left: 'Expr'
+    right: 'Expr'
+
+@dataclass(frozen=True)
+class Ternary:
+    cond: 'Expr'
+    then: 'Expr'
+    orelse: 'Expr'
+
+@dataclass(frozen=True)
+class Store:
+    # store(array, index, value): array with one element replaced, used by the array theory encoding
+    array: str
+    index: 'Expr'
+    value: 'Expr'
+
+@dataclass(frozen=True)
+class RangeAll:
+    # for (var in range (bound)): body
+    var: str
+    bound: 'Expr'
+    body: 'Expr'
+
+Expr = Union[Num, BoolConst, Var, Index, Unary, Binary, Ternary, Store, RangeAll]
+
+# === Statements ===
+
+@dataclass(frozen=True)
+class Assign:
+    target: 'Var | Index'
+    value: 'Expr'
+
+@dataclass(frozen=True)
+class If:
+    arms: Tuple[Tuple['Expr', tuple], ...]  # (condition, body) for the if and every else if
+    orelse: Optional[tuple] = None
+
+@dataclass(frozen=True)
+class Loop:
+    header: str  # Source text of the header, used as the key for unroll counts
+    init: Optional[Assign]
+    cond: 'Expr'
+    inc: Optional[Assign]
+    body: tuple
+
+@dataclass(frozen=True)
+class Assert:
+    expr: 'Expr'
+
+@dataclass(frozen=True)
+class Assume:
+    expr: 'Expr'
+
+@dataclass(frozen=True)
+class Call:
+    name: str
+    args: tuple
+
+# === SSA ===
+
+@dataclass(frozen=True)
+class SSADef:
+    name: str
+    value: 'Expr'
+    kind: str = 'assign'  # 'assign', 'cond' (branch condition φk) or 'phi' (merge)
+
+# === Expression sharing ===
+
+def expr_key(expr):
+    # Children are compared by identity, so a key costs O(1) once they are shared
+    if isinstance(expr, (Num, BoolConst)):
+        return type(expr), expr.value
+    if isinstance(expr, Var):
+        return Var, expr.name
+    if isinstance(expr, Index):
+        return Index, expr.array, id(expr.index)
+    if isinstance(expr, Unary):
+        return Unary, expr.op, id(expr.operand)
+    if isinstance(expr, Binary):
+        return Binary, expr.op, id(expr.left), id(expr.right)
+    if isinstance(expr, Ternary):
+        return Ternary, id(expr.cond), id(expr.then), id(expr.orelse)
+    if isinstance(expr, Store):
+        return Store, expr.array, id(expr.index), id(expr.value)
+    return RangeAll, expr.var, id(expr.bound), id(expr.body)
+
+class ExprTable:
+    """Hash-consing table that turns expression trees into a DAG.
+
+    intern(expr) returns the one shared node equal to expr, provided its
+    children were interned first, so equal subterms are the same object and
+    later stages can convert them once by identity. Entries only live as long
+    as some expression still uses them.
+    """
+    def __init__(self):
+        self.nodes = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def intern(self, expr):
+        key = expr_key(expr)
+        shared = self.nodes.get(key)
+        if shared is None:
+            self.nodes[key] = shared = expr
+        return shared
+
+    def share(self, expr):
+        """Intern expr along with any of its subterms that are not shared yet.
+
+        The walk stops at shared nodes, so wrapping a shared expression in a
+        new connective only costs the new nodes.
+        """
+        if self.nodes.get(expr_key(expr)) is expr:
+            return expr
+        if isinstance(expr, Index):
+            expr = Index(expr.array, self.share(expr.index))
+        elif isinstance(expr, Unary):
+            expr = Unary(expr.op, self.share(expr.operand))
+        elif isinstance(expr, Binary):
+            expr = Binary(expr.op, self.share(expr.left), self.share(expr.right))
+        elif isinstance(expr, Ternary):
+            expr = Ternary(self.share(expr.cond), self.share(expr.then), self.share(expr.orelse))
+        elif isinstance(expr, Store):
+            expr = Store(expr.array, self.share(expr.index), self.share(expr.value))
+        elif isinstance(expr, RangeAll):
+            expr = RangeAll(expr.var, self.share(expr.bound), self.share(expr.body))
+        return self.intern(expr)
+
+# === Tokenizer ===
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<skip>\s+|\#[^\n]*|//[^\n]*)
+  | (?P<num>\d+)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>:=|==|!=|<=|>=|&&|\|\||[-+*/%<>=!?:;,()\[\]{}])
+''', re.VERBOSE)
+LINE_NUMBER_PATTERN = re.compile(r'^\s*\d+\.(?!\d)\s*', re.MULTILINE)
+
+def tokenize(source):
+    tokens = []
+    pos = 0
+    for match in TOKEN_PATTERN.finditer(source):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        kind = match.lastgroup
+        if kind != 'skip':
+            tokens.append((kind, match.group(kind), match.start(), pos))
+    if pos != len(source):
+        line = source.count('\n', 0, pos) + 1
+        raise ValueError(f"Unexpected character {source[pos]!r} on line {line}")
+    tokens.append(('end', '', len(source), len(source)))
+    return tokens
+
+# === Parser ===
+
+# Binding strength of the binary operators, shared by the parser and render_expr
+BINARY_PRECEDENCE = {
+    '||': 1, '&&': 2,
+    '==': 3, '!=': 3, '<': 3, '>': 3, '<=': 3, '>=': 3,
+    '+': 4, '-': 4,
+    '*': 5, '/': 5, '%': 5,
+}
+UNARY_PRECEDENCE = 6
+
+# Markers Parser.parse_expr keeps between the pending operators
+MARKER_PAREN = ('marker', '(')
+MARKER_THEN = ('marker', '?')
+MARKER_ELSE = ('marker', ':')
+
+class Parser:
+    def __init__(self, source):
+        self.source = source
+        self.tokens = tokenize(source)
+        # Token values are looked up on every step, so keep them in a flat list padded with end markers
+        self.values = [token[1] for token in self.tokens] + ['', '']
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def at(self, text, offset=0):
+        # Numbers never equal an operator or keyword, and the end marker is empty
+        return self.values[self.pos + offset] == text
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def error(self, message):
+        start = self.peek()[2]
+        line = self.source.count('\n', 0, start) + 1
+        found = self.peek()[1] or 'end of input'
+        return ValueError(f"{message} on line {line} (found {found!r})")
+
+    def expect(self, text):
+        if not self.at(text):
+            raise self.error(f"Expected {text!r}")
+        return self.advance()
+
+    def accept(self, text):
+        if self.values[self.pos] == text:
+            self.pos += 1
+            return True
+        return False
+
+    def expect_name(self):
+        if self.peek()[0] != 'name':
+            raise self.error("Expected a name")
+        return self.advance()[1]
+
+    # --- Statements ---
+
+    def parse_program(self):
+        statements = []
+        while self.peek()[0] != 'end':
+            statement = self.parse_statement()
+            if statement is not None:
+                statements.append(statement)
+        return tuple(statements)
+
+    def parse_block(self):
+        if self.accept('{'):
+            statements = []
+            while not self.at('}'):
+                if self.peek()[0] == 'end':
+                    raise self.error("Unmatched '{'")
+                statement = self.parse_statement()
+                if statement is not None:
+                    statements.append(statement)
+            self.advance()
+            return tuple(statements)
+        statement = self.parse_statement()
+        return (statement,) if statement is not None else ()
+
+    def parse_statement(self):
+        if self.accept(';'):
+            return None
+        if self.at('if'):
+            return self.parse_if()
+        if self.at('while') or self.at('for'):
+            return self.parse_loop()
+        if self.at('assert') or self.at('assume'):
+            keyword = self.advance()[1]
+            self.expect('(')
+            expr = self.parse_expr()
+            self.expect(')')
+            self.accept(';')
+            return Assert(expr) if keyword == 'assert' else Assume(expr)
+        if self.peek()[0] == 'name' and self.at('(', 1):
+            name = self.advance()[1]
+            self.advance()
+            args = []
+            while not self.at(')'):
+                args.append(self.parse_expr())
+                if not self.accept(','):
+                    break
+            self.expect(')')
+            self.accept(';')
+            return Call(name, tuple(args))
+        assignment = self.parse_assignment()
+        self.accept(';')
+        return assignment
+
+    def parse_assignment(self):
+        name = self.expect_name()
+        target = Var(name)
+        if self.accept('['):
+            target = Index(name, self.parse_expr())
+            self.expect(']')
+        if not (self.accept(':=') or self.accept('=')):
+            raise self.error(f"Expected ':=' after {name!r}")
+        return Assign(target, self.parse_expr())
+
+    def parse_if(self):
+        arms = []
+        self.expect('if')
+        self.expect('(')
+        cond = self.parse_expr()
+        self.expect(')')
+        arms.append((cond, self.parse_block()))
+        orelse = None
+        while self.accept('else'):
+            if self.accept('if'):
+                self.expect('(')
+                cond = self.parse_expr()
+                self.expect(')')
+                arms.append((cond, self.parse_block()))
+            else:
+                orelse = self.parse_block()
+                break
+        return If(tuple(arms), orelse)
+
+    def parse_loop(self):
+        start = self.peek()[2]
+        keyword = self.advance()[1]
+        self.expect('(')
+        init = inc = None
+        if keyword == 'for':
+            if not self.at(';'):
+                init = self.parse_assignment()
+            self.expect(';')
+            cond = self.parse_expr()
+            self.expect(';')
+            if not self.at(')'):
+                inc = self.parse_assignment()
+        else:
+            cond = self.parse_expr()
+        end = self.expect(')')[3]
+        header = self.source[start:end]
+        return Loop(header, init, cond, inc, self.parse_block())
+
+    # --- Expressions ---
+
+    def parse_expr(self):
+        """Parse an expression with precedence climbing over explicit stacks.
+
+        Every token is shifted once and every node built once, so parsing is
+        linear in the length of the expression, and parentheses and ternaries
+        nest without recursion. Operands are pushed on operands; operators
+        holds pending unary and binary operators between the markers '(' (a
+        parenthesis opened here), '?' (a ternary in its then part) and ':'
+        (a ternary in its else part). Ternaries are right associative and bind
+        looser than every binary operator. The expression ends at the first
+        token that cannot continue it, such as a ')' that was not opened here.
+        """
+        values = self.values
+        operands = []
+        operators = []
+        open_parens = 0
+        while True:
+            # An operand, after any prefix operators and opening parentheses
+            op = values[self.pos]
+            if op in ('-', '!'):
+                self.pos += 1
+                operators.append(('unary', op))
+                continue
+            if op == '(':
+                self.pos += 1
+                operators.append(MARKER_PAREN)
+                open_parens += 1
+                continue
+            operands.append(self.parse_atom())
+            # Operators and closing parentheses until the next operand starts
+            while True:
+                op = values[self.pos]
+                precedence = BINARY_PRECEDENCE.get(op)
+                if precedence is not None:
+                    self.reduce(operands, operators, precedence)
+                    operators.append(('binary', op))
+                elif op == '?':
+                    self.reduce(operands, operators, 1)
+                    operators.append(MARKER_THEN)
+                elif op == ':' and self.reduce_to_then(operands, operators):
+                    operators[-1] = MARKER_ELSE
+                elif op == ')' and open_parens:
+                    self.reduce_ternaries(operands, operators)
+                    if operators[-1] is not MARKER_PAREN:
+                        self.expect(':')
+                    operators.pop()
+                    open_parens -= 1
+                    self.pos += 1
+                    continue
+                else:
+                    self.reduce_ternaries(operands, operators)
+                    if operators:
+                        self.expect(')' if operators[-1] is MARKER_PAREN else ':')
+                    return operands[0]
+                self.pos += 1
+                break
+
+    @staticmethod
+    def reduce(operands, operators, min_precedence):
+        # Apply the pending operators that bind at least as tightly as min_precedence, down to a marker
+        while operators:
+            kind, op = operators[-1]
+            if kind == 'unary':
+                operand = operands.pop()
+                if op == '-' and isinstance(operand, Num):
+                    operands.append(Num(-operand.value))
+                else:
+                    operands.append(Unary(op, operand))
+            elif kind == 'binary' and BINARY_PRECEDENCE[op] >= min_precedence:
+                right = operands.pop()
+                operands.append(Binary(op, operands.pop(), right))
+            else:
+                return
+            operators.pop()
+
+    @classmethod
+    def reduce_ternaries(cls, operands, operators):
+        # Finish every operator and ternary down to the innermost '(' (or all of them)
+        while True:
+            cls.reduce(operands, operators, 0)
+            if not operators or operators[-1] is not MARKER_ELSE:
+                return
+            operators.pop()
+            orelse, then = operands.pop(), operands.pop()
+            operands.append(Ternary(operands.pop(), then, orelse))
+
+    @classmethod
+    def reduce_to_then(cls, operands, operators):
+        # A ':' closes the then part of the innermost ternary still waiting for it, if there is one
+        cls.reduce_ternaries(operands, operators)
+        return bool(operators) and operators[-1] is MARKER_THEN
+
+    def parse_atom(self):
+        kind, value, _, _ = self.peek()
+        if kind == 'num':
+            self.advance()
+            return Num(int(value))
+        if self.at('for'):
+            return self.parse_range_all()
+        if kind == 'name':
+            self.advance()
+            if value in ('true', 'false'):
+                return BoolConst(value == 'true')
+            if value == 'store' and self.at('('):
+                self.advance()
+                array = self.expect_name()
+                self.expect(',')
+                index = self.parse_expr()
+                self.expect(',')
+                stored = self.parse_expr()
+                self.expect(')')
+                return Store(array, index, stored)
+            if self.accept('['):
+                index = self.parse_expr()
+                self.expect(']')
+                return Index(value, index)
+            return Var(value)
+        raise self.error("Expected an expression")
+
+    def parse_range_all(self):
+        self.expect('for')
+        self.expect('(')
+        var = self.expect_name()
+        self.expect('in')
+        self.expect('range')
+        self.expect('(')
+        bound = self.parse_expr()
+        self.expect(')')
+        self.expect(')')
+        self.expect(':')
+        return RangeAll(var, bound, self.parse_expr())
+
+def strip_line_numbers(source):
+    return LINE_NUMBER_PATTERN.sub('', source)
+
+def parse_program(code_lines):
+    """Parse program text (a string or a list of lines) into a tuple of statements."""
+    source = code_lines if isinstance(code_lines, str) else "\n".join(code_lines)
+    return Parser(strip_line_numbers(source)).parse_program()
+
+def parse_expr(text):
+    parser = Parser(text)
+    expr = parser.parse_expr()
+    if parser.peek()[0] != 'end':
+        raise parser.error("Unexpected token after expression")
+    return expr
+
+def parse_ssa(ssa_lines):
+    """Parse rendered SSA lines back into SSADef, Assert, Assume and Call nodes."""
+    ssa = []
+    for line in ssa_lines:
+        parser = Parser(line)
+        if parser.peek()[0] == 'end':
+            continue
+        if parser.peek()[0] == 'name' and parser.at('=', 1):
+            name = parser.advance()[1]
+            parser.advance()
+            value = parser.parse_expr()
+            if name.startswith(('φ', 'phi')):
+                kind = 'cond'
+            elif isinstance(value, Ternary):
+                kind = 'phi'
+            else:
+                kind = 'assign'
+            node = SSADef(name, value, kind)
+        else:
+            node = parser.parse_statement()
+        if parser.peek()[0] != 'end':
+            raise parser.error("Invalid SSA line")
+        if node is not None:
+            ssa.append(node)
+    return ssa
+
+# === Rendering ===
+
+def render_expr(expr, parent_precedence=0):
+    if isinstance(expr, Num):
+        text = str(expr.value)
+        return f"({text})" if expr.value < 0 and parent_precedence >= UNARY_PRECEDENCE else text
+    if isinstance(expr, BoolConst):
+        return 'true' if expr.value else 'false'
+    if isinstance(expr, Var):
+        return expr.name
+    if isinstance(expr, Index):
+        return f"{expr.array}[{render_expr(expr.index)}]"
+    if isinstance(expr, Unary):
+        return f"{expr.op}{render_expr(expr.operand, UNARY_PRECEDENCE)}"
+    if isinstance(expr, Binary):
+        precedence = BINARY_PRECEDENCE[expr.op]
+        # Operators are left associative, so only the right operand needs parentheses at equal precedence
+        text = f"{render_expr(expr.left, precedence)} {expr.op} {render_expr(expr.right, precedence + 1)}"
+        return f"({text})" if precedence < parent_precedence else text
+    if isinstance(expr, Ternary):
+        # Precedence 1 parenthesizes nothing but a range quantifier, which would swallow the '?'
+        return f"({render_expr(expr.cond, 1)} ? {render_expr(expr.then)} : {render_expr(expr.orelse)})"
+    if isinstance(expr, Store):
+        return f"store({expr.array}, {render_expr(expr.index)}, {render_expr(expr.value)})"
+    if isinstance(expr, RangeAll):
+        text = f"for ({expr.var} in range ({render_expr(expr.bound)})):{render_expr(expr.body)}"
+        # The body extends as far as it can, so as an operand the quantifier needs parentheses
+        return f"({text})" if parent_precedence > 0 else text
+    raise TypeError(f"Not an expression: {expr!r}")
+
+INDENT = "    "
+
+def iter_program_lines(statements, indent_level=0):
+    """Yield (indent_level, text) for every line of statements.
+
+    Works with an explicit stack instead of recursion, so deeply nested
+    unrolled loops neither hit the recursion limit nor copy inner lines at
+    every level. Indentation is left to the caller.
+    """
+    rendered = {}  # id(expr) -> text, so expressions shared by unrolled iterations render once
+
+    def text(expr):
+        key = id(expr)
+        if key not in rendered:
+            rendered[key] = render_expr(expr)
+        return rendered[key]
+
+    # Frames yield a str (a line at the frame's level), a tuple (a block one level deeper) or a statement
+    stack = [(iter(statements), indent_level)]
+    while stack:
+        items, level = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+        elif isinstance(item, str):
+            yield level, item
+        elif isinstance(item, tuple):
+            stack.append((iter(item), level + 1))
+        elif isinstance(item, Assign):
+            yield level, f"{text(item.target)} := {text(item.value)};"
+        elif isinstance(item, Assert):
+            yield level, f"assert({text(item.expr)});"
+        elif isinstance(item, Assume):
+            yield level, f"assume({text(item.expr)});"
+        elif isinstance(item, Call):
+            yield level, f"{item.name}({', '.join(text(arg) for arg in item.args)});"
+        elif isinstance(item, If):
+            parts = []
+            for i, (cond, body) in enumerate(item.arms):
+                opener = "if" if i == 0 else "} else if"
+                parts.append(f"{opener} ({text(cond)}) {{")
+                parts.append(tuple(body))
+            if item.orelse is not None:
+                parts.append("} else {")
+                parts.append(tuple(item.orelse))
+            parts.append("}")
+            stack.append((iter(parts), level))
+        elif isinstance(item, Loop):
+            stack.append((iter((f"{item.header} {{", tuple(item.body), "}")), level))
+        else:
+            raise TypeError(f"Not a statement: {item!r}")
+
+def count_program_lines(statements):
+    """Number of lines render_program would produce, without rendering anything."""
+    total = 0
+    stack = [statements]
+    while stack:
+        for stmt in stack.pop():
+            if isinstance(stmt, If):
+                total += len(stmt.arms) + 1 + (stmt.orelse is not None)
+                stack.extend(body for _, body in stmt.arms)
+                if stmt.orelse is not None:
+                    stack.append(stmt.orelse)
+            elif isinstance(stmt, Loop):
+                total += 2
+                stack.append(stmt.body)
+            else:
+                total += 1
+    return total
+
+def render_program(statements, indent_level=0):
+    prefixes = []
+    lines = []
+    for level, line in iter_program_lines(statements, indent_level):
+        while len(prefixes) <= level:
+            prefixes.append(INDENT * len(prefixes))
+        lines.append(prefixes[level] + line)
+    return lines
+
+def render_statement(stmt, indent_level=0):
+    return render_program((stmt,), indent_level)
+
+def render_ssa_node(node):
+    if isinstance(node, SSADef):
+        if node.kind == 'cond':
+            return f"{node.name} = ({render_expr(node.value)})"
+        return f"{node.name} = {render_expr(node.value)}"
+    if isinstance(node, Assert):
+        return f"assert({render_expr(node.expr)})"
+    if isinstance(node, Assume):
+        return f"assume({render_expr(node.expr)})"
+    return render_statement(node)[0]
+
+def render_ssa(ssa):
+    return [render_ssa_node(node) for node in ssa]
+
+# === Traversal ===
+
+def expr_symbols(expr, variables=None, arrays=None):
+    """Collect the scalar variables and the arrays read (or stored into) by expr."""
+    variables = set() if variables is None else variables
+    arrays = set() if arrays is None else arrays
+    stack = [expr]
+    visited = set()  # Shared subterms of an expression DAG are walked once
+    while stack:
+        node = stack.pop()
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        if isinstance(node, Var):
+            variables.add(node.name)
+        elif isinstance(node, Index):
+            arrays.add(node.array)
+            stack.append(node.index)
+        elif isinstance(node, Unary):
+            stack.append(node.operand)
+        elif isinstance(node, Binary):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, Ternary):
+            stack.extend((node.cond, node.then, node.orelse))
+        elif isinstance(node, Store):
+            arrays.add(node.array)
+            stack.extend((node.index, node.value))
+        elif isinstance(node, RangeAll):
+            stack.append(node.bound)
+            inner = expr_symbols(node.body, arrays=arrays)[0]
+            inner.discard(node.var)
+            variables.update(inner)
+    return variables, arrays
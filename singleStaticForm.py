@@ -1,319 +1,726 @@
-import re
-
-def parse_assignment(line):
-    # Match scalar assignments of the form var := expr; or var = expr;
-    match = re.match(r'(\w+)\s*(:=|=)\s*(.*?)\s*;', line)
-    if match:
-        return match.group(1), match.group(3)
-    # Match array assignments of the form arr[i] := expr; or arr[i] = expr;
-    array_match = re.match(r'(\w+)\[([^\]]*)\]\s*(:=|=)\s*(.*?)\s*;', line)
-    if array_match:
-        array_name, index, _, expr = array_match.groups()
-        # Replace + with _ in index to create a valid variable name
-        index = index.replace('+', '_')
-        return f"{array_name}_{index}", expr  # Treat arr[i] as a unique variable
-    return None, None
+from array import array
+from program_ast import (
+    Assign, Assert, Assume, Binary, BoolConst, Call, If, Index, Loop, Num, RangeAll, SSADef, Store, Ternary,
+    Unary, Var,
+    ExprTable, parse_program, render_expr, render_program, render_ssa, render_ssa_node,
+)
+
+# arr[j+1] is tracked as the scalar element arr_j_1
+INDEX_NAME_TABLE = str.maketrans({' ': None, '(': None, ')': None,
+                                  '+': '_', '-': '_m', '*': '_x', '/': '_d', '%': '_r'})
+
+def element_name(array_name, index):
+    return f"{array_name}_{render_expr(index).translate(INDEX_NAME_TABLE)}"
+
+def target_name(target):
+    if isinstance(target, Index):
+        return element_name(target.array, target.index)
+    return target.name
+
+class VersionTable:
+    """Current SSA version and number of versions of every variable.
+
+    Names are interned to small integer ids and the versions live in flat
+    integer arrays, so lookups are constant time and nothing is copied per
+    statement. Inside a branch every change is journaled so the state before
+    the branch can be restored for the next arm.
+    """
+    __slots__ = ('ids', 'names', 'current', 'counts', 'journal', 'open_marks')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.current = array('l')  # 0 means the variable has no SSA version yet
+        self.counts = array('l')
+        self.journal = array('l')  # (var_id, previous version) pairs
+        self.open_marks = 0
+
+    def intern(self, name):
+        var_id = self.ids.get(name)
+        if var_id is None:
+            var_id = len(self.names)
+            self.ids[name] = var_id
+            self.names.append(name)
+            self.current.append(0)
+            self.counts.append(0)
+        return var_id
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, name):
+        var_id = self.ids.get(name)
+        if var_id is None or not self.current[var_id]:
+            return None
+        return self.current[var_id]
+
+    def count(self, name):
+        var_id = self.ids.get(name)
+        return 0 if var_id is None else self.counts[var_id]
+
+    def new_version(self, name):
+        var_id = self.intern(name)
+        self.counts[var_id] += 1
+        if self.open_marks:
+            self.journal.append(var_id)
+            self.journal.append(self.current[var_id])
+        self.current[var_id] = self.counts[var_id]
+        return self.current[var_id]
+
+    def mark(self):
+        self.open_marks += 1
+        return len(self.journal)
+
+    def changed_since(self, mark):
+        # var_id -> current version, in order of first change
+        changed = {}
+        for i in range(mark, len(self.journal), 2):
+            var_id = self.journal[i]
+            changed[var_id] = self.current[var_id]
+        return changed
+
+    def rollback(self, mark):
+        # Restore current versions; counts keep growing so names stay unique
+        for i in range(len(self.journal) - 2, mark - 1, -2):
+            self.current[self.journal[i]] = self.journal[i + 1]
+        del self.journal[mark:]
+        self.open_marks -= 1
+
+    def snapshot(self):
+        return array('l', self.current), array('l', self.journal), self.open_marks
+
+    def restore(self, snapshot):
+        # Names interned since the snapshot go back to having no version
+        current, journal, self.open_marks = snapshot
+        self.current[:len(current)] = current
+        for var_id in range(len(current), len(self.current)):
+            self.current[var_id] = 0
+        self.journal = array('l', journal)
+
+def versioned(name, version):
+    return Var(f"{name}_{version}" if version else name)
+
+def substitute(expr, name, value):
+    """Replace the variable name by the expression value throughout expr."""
+    if isinstance(expr, Var):
+        return value if expr.name == name else expr
+    if isinstance(expr, Index):
+        return Index(expr.array, substitute(expr.index, name, value))
+    if isinstance(expr, Unary):
+        return Unary(expr.op, substitute(expr.operand, name, value))
+    if isinstance(expr, Binary):
+        return Binary(expr.op, substitute(expr.left, name, value), substitute(expr.right, name, value))
+    if isinstance(expr, Ternary):
+        return Ternary(substitute(expr.cond, name, value), substitute(expr.then, name, value),
+                       substitute(expr.orelse, name, value))
+    if isinstance(expr, RangeAll):
+        body = expr.body if expr.var == name else substitute(expr.body, name, value)
+        return RangeAll(expr.var, substitute(expr.bound, name, value), body)
+    return expr
+
+def rename_expr(expr, versions, exprs=None, array_theory=False, constants=None):
+    """Rewrite every variable reference in expr to its current SSA version.
+
+    Variables without a version yet (program inputs such as n) keep their name;
+    array reads whose element was never assigned stay as arr[index]. With
+    array_theory, arrays are versioned as a whole and arr[i] reads the current
+    version of arr instead. The result is interned in exprs, so it shares its
+    subterms with every other expression built through the same table.
+
+    constants maps SSA names defined as a number to that number. When it is
+    given, a range assertion whose bound is a number, or one of those names,
+    is expanded into the conjunction of its body for every index; other range
+    assertions stay quantified.
+    """
+    if exprs is None:
+        exprs = ExprTable()
+    intern = exprs.intern
+
+    def array_version(name):
+        return versioned(name, versions.get(name)).name
+
+    def rename(expr):
+        if isinstance(expr, Var):
+            return intern(versioned(expr.name, versions.get(expr.name)))
+        if isinstance(expr, Index):
+            if array_theory:
+                return intern(Index(array_version(expr.array), rename(expr.index)))
+            version = versions.get(element_name(expr.array, expr.index))
+            if version:
+                return intern(versioned(element_name(expr.array, expr.index), version))
+            return intern(Index(expr.array, rename(expr.index)))
+        if isinstance(expr, Unary):
+            return intern(Unary(expr.op, rename(expr.operand)))
+        if isinstance(expr, Binary):
+            return intern(Binary(expr.op, rename(expr.left), rename(expr.right)))
+        if isinstance(expr, Ternary):
+            return intern(Ternary(rename(expr.cond), rename(expr.then), rename(expr.orelse)))
+        if isinstance(expr, Store):
+            return intern(Store(array_version(expr.array), rename(expr.index), rename(expr.value)))
+        if isinstance(expr, RangeAll):
+            bound = rename(expr.bound)
+            if constants is not None:
+                count = bound.value if isinstance(bound, Num) else constants.get(getattr(bound, 'name', None))
+                if count is not None:
+                    return all_of([rename(substitute(expr.body, expr.var, Num(k))) for k in range(count)], intern)
+            # The bound variable shadows any program variable of the same name
+            var_id = versions.ids.get(expr.var)
+            saved = versions.current[var_id] if var_id is not None else 0
+            if var_id is not None:
+                versions.current[var_id] = 0
+            body = rename(expr.body)
+            if var_id is not None:
+                versions.current[var_id] = saved
+            return intern(RangeAll(expr.var, bound, body))
+        return intern(expr)
+
+    return rename(expr)
+
+def all_of(terms, intern):
+    # A balanced && tree, so long expansions stay shallow
+    if not terms:
+        return intern(BoolConst(True))
+    if len(terms) == 1:
+        return terms[0]
+    mid = len(terms) // 2
+    return intern(Binary('&&', all_of(terms[:mid], intern), all_of(terms[mid:], intern)))
+
+def build_phi_expression(values, conditions, exprs=None, any_condition=None):
+    """values[i] is taken when conditions[i] is the first true condition; values[-1] otherwise.
+
+    The ternaries form a balanced tree: each level tests whether any condition
+    of its first half holds, so the depth grows with log(len(values)) on long
+    else-if chains, and a test whose two sides are the same node is left out.
+    any_condition(lo, hi) supplies the disjunction of conditions[lo:hi]; by
+    default it is built inline and shared through exprs.
+    """
+    if exprs is None:
+        exprs = ExprTable()
+    intern = exprs.intern
+    if any_condition is None:
+        any_condition = DisjunctionTree(conditions, lambda lo, hi, expr: intern(expr)).get
+
+    def select(lo, hi):
+        # The value for values[lo:hi], given that no condition before lo holds
+        if hi - lo == 1:
+            return values[lo]
+        mid = (lo + hi) // 2
+        taken, skipped = select(lo, mid), select(mid, hi)
+        if taken is skipped:
+            return taken
+        return intern(Ternary(any_condition(lo, mid), taken, skipped))
+
+    return select(0, len(values))
+
+class DisjunctionTree:
+    """The disjunctions of conditions[lo:hi] a balanced phi tree tests, each built once.
+
+    Ranges are split at their midpoint like the tree itself, so all of them
+    together take fewer nodes than there are conditions. make(lo, hi, expr)
+    turns each new disjunction into the expression that stands for it.
+    """
+    def __init__(self, conditions, make):
+        self.conditions = conditions
+        self.make = make
+        self.ranges = {}
+
+    def get(self, lo, hi):
+        if hi - lo == 1:
+            return self.conditions[lo]
+        expr = self.ranges.get((lo, hi))
+        if expr is None:
+            mid = (lo + hi) // 2
+            expr = self.make(lo, hi, Binary('||', self.get(lo, mid), self.get(mid, hi)))
+            self.ranges[lo, hi] = expr
+        return expr
+
+def negate(expr):
+    return expr.operand if isinstance(expr, Unary) and expr.op == '!' else Unary('!', expr)
+
+def guarded(guard, expr):
+    return expr if guard is None else Binary('||', negate(guard), expr)
+
+def conjoin(left, right):
+    return right if left is None else Binary('&&', left, right)
+
+# How range assertions are compiled; see SSABuilder
+QUANTIFIER_STRATEGIES = ('expand', 'forall')
+
+class SSABuilder:
+    """Converts loop-free statements to SSA nodes, one block at a time.
+
+    Assignments become SSADef nodes with fresh versions, every if/else if
+    condition becomes a branch variable φk, and variables changed inside a
+    branch are merged with a φ ternary after it. Assertions inside branches are
+    guarded by the path condition.
+
+    Blocks emitted later continue from the current versions. open_branch
+    enters an if arm without leaving it, so more statements (such as the next
+    unrolled iteration) can still be added inside; close_branches then emits
+    the merges. mark/rollback undo everything emitted since a mark, so a
+    shared prefix can be extended with different suffixes. nodes() yields
+    the SSA of a block without storing it, for callers that stream it on.
+
+    With array_theory, an array is one SSA variable instead of a set of
+    element variables: arr[i] := v defines the next version of arr as
+    store(arr, i, v), and reads select from the current version.
+
+    quantifiers chooses how range assertions are compiled: 'expand' turns
+    those whose bound is a constant at that point into a conjunction (others
+    stay quantified), 'forall' keeps all of them as bounded quantifiers.
+    """
+    def __init__(self, array_theory=False, quantifiers='expand'):
+        if quantifiers not in QUANTIFIER_STRATEGIES:
+            raise ValueError(f"Unknown quantifier strategy: {quantifiers}")
+        self.array_theory = array_theory
+        self.constants = {} if quantifiers == 'expand' else None  # SSA name -> its value, for expansion
+        self.versions = VersionTable()
+        self.ssa = []
+        self.seen = {}  # (Assert or Assume, id of its shared expression) -> node
+        self.cond_count = 0
+        self.element_reads = {}  # element name -> the Index it was assigned through
+        self.open_branches = []  # (φ variable, versions mark, guard inside the branch)
+        self.exprs = ExprTable()  # Every expression the builder creates is shared through this table
+
+    def rename(self, expr):
+        return rename_expr(expr, self.versions, self.exprs, self.array_theory, self.constants)
+
+    def current_value(self, var_id):
+        versions = self.versions
+        name = versions.names[var_id]
+        if not versions.current[var_id] and name in self.element_reads:
+            return self.rename(self.element_reads[name])
+        return self.exprs.intern(versioned(name, versions.current[var_id]))
+
+    def mark(self):
+        return (len(self.ssa), self.cond_count, len(self.element_reads), list(self.open_branches),
+                self.versions.snapshot())
+
+    def rollback(self, mark):
+        ssa_length, self.cond_count, reads_length, self.open_branches, versions = mark
+        for node in self.ssa[ssa_length:]:
+            if isinstance(node, (Assert, Assume)):
+                self.seen.pop((type(node), id(node.expr)), None)
+            elif isinstance(node, SSADef) and self.constants:
+                # Forget the values of definitions that no longer exist
+                self.constants.pop(node.name, None)
+        del self.ssa[ssa_length:]
+        for name in list(self.element_reads)[reads_length:]:
+            del self.element_reads[name]
+        self.versions.restore(versions)
+
+    def new_cond(self, cond):
+        self.cond_count += 1
+        return SSADef(f"φ{self.cond_count}", self.rename(cond), 'cond')
+
+    def merge(self, end_states, cond_vars):
+        """Return the SSA nodes merging the end states of an if's arms.
+
+        Disjunctions of several branch variables that the φ trees test become
+        definitions of their own, named after the first and last variable
+        (φ3_5 is φ3 || φ4 || φ5), so every tree refers to them by name.
+        """
+        # Build every merge against the state before the if, then give the results new versions
+        versions = self.versions
+        intern = self.exprs.intern
+        nodes = []
+
+        def define(lo, hi, expr):
+            name = f"{cond_vars[lo].name}_{cond_vars[hi - 1].name[1:]}"
+            nodes.append(SSADef(name, intern(expr), 'cond'))
+            return intern(Var(name))
+
+        disjunctions = DisjunctionTree(cond_vars, define)
+        changed = {}
+        for state in end_states:
+            changed.update(dict.fromkeys(state))
+        merges = []
+        for var_id in changed:
+            name = versions.names[var_id]
+            before = self.current_value(var_id)
+            values = [intern(versioned(name, state[var_id])) if var_id in state else before for state in end_states]
+            merges.append((name, build_phi_expression(values, cond_vars, self.exprs, disjunctions.get)))
+        nodes.extend(SSADef(f"{name}_{versions.new_version(name)}", phi, 'phi') for name, phi in merges)
+        return nodes
+
+    def open_branch(self, cond, body):
+        guard = self.open_branches[-1][2] if self.open_branches else None
+        cond_def = self.new_cond(cond)
+        self.ssa.append(cond_def)
+        cond_var = self.exprs.intern(Var(cond_def.name))
+        guard = self.exprs.share(conjoin(guard, cond_var))
+        self.open_branches.append((cond_var, self.versions.mark(), guard))
+        self.emit(body, guard)
+
+    def close_branches(self):
+        versions = self.versions
+        while self.open_branches:
+            cond_var, mark, _ = self.open_branches.pop()
+            state = versions.changed_since(mark)
+            versions.rollback(mark)
+            self.ssa.extend(self.merge([state, {}], [cond_var]))
+
+    def emit(self, block, guard=None):
+        self.ssa.extend(self.nodes(block, guard))
+
+    def nodes(self, block, guard=None):
+        """Yield the SSA nodes of block one at a time.
+
+        Nested ifs are walked with an explicit stack instead of recursion, so
+        deeply unrolled loops neither hit the recursion limit nor pass every
+        node up through one generator per nesting level.
+        """
+        versions = self.versions
+        exprs = self.exprs
+        rename = self.rename
+        array_theory = self.array_theory
+        constants = self.constants
+        # Frames are [statements, guard, if state]; the if state is set for the frame of an if arm
+        stack = [[iter(block), guard, None]]
+        while stack:
+            frame = stack[-1]
+            stmt = next(frame[0], None)
+            if stmt is None:
+                stack.pop()
+                branch = frame[2]
+                if branch is not None:
+                    # The arm is done: remember its end state and start the next arm or merge
+                    branch.end_states.append(versions.changed_since(branch.mark))
+                    versions.rollback(branch.mark)
+                    if len(branch.end_states) < len(branch.bodies):
+                        stack.append(self.enter_arm(branch))
+                    else:
+                        yield from self.merge(branch.end_states, branch.cond_vars)
+                continue
+
+            guard = frame[1]
+            if isinstance(stmt, Assign):
+                value = rename(stmt.value)
+                if array_theory and isinstance(stmt.target, Index):
+                    array = stmt.target.array
+                    index = rename(stmt.target.index)
+                    value = exprs.intern(Store(versioned(array, versions.get(array)).name, index, value))
+                    yield SSADef(f"{array}_{versions.new_version(array)}", value)
+                    continue
+                name = target_name(stmt.target)
+                if isinstance(stmt.target, Index):
+                    self.element_reads.setdefault(name, stmt.target)
+                node = SSADef(f"{name}_{versions.new_version(name)}", value)
+                if constants is not None:
+                    if isinstance(value, Num):
+                        constants[node.name] = value.value
+                    elif isinstance(value, Var) and value.name in constants:
+                        constants[node.name] = constants[value.name]
+                yield node
+            elif isinstance(stmt, If):
+                branch = IfBranch(stmt, guard)
+                for cond, _ in stmt.arms:
+                    cond_def = self.new_cond(cond)
+                    branch.cond_vars.append(exprs.intern(Var(cond_def.name)))
+                    yield cond_def
+                stack.append(self.enter_arm(branch))
+            elif isinstance(stmt, (Assert, Assume)):
+                node = type(stmt)(exprs.share(guarded(guard, rename(stmt.expr))))
+                key = (type(node), id(node.expr))
+                if key not in self.seen:
+                    self.seen[key] = node
+                    yield node
+            elif isinstance(stmt, Call):
+                yield Call(stmt.name, tuple(rename(arg) for arg in stmt.args))
+            elif isinstance(stmt, Loop):
+                raise ValueError(f"Loop must be unrolled before SSA conversion: {stmt.header}")
+
+    def enter_arm(self, branch):
+        i = len(branch.end_states)
+        cond_vars = branch.cond_vars
+        intern = self.exprs.intern
+        arm_guard = cond_vars[i] if i < len(cond_vars) else None
+        if branch.taken_before is not None:
+            not_before = intern(Unary('!', branch.taken_before))
+            arm_guard = not_before if arm_guard is None else intern(Binary('&&', arm_guard, not_before))
+        if i < len(cond_vars):
+            taken = cond_vars[i]
+            branch.taken_before = taken if branch.taken_before is None else intern(Binary('||', branch.taken_before, taken))
+        branch.mark = self.versions.mark()
+        guard = arm_guard if branch.guard is None else intern(Binary('&&', branch.guard, arm_guard))
+        return [iter(branch.bodies[i]), guard, branch]
+
+class IfBranch:
+    """Progress through the arms of one if statement while its SSA is being built."""
+    __slots__ = ('bodies', 'guard', 'cond_vars', 'end_states', 'taken_before', 'mark')
+
+    def __init__(self, stmt, guard):
+        self.bodies = [body for _, body in stmt.arms] + [stmt.orelse or ()]
+        self.guard = guard
+        self.cond_vars = []
+        self.end_states = []
+        self.taken_before = None
+        self.mark = None
+
+def build_ssa(statements, array_theory=False, quantifiers='expand'):
+    """Convert loop-free statements to a list of SSA nodes."""
+    return list(iter_ssa(statements, array_theory, quantifiers))
+
+def iter_ssa(statements, array_theory=False, quantifiers='expand'):
+    """Yield the SSA nodes of loop-free statements without keeping them."""
+    return SSABuilder(array_theory, quantifiers).nodes(statements)
+
+def iter_ssa_lines(code_lines):
+    """Yield the SSA of a loop-free program one rendered line at a time."""
+    for node in iter_ssa(parse_program(code_lines)):
+        yield render_ssa_node(node)
 
 def convert_to_ssa(code_lines):
-    var_versions = {}  # Tracks versions for both scalars and array elements (e.g., arr_j_1)
-    ssa_output = []
-    branches = []
-    current_branch = []
-    conditions = []
-    after_if = []
-    before_if = []
-    inside = None
-    final_exprs = []
-
-    # Step 1: Parse code lines and categorize them
-    for line in code_lines:
-        stripped = line.strip()
-        if re.match(r'^\d+\.', stripped):
-            stripped = stripped[stripped.find('.') + 1:].strip()
-
-        if stripped.startswith("if"):
-            if inside == 'branch':
-                branches.append((conditions[-1], current_branch))
-                current_branch = []
-            condition = re.search(r'\((.*)\)', stripped).group(1)
-            conditions.append(condition)
-            inside = 'branch'
-        elif stripped.startswith("else if"):
-            if inside == 'branch':
-                branches.append((conditions[-1], current_branch))
-                current_branch = []
-            condition = re.search(r'\((.*)\)', stripped).group(1)
-            conditions.append(condition)
-            inside = 'branch'
-        elif stripped.startswith("else"):
-            if inside == 'branch':
-                branches.append((conditions[-1], current_branch))
-                current_branch = []
-            conditions.append("else")
-            inside = 'branch'
-        elif stripped == "}":
-            pass
-        elif (':=' in stripped or '=' in stripped) and inside == 'branch':
-            current_branch.append(stripped)
-        elif (':=' in stripped or '=' in stripped) and inside is None:
-            before_if.append(stripped)
-        elif re.match(r'\w+\s*\(.*\);', stripped):
-            final_exprs.append(stripped)
-        else:
-            after_if.append(stripped)
-
-    if current_branch:
-        branches.append((conditions[-1], current_branch))
-
-    # Step 2: Process assignments before conditionals (initial assignments)
-    for stmt in before_if:
-        var, expr = parse_assignment(stmt)
-        if var:
-            version = 1
-            var_versions[var] = [version]
-            # Rewrite array accesses on the right side
-            array_accesses = re.findall(r'(\w+)\[([^\]]*)\]', expr)
-            for array_name, index in array_accesses:
-                index = index.replace('+', '_')
-                var_name = f"{array_name}_{index}"
-                if var_name in var_versions:
-                    expr = re.sub(rf'\b{array_name}\[{index}\]', f"{var_name}_{var_versions[var_name][-1]}", expr)
-            ssa_output.append(f"{var}_{version} = {expr}")
-
-    # Step 3: Process branches and assignments within them
-    for i, (cond, stmts) in enumerate(branches):
-        # Get current versions of all variables/array elements
-        curr_versions = {v: var_versions[v][-1] for v in var_versions if var_versions[v]}
-        cond_rewritten = cond
-
-        # Rewrite array accesses in conditions (e.g., arr[j_1] -> arr_j_1_version)
-        array_accesses = re.findall(r'(\w+)\[([^\]]*)\]', cond)
-        for array_name, index in array_accesses:
-            index = index.replace('+', '_')
-            var_name = f"{array_name}_{index}"
-            if var_name in curr_versions:
-                cond_rewritten = re.sub(rf'\b{array_name}\[{index}\]', f"{var_name}_{curr_versions[var_name]}", cond_rewritten)
-
-        # Rewrite scalar variables in conditions
-        for v, ver in curr_versions.items():
-            if not re.match(r'\w+_\w+', v):  # Only replace scalar variables, not array elements (already handled)
-                cond_rewritten = re.sub(rf'\b{v}\b', f"{v}_{ver}", cond_rewritten)
-
-        if cond != "else":
-            ssa_output.append(f"φ{i + 1} = ({cond_rewritten})")
-        else:
-            if stmts:
-                var, expr = parse_assignment(stmts[0])
-                if var:
-                    fallback_version = var_versions[var][-1]
-                    else_value = f"{var}_{fallback_version - 1}"
-
-                    prev_versions = {v: var_versions[v][-1] for v in var_versions if var_versions[v]}
-                    # Rewrite array accesses in the expression
-                    array_accesses = re.findall(r'(\w+)\[([^\]]*)\]', expr)
-                    for array_name, index in array_accesses:
-                        index = index.replace('+', '_')
-                        var_name = f"{array_name}_{index}"
-                        if var_name in prev_versions:
-                            expr = re.sub(rf'\b{array_name}\[{index}\]', f"{var_name}_{prev_versions[var_name]}", expr)
-
-                    # Rewrite scalar variables in the expression
-                    for v, ver in prev_versions.items():
-                        if not re.match(r'\w+_\w+', v):
-                            expr = re.sub(rf'\b{v}\b', f"{v}_{ver}", expr)
-
-                    version = len(var_versions.get(var, [])) + 1
-                    var_versions.setdefault(var, []).append(version)
-                    then_value = f"{var}_{version - 1}"
-
-                    ternary_expr = f"(φ{i} ? {then_value} : {else_value})"
-                    ssa_output.append(f"{var}_{version} = {ternary_expr}")
-
-        for stmt in stmts:
-            var, expr = parse_assignment(stmt)
-            if var:
-                prev_versions = {v: var_versions[v][-1] for v in var_versions if var_versions[v]}
-                # Rewrite array accesses in the expression
-                array_accesses = re.findall(r'(\w+)\[([^\]]*)\]', expr)
-                for array_name, index in array_accesses:
-                    index = index.replace('+', '_')
-                    var_name = f"{array_name}_{index}"
-                    if var_name in prev_versions:
-                        expr = re.sub(rf'\b{array_name}\[{index}\]', f"{var_name}_{prev_versions[var_name]}", expr)
-
-                # Rewrite scalar variables in the expression
-                for v, ver in prev_versions.items():
-                    if not re.match(r'\w+_\w+', v):
-                        expr = re.sub(rf'\b{v}\b', f"{v}_{ver}", expr)
-
-                version = len(var_versions.get(var, [])) + 1
-                var_versions.setdefault(var, []).append(version)
-                line = f"{var}_{version} = {expr}"
-                ssa_output.append(line)
-
-    # Step 4: Build phi expressions for variables with multiple versions
-    def build_phi_expression(values, conditions, var_name):
-        if len(values) == 1:
-            return values[0]
-        version = len(var_versions.get(var_name, [])) + 1
-        result_var = f"{var_name}_{version}"
-        var_versions.setdefault(var_name, []).append(version)
-
-        if len(values) > 3:
-            mid = len(values) // 2
-            left_expr = build_phi_expression(values[:mid], conditions[:mid - 1], var_name)
-            right_expr = build_phi_expression(values[mid:], conditions[mid - 1:], var_name)
-            final_expr = f"({conditions[mid - 1]} ? {left_expr} : {right_expr})"
-        else:
-            final_expr = values[-1]
-            for i in range(len(values) - 2, -1, -1):
-                final_expr = f"({conditions[i]} ? {values[i]} : {final_expr})"
-
-        ssa_output.append(f"{result_var} = {final_expr}")
-        return result_var
-
-    for var, versions in var_versions.items():
-        if len(versions) > 1:
-            phi_ver = len(versions) + 1
-            ssa_versions = [f"{var}_{v}" for v in versions]
-            phi_conditions = [f"φ{i + 1}" for i in range(len(versions) - 1)]
-            phi_result_var = build_phi_expression(ssa_versions, phi_conditions, var)
-            var_versions[var].append(phi_ver)
-
-    # Step 5: Process final expressions (e.g., return statements)
-    seen_exprs = set()
-    for expr in final_exprs:
-        original_expr = expr
-        # Rewrite array accesses in the final expression
-        array_accesses = re.findall(r'(\w+)\[([^\]]*)\]', expr)
-        for array_name, index in array_accesses:
-            index = index.replace('+', '_')
-            var_name = f"{array_name}_{index}"
-            if var_name in var_versions:
-                expr = re.sub(rf'\b{array_name}\[{index}\]', f"{var_name}_{var_versions[var_name][-1]}", expr)
-
-        # Rewrite scalar variables in the final expression
-        for var in var_versions:
-            if not re.match(r'\w+_\w+', var):
-                expr = re.sub(rf'\b{var}\b', f"{var}_{var_versions[var][-1]}", expr)
-
-        if expr not in seen_exprs:
-            seen_exprs.add(expr)
-            ssa_output.append(expr)
-
-    return "\n".join(ssa_output)
+    program = parse_program(code_lines)
+    return "\n".join(render_ssa(build_ssa(program)))
+
+def collect_loops(statements, loop_headers=None):
+    """Return an ordered dict of every loop header (including nested loops) mapped to None."""
+    if loop_headers is None:
+        loop_headers = {}
+    for stmt in statements:
+        if isinstance(stmt, Loop):
+            loop_headers[stmt.header] = None
+            collect_loops(stmt.body, loop_headers)
+        elif isinstance(stmt, If):
+            for _, body in stmt.arms:
+                collect_loops(body, loop_headers)
+            if stmt.orelse:
+                collect_loops(stmt.orelse, loop_headers)
+    return loop_headers
 
 def collect_loops_recursive(code_lines, i=0):
-    loop_headers = {}
-    while i < len(code_lines):
-        line = code_lines[i].strip()
-        loop_match = re.match(r"(for\s*\(.*;.*;.*\)|while\s*\(.*\))\s*\{?$", line)
-        if loop_match:
-            loop_header = loop_match.group(1)
-            loop_headers[loop_header] = None
-
-            loop_start_index = i + 1
-            brace_level = 1 if "{" in line else 0
-            loop_body = []
-            j = loop_start_index
-
-            while j < len(code_lines):
-                body_line = code_lines[j]
-                loop_body.append(body_line)
-                brace_level += body_line.count("{")
-                brace_level -= body_line.count("}")
-                if brace_level == 0:
-                    break
-                j += 1
-
-            nested_loops = collect_loops_recursive(loop_body)
-            loop_headers.update(nested_loops)
-            i = j + 1
+    return collect_loops(parse_program(code_lines[i:]))
+
+# Loops that would run more often than this are left to the user's unroll count
+MAX_INFERRED_TRIP_COUNT = 1000
+
+def constant_value(expr, env):
+    """The value of an integer expression over the constants in env, or None."""
+    if isinstance(expr, Num):
+        return expr.value
+    if isinstance(expr, Var):
+        return env.get(expr.name)
+    if isinstance(expr, Unary) and expr.op == '-':
+        value = constant_value(expr.operand, env)
+        return None if value is None else -value
+    if isinstance(expr, Binary) and expr.op in ('+', '-', '*'):
+        left, right = constant_value(expr.left, env), constant_value(expr.right, env)
+        if left is None or right is None:
+            return None
+        return left + right if expr.op == '+' else left - right if expr.op == '-' else left * right
+    return None
+
+def assigned_names(statements, names=None):
+    """Count the assignments to every scalar variable in statements, including nested blocks and loops."""
+    if names is None:
+        names = {}
+    for stmt in statements:
+        if isinstance(stmt, Assign):
+            if isinstance(stmt.target, Var):
+                names[stmt.target.name] = names.get(stmt.target.name, 0) + 1
+        elif isinstance(stmt, If):
+            for _, body in stmt.arms:
+                assigned_names(body, names)
+            if stmt.orelse:
+                assigned_names(stmt.orelse, names)
+        elif isinstance(stmt, Loop):
+            assigned_names(loop_updates(stmt) + stmt.body, names)
+    return names
+
+def loop_updates(loop):
+    return tuple(stmt for stmt in (loop.init, loop.inc) if stmt is not None)
+
+# The comparison var op limit means the same as limit MIRRORED[op] var
+MIRRORED = {'<': '>', '>': '<', '<=': '>=', '>=': '<=', '==': '==', '!=': '!='}
+
+def loop_step(loop, var):
+    """How much var changes per iteration, if the only change is one var := var +/- constant per iteration."""
+    body_assigned = assigned_names(loop.body)
+    if loop.inc is not None:
+        if body_assigned.get(var):
+            return None
+        update = loop.inc
+    else:
+        if body_assigned.get(var) != 1:
+            return None
+        # It must run on every iteration, so it has to be a statement of the body itself
+        update = next((stmt for stmt in loop.body if isinstance(stmt, Assign) and stmt.target == Var(var)), None)
+    if update is None or update.target != Var(var) or not isinstance(update.value, Binary):
+        return None
+    value = update.value
+    if value.op == '+' and value.right == Var(var):
+        step = constant_value(value.left, {})
+    elif value.op in ('+', '-') and value.left == Var(var):
+        step = constant_value(value.right, {})
+        if step is not None and value.op == '-':
+            step = -step
+    else:
+        return None
+    return step
+
+def count_iterations(start, step, op, limit):
+    """Iterations until start + k * step op limit first fails, or None if it never does."""
+    if op == '<=':
+        op, limit = '<', limit + 1
+    elif op == '>=':
+        op, limit = '>', limit - 1
+    if op == '<':
+        if start >= limit:
+            return 0
+        return -((start - limit) // step) if step > 0 else None
+    if op == '>':
+        if start <= limit:
+            return 0
+        return -((limit - start) // -step) if step < 0 else None
+    if op == '==':
+        return 1 if start == limit and step else 0 if start != limit else None
+    if start == limit:
+        return 0
+    if step and (limit - start) % step == 0 and (limit - start) // step > 0:
+        return (limit - start) // step
+    return None
+
+def counted_loop(loop, env, max_trip_count=MAX_INFERRED_TRIP_COUNT):
+    """(counter, start, step, trip count) of loop when it starts in env, or None if the count is not constant.
+
+    The condition has to compare one variable with a constant, the variable
+    has to start from a constant (the init of a for loop, or its value in
+    env), and every iteration has to change it by the same constant once.
+    """
+    cond = loop.cond
+    if not isinstance(cond, Binary) or cond.op not in MIRRORED:
+        return None
+    if isinstance(cond.left, Var) and (not isinstance(cond.right, Var) or loop_step(loop, cond.left.name) is not None):
+        var, op, limit_expr = cond.left.name, cond.op, cond.right
+    elif isinstance(cond.right, Var):
+        var, op, limit_expr = cond.right.name, MIRRORED[cond.op], cond.left
+    else:
+        return None
+    if loop.init is not None:
+        if loop.init.target != Var(var):
+            return None
+        start = constant_value(loop.init.value, env)
+    else:
+        start = env.get(var)
+    limit = constant_value(limit_expr, env)
+    if start is None or limit is None:
+        return None
+    # The limit must not change while the loop runs
+    changed = assigned_names(loop.body)
+    if any(name == var or name in changed for name in expr_names(limit_expr)):
+        return None
+    step = loop_step(loop, var)
+    if step is None:
+        return None
+    count = count_iterations(start, step, op, limit)
+    if count is None or count > max_trip_count:
+        return None
+    return var, start, step, count
+
+def expr_names(expr):
+    if isinstance(expr, Var):
+        return (expr.name,)
+    if isinstance(expr, Unary):
+        return expr_names(expr.operand)
+    if isinstance(expr, Binary):
+        return expr_names(expr.left) + expr_names(expr.right)
+    return ()
+
+def infer_loop_bounds(statements, max_trip_count=MAX_INFERRED_TRIP_COUNT):
+    """Map the header of every loop whose trip count is a constant to that count.
+
+    Scalar variables assigned constants (or constant arithmetic over them)
+    are tracked through the program; an if forgets what its arms assign, and
+    a loop what its body assigns, except the counter of a loop with a known
+    trip count. Loops that run more than max_trip_count times, and headers
+    whose loops run a different number of times in different places, are
+    left out; they are unrolled with a user-chosen bound.
+    """
+    found = {}  # header -> trip counts of every loop with that header
+
+    def forget(env, statements):
+        for name in assigned_names(statements):
+            env.pop(name, None)
+
+    def walk(statements, env):
+        for stmt in statements:
+            if isinstance(stmt, Assign):
+                if isinstance(stmt.target, Var):
+                    value = constant_value(stmt.value, env)
+                    if value is None:
+                        env.pop(stmt.target.name, None)
+                    else:
+                        env[stmt.target.name] = value
+            elif isinstance(stmt, If):
+                bodies = [body for _, body in stmt.arms] + [stmt.orelse or ()]
+                for body in bodies:
+                    walk(body, dict(env))
+                for body in bodies:
+                    forget(env, body)
+            elif isinstance(stmt, Loop):
+                counted = counted_loop(stmt, env, max_trip_count)
+                found.setdefault(stmt.header, []).append(None if counted is None else counted[3])
+                forget(env, loop_updates(stmt) + stmt.body)
+                walk(stmt.body, dict(env))
+                if counted is not None:
+                    # The counter's value after the last iteration is known too
+                    counter, start, step, count = counted
+                    env[counter] = start + count * step
+
+    walk(statements, {})
+    return {header: counts[0] for header, counts in found.items()
+            if counts[0] is not None and all(count == counts[0] for count in counts)}
+
+def unroll_statements(statements, loop_unroll_counts, assume_exit=False, exact_counts=None):
+    """Replace every loop by nested ifs, one per iteration.
+
+    With assume_exit, each unrolled loop is followed by assume(!cond) so only
+    executions that leave the loop within the bound are considered. Loops
+    whose header is in exact_counts (see infer_loop_bounds) run exactly that
+    often, so their iterations are emitted one after the other without
+    guards, and they need no exit assumption.
+    """
+    unrolled = []
+    for stmt in statements:
+        if isinstance(stmt, Loop):
+            unrolled.extend(unroll_single_loop(stmt, loop_unroll_counts, assume_exit, exact_counts))
+        elif isinstance(stmt, If):
+            arms = tuple((cond, unroll_statements(body, loop_unroll_counts, assume_exit, exact_counts))
+                         for cond, body in stmt.arms)
+            orelse = (unroll_statements(stmt.orelse, loop_unroll_counts, assume_exit, exact_counts)
+                      if stmt.orelse is not None else None)
+            unrolled.append(If(arms, orelse))
         else:
-            i += 1
-    return loop_headers
+            unrolled.append(stmt)
+    return tuple(unrolled)
+
+def unroll_single_loop(loop, loop_unroll_counts, assume_exit=False, exact_counts=None):
+    exact = exact_counts.get(loop.header) if exact_counts else None
+    n = exact if exact is not None else loop_unroll_counts.get(loop.header, 1)
+    # Unroll the body once and share it between iterations; only the nesting is rebuilt
+    body = unroll_statements(loop.body, loop_unroll_counts, assume_exit, exact_counts)
+    if loop.inc is not None:
+        body += (loop.inc,)
+    if exact is not None:
+        nested = body * n
+    else:
+        # Nest each iteration inside the previous one, building from the innermost iteration out
+        nested = ()
+        for _ in range(n):
+            nested = (If(((loop.cond, body + nested),)),)
+        if assume_exit:
+            nested += (Assume(negate(loop.cond)),)
+    if loop.init is not None:
+        return (loop.init,) + nested
+    return nested
 
 def unroll_loop(code_lines, loop_unroll_counts, indent_level=0):
-    indent = "    " * indent_level
-    i = 0
-    output = []
-    while i < len(code_lines):
-        line = code_lines[i].strip()
-        loop_match = re.match(r"(for\s*\(.*;.*;.*\)|while\s*\(.*\))\s*\{?$", line)
-        if loop_match:
-            loop_header = loop_match.group(1)
-            loop_start_index = i + 1
-            loop_body_lines = []
-            brace_level = 1 if "{" in line else 0
-            end_index = -1
-            while loop_start_index < len(code_lines):
-                body_line = code_lines[loop_start_index]
-                stripped_body_line = body_line.strip()
-                if "{" in stripped_body_line:
-                    brace_level += stripped_body_line.count("{")
-                if "}" in stripped_body_line:
-                    brace_level -= stripped_body_line.count("}")
-                    if brace_level == 0:
-                        end_index = loop_start_index
-                        break
-                loop_body_lines.append(body_line)
-                loop_start_index += 1
-
-            if brace_level == 0:
-                n = loop_unroll_counts.get(loop_header, 1)
-                unrolled_body = unroll_single_loop(loop_header, [lb.rstrip() for lb in loop_body_lines], n, indent, indent_level, loop_unroll_counts)
-                output.extend(unrolled_body)
-                i = end_index + 1
-            else:
-                output.append(f"{indent}Error: Unmatched braces in loop starting at line {i + 1}")
-                i += 1
-        else:
-            output.append(f"{indent}{line}")
-            i += 1
-    return output
-
-def unroll_single_loop(loop_header, loop_body_lines, n, indent, indent_level, loop_unroll_counts):
-    unrolled_code = []
-    if "for" in loop_header:
-        match = re.search(r"for\s*\(([^;]*);([^;]*);([^)]*)\)", loop_header)
-        if match:
-            init, cond, inc = [part.strip() for part in match.groups()]
-        else:
-            unrolled_code.append(f"{indent}Warning: Could not parse for loop header: {loop_header}")
-            return unrolled_code
-    elif "while" in loop_header:
-        match = re.search(r"while\s*\(([^)]*)\)", loop_header)
-        if match:
-            cond = match.group(1).strip()
-            init = ""
-            inc = ""
-        else:
-            unrolled_code.append(f"{indent}Warning: Could not parse while loop header: {loop_header}")
-            return unrolled_code
-    else:
-        unrolled_code.append(f"{indent}Warning: Unrecognized loop type: {loop_header}")
-        return unrolled_code
-
-    if init:
-        unrolled_code.append(f"{indent}{init};")
-
-    # Nest each iteration inside the previous one
-    current_indent_level = indent_level
-    for i in range(n):
-        current_indent = "    " * current_indent_level
-        unrolled_code.append(f"{current_indent}if ({cond}) {{")
-        inner_unrolled = unroll_loop(loop_body_lines, loop_unroll_counts, current_indent_level + 1)
-        unrolled_code.extend(inner_unrolled)
-        if inc:
-            unrolled_code.append(f"{current_indent}    {inc};")
-        current_indent_level += 1  # Increase indent for next nesting
-
-    # Close all opened braces
-    for j in reversed(range(n)):
-        closing_indent = "    " * (indent_level + j)
-        unrolled_code.append(f"{closing_indent}}}")
-
-    return unrolled_code
+    program = unroll_statements(parse_program(code_lines), loop_unroll_counts)
+    return render_program(program, indent_level)
 
 # Main program
 # print("Enter your code line by line. Press Enter on an empty line to finish:")
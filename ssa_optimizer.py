@@ -0,0 +1,258 @@
+from program_ast import (
+    Assert, Assume, Binary, BoolConst, ExprTable, Index, Num, RangeAll, SSADef, Store, Ternary, Unary, Var,
+    expr_symbols,
+)
+from instrumentation import NO_STATS
+
+def smt_div(a, b):
+    # SMT-LIB integer division keeps the remainder non-negative
+    return (a - a % abs(b)) // b
+
+ARITHMETIC = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': smt_div,
+    '%': lambda a, b: a % abs(b),
+}
+COMPARISONS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+}
+# Comparisons that hold, or fail, when both sides are the same term
+REFLEXIVE = {'==': True, '<=': True, '>=': True, '!=': False, '<': False, '>': False}
+
+def expression_size(ssa):
+    """Number of distinct expression nodes in ssa, counting shared subterms once."""
+    visited = set()
+    stack = []
+    for node in ssa:
+        if isinstance(node, SSADef):
+            stack.append(node.value)
+        elif isinstance(node, (Assert, Assume)):
+            stack.append(node.expr)
+    while stack:
+        expr = stack.pop()
+        if id(expr) in visited:
+            continue
+        visited.add(id(expr))
+        if isinstance(expr, Index):
+            stack.append(expr.index)
+        elif isinstance(expr, Unary):
+            stack.append(expr.operand)
+        elif isinstance(expr, Binary):
+            stack.extend((expr.left, expr.right))
+        elif isinstance(expr, Ternary):
+            stack.extend((expr.cond, expr.then, expr.orelse))
+        elif isinstance(expr, Store):
+            stack.extend((expr.index, expr.value))
+        elif isinstance(expr, RangeAll):
+            stack.extend((expr.bound, expr.body))
+    return len(visited)
+
+def slice_ssa(ssa):
+    """Keep only the definitions in the cone of influence of the assertions.
+
+    Walks backwards from the variables the assertions read through the
+    definitions, φ merges and branch conditions they depend on. Assumptions
+    stay, along with their own cones: a constraint on variables the assertions
+    never see can still make the whole query unsatisfiable. Definitions
+    outside the cone only fix fresh variables, so dropping them does not
+    change the verdict; calls do not reach the solver and are dropped too.
+    Arrays count as read by name, which covers the versions of the array
+    theory encoding.
+    """
+    live = set()
+    kept = []
+    for node in reversed(ssa):
+        if isinstance(node, SSADef):
+            if node.name not in live:
+                continue
+            expr_symbols(node.value, live, live)
+        elif isinstance(node, (Assert, Assume)):
+            expr_symbols(node.expr, live, live)
+        else:
+            continue
+        kept.append(node)
+    kept.reverse()
+    return kept
+
+class SSAOptimizer:
+    """Shrinks SSA nodes before they are encoded for the solver.
+
+    Definitions that fold to a constant or to another variable are replaced
+    by it in every later use (constant and copy propagation). Branch
+    variables that become constants decide their φ merges and the assertions
+    guarded by them, and definitions nothing reads any more are removed. The
+    result is equisatisfiable with the input, so verdicts do not change;
+    models only list the variables that are left.
+    """
+    def __init__(self):
+        self.exprs = ExprTable()
+        self.values = {}  # SSA name -> the constant or variable it was replaced by
+        self.stores = {}  # SSA name of an array version -> the store that defines it
+        self.memo = {}    # id(expr) -> (expr, simplified expr)
+        self.true = self.exprs.intern(BoolConst(True))
+        self.false = self.exprs.intern(BoolConst(False))
+        self.counts = {'constants': 0, 'copies': 0, 'branches': 0, 'assertions': 0, 'dead': 0}
+        self.size_before = self.size_after = (0, 0)
+
+    def optimize(self, ssa):
+        ssa = list(ssa)
+        nodes = []
+        for node in ssa:
+            if isinstance(node, SSADef):
+                value = self.simplify(node.value)
+                if isinstance(value, (Num, BoolConst, Var)):
+                    self.values[node.name] = value
+                    if isinstance(value, Var):
+                        self.counts['copies'] += 1
+                    elif node.kind == 'cond':
+                        self.counts['branches'] += 1
+                    else:
+                        self.counts['constants'] += 1
+                    continue
+                if isinstance(value, Store):
+                    self.stores[node.name] = value
+                nodes.append(SSADef(node.name, value, node.kind))
+            elif isinstance(node, (Assert, Assume)):
+                expr = self.simplify(node.expr)
+                if expr is self.true:
+                    self.counts['assertions'] += isinstance(node, Assert)
+                    continue
+                nodes.append(type(node)(expr))
+        definitions = sum(isinstance(node, SSADef) for node in nodes)
+        nodes = slice_ssa(nodes)
+        self.counts['dead'] = definitions - sum(isinstance(node, SSADef) for node in nodes)
+        self.size_before = (len(ssa), expression_size(ssa))
+        self.size_after = (len(nodes), expression_size(nodes))
+        return nodes
+
+    def simplify(self, expr):
+        cached = self.memo.get(id(expr))
+        if cached is None:
+            cached = self.memo[id(expr)] = (expr, self.exprs.intern(self.fold(expr)))
+        return cached[1]
+
+    def fold(self, expr):
+        if isinstance(expr, Var):
+            return self.values.get(expr.name, expr)
+        if isinstance(expr, Index):
+            return self.fold_select(self.array_name(expr.array), self.simplify(expr.index))
+        if isinstance(expr, Store):
+            return Store(self.array_name(expr.array), self.simplify(expr.index), self.simplify(expr.value))
+        if isinstance(expr, Unary):
+            operand = self.simplify(expr.operand)
+            if isinstance(operand, Unary) and operand.op == expr.op:
+                return operand.operand
+            if expr.op == '!' and isinstance(operand, BoolConst):
+                return BoolConst(not operand.value)
+            if expr.op == '-' and isinstance(operand, Num):
+                return Num(-operand.value)
+            return Unary(expr.op, operand)
+        if isinstance(expr, Binary):
+            return self.fold_binary(expr.op, self.simplify(expr.left), self.simplify(expr.right))
+        if isinstance(expr, Ternary):
+            cond = self.simplify(expr.cond)
+            if isinstance(cond, BoolConst):
+                # A decided branch: the other side is never looked at
+                return self.simplify(expr.then if cond.value else expr.orelse)
+            then, orelse = self.simplify(expr.then), self.simplify(expr.orelse)
+            if then is orelse:
+                return then
+            if then is self.true and orelse is self.false:
+                return cond
+            return Ternary(cond, then, orelse)
+        if isinstance(expr, RangeAll):
+            return RangeAll(expr.var, self.simplify(expr.bound), self.simplify(expr.body))
+        return expr
+
+    def array_name(self, name):
+        # An array version that became a copy of another (a decided φ) is read through that one
+        value = self.values.get(name)
+        return value.name if isinstance(value, Var) else name
+
+    def fold_select(self, array, index):
+        # Read over write: arr_2[i] with arr_2 = store(arr_1, j, v) is v if i is j, and arr_1[i] if they differ
+        store = self.stores.get(array)
+        while store is not None:
+            if store.index is index:
+                return store.value
+            if not (isinstance(index, Num) and isinstance(store.index, Num)):
+                break
+            array = store.array
+            store = self.stores.get(array)
+        return Index(array, index)
+
+    def fold_binary(self, op, left, right):
+        if isinstance(left, Num) and isinstance(right, Num):
+            if op in COMPARISONS:
+                return BoolConst(COMPARISONS[op](left.value, right.value))
+            if right.value or op not in ('/', '%'):
+                return Num(ARITHMETIC[op](left.value, right.value))
+        if isinstance(left, BoolConst) and isinstance(right, BoolConst) and op in ('==', '!='):
+            return BoolConst((left.value == right.value) == (op == '=='))
+        if op == '&&':
+            if left is self.false or right is self.false:
+                return self.false
+            if left is self.true or left is right:
+                return right
+            if right is self.true:
+                return left
+        elif op == '||':
+            if left is self.true or right is self.true:
+                return self.true
+            if left is self.false or left is right:
+                return right
+            if right is self.false:
+                return left
+        elif left is right and op in REFLEXIVE:
+            return BoolConst(REFLEXIVE[op])
+        elif left is right and op == '-':
+            return Num(0)
+        elif op in ('+', '-') and isinstance(right, Num) and right.value == 0:
+            return left
+        elif op == '+' and isinstance(left, Num) and left.value == 0:
+            return right
+        elif op == '*' and isinstance(left, Num) and left.value in (0, 1):
+            return right if left.value else left
+        elif op == '*' and isinstance(right, Num) and right.value in (0, 1):
+            return left if right.value else right
+        return Binary(op, left, right)
+
+    def report(self):
+        """Summary lines of what the pass did and how much smaller the formula got."""
+        (nodes_before, size_before), (nodes_after, size_after) = self.size_before, self.size_after
+
+        def shrink(before, after):
+            return f"{before} -> {after} ({100 - after * 100 // before if before else 0}% smaller)"
+
+        counts = self.counts
+        return [
+            "=== SSA OPTIMIZATION ===",
+            f"SSA nodes:               {shrink(nodes_before, nodes_after)}",
+            f"Expression nodes:        {shrink(size_before, size_after)}",
+            f"Constants propagated:    {counts['constants']}",
+            f"Copies propagated:       {counts['copies']}",
+            f"Branches decided:        {counts['branches']}",
+            f"Assertions discharged:   {counts['assertions']}",
+            f"Dead definitions:        {counts['dead']}",
+        ]
+
+def slice_with_stats(ssa, stats=NO_STATS):
+    with stats.stage('slice'):
+        sliced = slice_ssa(ssa)
+    stats.count('sliced ssa nodes', len(sliced))
+    return sliced
+
+def optimize_ssa(ssa, stats=NO_STATS):
+    """Run the SSAOptimizer over ssa; return (optimized nodes, report lines)."""
+    optimizer = SSAOptimizer()
+    with stats.stage('optimize'):
+        optimized = optimizer.optimize(ssa)
+    stats.count('optimized ssa nodes', len(optimized))
+    return optimized, optimizer.report()
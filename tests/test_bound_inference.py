@@ -0,0 +1,69 @@
+import itertools
+import pytest
+from program_ast import parse_program
+from singleStaticForm import infer_loop_bounds
+
+def bounds(*lines, **options):
+    return infer_loop_bounds(parse_program(list(lines)), **options)
+
+@pytest.mark.parametrize('lines, expected', [
+    (["for (i := 0; i < 10; i := i + 1) {", "s := s + i;", "}"], {"for (i := 0; i < 10; i := i + 1)": 10}),
+    (["for (i := 1; i <= 10; i := i + 3) {", "s := s + i;", "}"], {"for (i := 1; i <= 10; i := i + 3)": 4}),
+    (["i := 10;", "while (i > 0) {", "i := i - 2;", "}"], {"while (i > 0)": 5}),
+    (["n := 4;", "for (i := 0; 2 * n > i; i := i + 1) {", "s := s + i;", "}"],
+     {"for (i := 0; 2 * n > i; i := i + 1)": 8}),
+    (["for (i := 5; i < 3; i := i + 1) {", "s := s + i;", "}"], {"for (i := 5; i < 3; i := i + 1)": 0}),
+    (["for (i := 0; i < 3; i := i + 1) {", "for (j := 0; j < 4; j := j + 1) {", "s := s + j;", "}", "}"],
+     {"for (i := 0; i < 3; i := i + 1)": 3, "for (j := 0; j < 4; j := j + 1)": 4}),
+])
+def test_constant_trip_counts(lines, expected):
+    assert bounds(*lines) == expected
+
+@pytest.mark.parametrize('lines', [
+    # Symbolic limit
+    ["for (i := 0; i < n; i := i + 1) {", "s := s + i;", "}"],
+    # Unknown start
+    ["while (i < 10) {", "i := i + 1;", "}"],
+    # The counter also changes in the body
+    ["for (i := 0; i < 10; i := i + 1) {", "i := i + s;", "}"],
+    # The update does not run on every iteration
+    ["i := 0;", "while (i < 10) {", "if (s > 0) {", "i := i + 1;", "}", "}"],
+    # The limit changes inside the loop
+    ["n := 5;", "for (i := 0; i < n; i := i + 1) {", "n := n + 1;", "}"],
+    # The counter moves away from the limit
+    ["for (i := 0; i < 10; i := i - 1) {", "s := s + i;", "}"],
+    # Only set on one side of a branch
+    ["if (a > 0) {", "i := 0;", "}", "while (i < 3) {", "i := i + 1;", "}"],
+])
+def test_non_constant_trip_counts_are_left_out(lines):
+    assert bounds(*lines) == {}
+
+def test_counter_value_carries_to_the_next_loop():
+    lines = ["i := 0;", "while (i < 3) {", "i := i + 1;", "}", "while (i < 5) {", "i := i + 1;", "}"]
+    assert bounds(*lines) == {"while (i < 3)": 3, "while (i < 5)": 2}
+
+def test_header_with_different_counts_is_left_out():
+    lines = ["i := 0;", "while (i < 3) {", "i := i + 1;", "}", "i := 1;", "while (i < 3) {", "i := i + 1;", "}"]
+    assert bounds(*lines) == {}
+
+def test_max_trip_count():
+    lines = ["for (i := 0; i < 50; i := i + 1) {", "s := s + i;", "}"]
+    assert bounds(*lines, max_trip_count=49) == {}
+    assert bounds(*lines, max_trip_count=50) == {"for (i := 0; i < 50; i := i + 1)": 50}
+
+def simulate(start, step, op, limit, max_trips):
+    compare = {'<': int.__lt__, '<=': int.__le__, '>': int.__gt__, '>=': int.__ge__, '==': int.__eq__,
+               '!=': int.__ne__}[op]
+    value, trips = start, 0
+    while compare(value, limit):
+        if trips == max_trips:
+            return None
+        value, trips = value + step, trips + 1
+    return trips
+
+def test_inferred_counts_match_execution():
+    for start, step, op, limit in itertools.product(range(-3, 4), (-2, -1, 1, 3), ('<', '<=', '>', '>=', '==', '!='),
+                                                    range(-4, 5, 2)):
+        header = f"for (i := {start}; i {op} {limit}; i := i + {step})"
+        inferred = bounds(header + " {", "s := s + i;", "}", max_trip_count=20).get(header)
+        assert inferred == simulate(start, step, op, limit, 20), header
@@ -0,0 +1,31 @@
+import pytest
+from equivalence import check_equivalence, rename_vars
+from program_ast import Binary, Var, parse_program
+
+def shared_chain(depth):
+    # x + x, (x + x) + (x + x), ...: a tree of 2 ** depth leaves that shares every level
+    expr = Var('x')
+    for _ in range(depth):
+        expr = Binary('+', expr, expr)
+    return expr
+
+def test_shared_subterms_are_renamed_once():
+    renamed = rename_vars(shared_chain(80), {'x': 'p1!x'})
+    for _ in range(80):
+        assert renamed.left is renamed.right
+        renamed = renamed.left
+    assert renamed == Var('p1!x')
+
+def test_deep_terms_do_not_recurse():
+    expr = Var('x')
+    for k in range(20000):
+        expr = Binary('+', expr, Var('y')) if k % 2 else Binary('*', Var('y'), expr)
+    renamed = rename_vars(expr, {'y': 'z'})
+    assert renamed.op == '+' and renamed.right == Var('z')
+
+@pytest.mark.parametrize('steps', (1, 50))
+def test_doubling_chains(steps):
+    doubled = parse_program(["x := x + x;"] * steps)
+    shifted = parse_program([f"x := x * {2 ** steps};"])
+    assert check_equivalence(doubled, shifted, ['x'])[0]
+    assert not check_equivalence(doubled, parse_program(["x := x + 1;"] * steps), ['x'])[0]
@@ -0,0 +1,29 @@
+import pytest
+from live_analysis import LiveAnalyzer
+
+BASE = ["s := 0;", "for (i := 0; i < 3; i := i + 1) {", "s := s + i;", "}", "x := a;", "if (x > 0) {", "s := s + x;",
+        "}"]
+
+def edits(count):
+    # Alternate the tail of the program, like someone editing its last lines
+    for k in range(count):
+        yield BASE + [f"y := s + {k};", f"assert(y >= {k % 3});"]
+
+@pytest.mark.parametrize('array_theory', (False, True))
+def test_verdicts_match_a_fresh_analysis(array_theory):
+    live = LiveAnalyzer(array_theory=array_theory)
+    for code in edits(6):
+        entry = live.update(code)
+        fresh = LiveAnalyzer(array_theory=array_theory).update(code)
+        assert entry['verdict'][0] == fresh['verdict'][0]
+        # s := 0, the for loop, x := a and the if are the blocks kept
+        assert entry['reused'] in (0, 4)
+
+def test_state_does_not_grow_with_edits():
+    live = LiveAnalyzer()
+    sizes = []
+    for code in edits(60):
+        live.update(code)
+        sizes.append((len(live.checker.literals), len(live.z3.terms), len(live.z3.constants)))
+    assert sizes[-1] == sizes[1]
+    assert not live.checker.literals
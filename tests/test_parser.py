@@ -0,0 +1,96 @@
+import pytest
+from program_ast import (
+    Binary, Num, RangeAll, Ternary, Unary, Var, parse_expr, parse_program, parse_ssa, render_expr,
+    render_program, render_ssa,
+)
+from singleStaticForm import build_ssa
+from z3_convertor import convert_expr_to_smt
+
+EXPRESSIONS = [
+    "a + b * c",
+    "(a + b) * c",
+    "a - b - c",
+    "a - (b - c)",
+    "a - -3",
+    "-x * 2",
+    "-(x + 1)",
+    "!a && b || c",
+    "!(a && (b || c))",
+    "a % 3 != 0 || !b",
+    "c ? x : d ? y : z",
+    "(c ? x : y) + 1",
+    "arr[i + 1] >= arr[(i * 2) % n]",
+    "store(arr, i, v + 1)",
+    "for (i in range (n)):arr[i] <= max",
+    "(for (i in range (n)):arr[i] > 0) && x > 0",
+    "y && (for (i in range (n)):arr[i] > 0) || c",
+    "((for (i in range (n)):arr[i] > 0) ? p : q)",
+    "!(for (i in range (n + 1)):arr[i] != 0)",
+]
+
+def test_precedence_and_associativity():
+    a, b, c = Var('a'), Var('b'), Var('c')
+    assert parse_expr("a + b * c") == Binary('+', a, Binary('*', b, c))
+    assert parse_expr("a - b - c") == Binary('-', Binary('-', a, b), c)
+    assert parse_expr("!a && b") == Binary('&&', Unary('!', a), b)
+    assert parse_expr("a - -3") == Binary('-', a, Num(-3))
+    assert parse_expr("c ? a : b ? a : c") == Ternary(c, a, Ternary(b, a, c))
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_expression_round_trip(text):
+    expr = parse_expr(text)
+    assert parse_expr(render_expr(expr)) == expr
+
+def test_range_quantifier_operand_keeps_its_body():
+    quantifier = parse_expr("for (i in range (n)):arr[i] > 0")
+    conjunction = Binary('&&', quantifier, parse_expr("x > 0"))
+    parsed = parse_expr(render_expr(conjunction))
+    assert parsed == conjunction
+    assert isinstance(parsed.left, RangeAll)
+
+@pytest.mark.parametrize('text', ["(a + b", "a ? b", "a +", "a b", ")"])
+def test_malformed_expression_is_rejected(text):
+    with pytest.raises(ValueError):
+        parse_expr(text)
+
+def test_deep_nesting_does_not_recurse():
+    depth = 20000
+    expr = parse_expr("(" * depth + "x + 1" + ")" * depth)
+    assert expr == Binary('+', Var('x'), Num(1))
+    nested = "x_0"
+    for k in range(depth):
+        nested = f"(φ{k + 1} ? {nested} : x_{k + 1})"
+    assert convert_expr_to_smt(nested).startswith(f"(ite phi{depth} (ite phi{depth - 1} ")
+
+def test_smt_conversion():
+    assert (convert_expr_to_smt("(φ1 ? x_1 + 2 * y : -z) >= arr[i] && !(b || c)") ==
+            "(and (>= (ite phi1 (+ x_1 (* 2 y)) (- z)) (select arr i)) (not (or b c)))")
+
+PROGRAM = [
+    "s := 0;",
+    "for (i := 0; i < n; i := i + 1) {",
+    "if (arr[i] > max) {",
+    "max := arr[i];",
+    "} else if (arr[i] < 0) {",
+    "s := s - arr[i];",
+    "} else {",
+    "s := s + 1;",
+    "}",
+    "}",
+    "while (s > 10) {",
+    "s := s - 2;",
+    "}",
+    "assume(n >= 1);",
+    "assert(for (i in range (n)):arr[i] <= max);",
+]
+
+def test_program_round_trip():
+    program = parse_program(PROGRAM)
+    assert parse_program(render_program(program)) == program
+
+def test_ssa_round_trip():
+    program = parse_program(["x := 0;", "if (a > 0) {", "x := a * 2;", "arr[x] := 1;", "} else if (a < -3) {",
+                             "x := -a;", "}", "assume(x != 7);", "assert(x >= 0 && arr[1] != 2);"])
+    for array_theory in (False, True):
+        ssa = build_ssa(program, array_theory)
+        assert parse_ssa(render_ssa(ssa)) == ssa
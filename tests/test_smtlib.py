@@ -0,0 +1,34 @@
+import io
+import pytest
+from program_ast import parse_program
+from singleStaticForm import build_ssa
+from z3_convertor import check_ssa_with_z3, check_with_z3, convert_ssa_to_smtlib, write_smtlib
+
+PROGRAMS = [
+    ["x := a;", "assume(a > 2);", "assert(x > 2);"],
+    ["assert(x > 0);"],
+    ["x := 1;", "assert(x > 1);"],
+    # The last assert of the script is an assumption, not the property
+    ["x := 1;", "assume(y > 0);", "z := x + y;"],
+    ["x := 1;", "assume(x > 5);", "y := 2;"],
+    ["arr[i] := 3;", "if (a > 0) {", "x := arr[i];", "}", "assert(x == 3 || a <= 0);", "assert(x >= 0 || a > 0);"],
+]
+
+@pytest.mark.parametrize('array_theory', (False, True))
+@pytest.mark.parametrize('lines', PROGRAMS)
+def test_script_verdict_matches_direct_check(lines, array_theory):
+    ssa = build_ssa(parse_program(lines), array_theory)
+    expected = check_ssa_with_z3(ssa, array_theory=array_theory)
+    script = convert_ssa_to_smtlib(ssa, array_theory)
+    streamed = io.StringIO()
+    write_smtlib(ssa, streamed, array_theory)
+    for is_sat, output in (check_with_z3(*script), check_with_z3(streamed.getvalue(), None, None)):
+        assert is_sat == expected[0]
+        assert output[0] == expected[1][0]
+
+def test_script_without_property():
+    is_sat, output = check_with_z3("(declare-const x Int)\n(assert (> x 1))", {}, set())
+    assert is_sat
+    assert output[-1] == "No assertions to check."
+    assert check_with_z3("", {}, set()) == (True, ["Satisfiable. Model where assertions hold:",
+                                                   "No assertions to check."])
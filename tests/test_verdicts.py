@@ -0,0 +1,85 @@
+import pytest
+from batch_verify import check_program, verify_file
+from verify_server import serve_request
+
+MODES = ('verify', 'bmc', 'split')
+
+SAFE = ["x := 1;", "if (a > 0) {", "x := x + a;", "}", "assert(x > 0);"]
+# x is an input, so the assertion can hold but does not have to
+UNSAFE = ["assert(x > 0);"]
+# Nonlinear, so a tiny resource limit stops the solver before it decides
+HARD = ["x := a * a;", "y := b * b;", "assert(x + y >= 2 * a * b);"]
+LOOP = ["s := 0;", "for (i := 0; i < 5; i := i + 1) {", "s := s + i;", "}", "assert(s == 10);"]
+
+def check(code, mode, **options):
+    return check_program(code, mode, options.pop('bound', 3), {}, None, **options)
+
+@pytest.mark.parametrize('mode', MODES)
+def test_safe_program_passes(mode):
+    record = check(SAFE, mode)
+    assert record['status'] == 'safe'
+    assert record['passed']
+
+@pytest.mark.parametrize('mode', MODES)
+def test_assertion_that_can_fail_is_a_counterexample(mode):
+    record = check(UNSAFE, mode)
+    assert record['status'] == 'counterexample'
+    assert not record['passed']
+    assert record['output'][0].startswith("Counterexample")
+
+@pytest.mark.parametrize('mode', MODES)
+def test_undecided_program_does_not_pass(mode):
+    record = check(HARD, mode, rlimit=10)
+    assert record['status'] == 'unknown'
+    assert not record['passed']
+
+@pytest.mark.parametrize('mode', MODES)
+def test_hard_program_is_safe_without_a_limit(mode):
+    assert check(HARD, mode)['status'] == 'safe'
+
+# A loop nested in an if ahead of the first top-level loop
+NESTED_LOOP_FIRST = ["x := 0;", "if (a > 0) {", "while (x < a) {", "x := x + 1;", "}", "}",
+                     "i := 0;", "while (i < 3) {", "i := i + 1;", "}"]
+
+@pytest.mark.parametrize('arrays', ('scalar', 'theory'))
+@pytest.mark.parametrize('mode', MODES)
+def test_loop_nested_before_the_first_loop(mode, arrays):
+    assert check(NESTED_LOOP_FIRST + ["assert(x >= 0);"], mode, arrays=arrays)['status'] == 'safe'
+    record = check(NESTED_LOOP_FIRST + ["assert(x < 2);"], mode, arrays=arrays)
+    assert record['status'] == 'counterexample'
+
+@pytest.mark.parametrize('mode', ('verify', 'split'))
+def test_inferred_loop_bound_proves_exact_result(mode):
+    record = check(LOOP, mode, bound=1)
+    assert record['status'] == 'safe'
+    assert record['loops'] == {"for (i := 0; i < 5; i := i + 1)": 5}
+
+@pytest.mark.parametrize('options', [{'optimize': True}, {'slicing': False}, {'arrays': 'theory'},
+                                     {'portfolio': True}])
+def test_verify_options_keep_the_verdict(options):
+    assert check(SAFE, 'verify', **options)['status'] == 'safe'
+    assert check(UNSAFE, 'verify', **options)['status'] == 'counterexample'
+
+def test_split_on_several_workers_finds_the_failing_path():
+    code = ["x := 0;", "if (a > 0) {", "x := 1;", "} else {", "x := -1;", "}",
+            "if (b > 0) {", "x := x + 1;", "}", "assert(x > 0);"]
+    record = check(code, 'split', split_jobs=2)
+    assert record['status'] == 'counterexample'
+    assert record['output'][0].startswith("Counterexample on path")
+    assert check(SAFE, 'split', split_jobs=2)['status'] == 'safe'
+
+@pytest.mark.parametrize('mode', MODES)
+def test_verify_file_records_match_the_exit_code(tmp_path, mode):
+    for name, code in (('safe', SAFE), ('unsafe', UNSAFE)):
+        path = tmp_path / f"{name}.txt"
+        path.write_text("\n".join(code) + "\n")
+        record = verify_file(str(path), mode)
+        assert record['passed'] == (record['status'] == 'safe') == (name == 'safe')
+
+@pytest.mark.parametrize('mode', MODES)
+def test_server_reports_the_same_verdicts(mode):
+    assert serve_request({'code': "\n".join(SAFE), 'mode': mode})['status'] == 'safe'
+    record = serve_request({'code': UNSAFE, 'mode': mode, 'id': 7})
+    assert record['id'] == 7
+    assert record['status'] == 'counterexample'
+    assert record['models'][0]['x'] <= 0
@@ -0,0 +1,275 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from batch_verify import check_program, init_worker, loop_bounds, run_with_deadline
+from program_ast import parse_program, render_ssa
+from singleStaticForm import QUANTIFIER_STRATEGIES, build_ssa, unroll_statements
+
+MODES = ('verify', 'bmc', 'split', 'ssa')
+
+# Options a request may set, with their defaults; anything else is rejected
+REQUEST_OPTIONS = {
+    'mode': 'verify', 'bound': 1, 'bounds': None, 'timeout': None, 'rlimit': None, 'portfolio': False,
+    'optimize': False, 'slicing': True, 'arrays': 'scalar', 'quantifiers': 'expand', 'infer_bounds': True,
+    'split_jobs': None,
+}
+
+# A program small enough to load every part of Z3 the pipeline uses
+WARM_UP_PROGRAM = ["x := 0;", "while (x < n) {", "x := x + 1;", "}", "assert(x >= 0);"]
+
+def split_code(code):
+    lines = code.splitlines() if isinstance(code, str) else code
+    return [line.strip() for line in lines if line.strip()]
+
+def init_warm_worker():
+    # Runs once in every worker before it takes a request, so no request pays for starting Z3
+    init_worker()
+    serve_request({'code': WARM_UP_PROGRAM, 'bound': 2})
+
+def worker_pid(_):
+    return os.getpid()
+
+def ssa_record(code_lines, bound, bounds, array_theory, quantifiers, infer_bounds):
+    program = parse_program(code_lines)
+    counts, inferred = loop_bounds(program, bound, bounds, infer_bounds)
+    ssa = build_ssa(unroll_statements(program, counts, exact_counts=inferred), array_theory, quantifiers)
+    return {'status': 'ok', 'passed': True, 'loops': counts, 'ssa': render_ssa(ssa)}
+
+def serve_request(request):
+    """Handle one program of a batch in a worker; request has 'code' plus REQUEST_OPTIONS."""
+    record = {'id': request['id']} if 'id' in request else {}
+    options = {name: request.get(name, default) for name, default in REQUEST_OPTIONS.items()}
+    mode, bound, bounds = options['mode'], options['bound'], options['bounds'] or {}
+
+    def work(ctx):
+        code_lines = split_code(request['code'])
+        if mode == 'ssa':
+            return ssa_record(code_lines, bound, bounds, options['arrays'] == 'theory', options['quantifiers'],
+                              options['infer_bounds'])
+        return check_program(code_lines, mode, bound, bounds, ctx, options['rlimit'], options['portfolio'],
+                             options['timeout'], None, options['optimize'], options['slicing'], options['arrays'],
+                             options['quantifiers'], options['infer_bounds'], options['split_jobs'])
+
+    record = run_with_deadline(work, record, options['timeout'])
+    models = parse_models(record.get('output', ()))
+    if models:
+        record['models'] = models
+    return record
+
+def parse_value(text):
+    if text in ('True', 'False'):
+        return text == 'True'
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+def parse_models(output):
+    """Turn the model listings in a verdict's output lines into a list of {name: value} dicts.
+
+    Integers and booleans are converted; other values (array and function
+    interpretations) are kept as Z3 prints them.
+    """
+    models = []
+    model = None
+    for line in (part for entry in output for part in entry.split("\n")):
+        if line.startswith("  ") and " = " in line and model is not None:
+            name, value = line.strip().split(" = ", 1)
+            model[name] = parse_value(value)
+        elif line.endswith(":"):
+            model = {}
+            models.append(model)
+        else:
+            model = None
+    return [model for model in models if model]
+
+def is_count(value):
+    # bool is an int subclass, but true is not a bound
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def validate_request(request):
+    if not isinstance(request, dict):
+        raise ValueError("Every request must be a JSON object")
+    if not isinstance(request.get('code'), (str, list)):
+        raise ValueError("Every request needs 'code', the program as a string or a list of lines")
+    unknown = set(request) - set(REQUEST_OPTIONS) - {'code', 'id'}
+    if unknown:
+        raise ValueError(f"Unknown request fields: {', '.join(sorted(unknown))}")
+    if request.get('mode', 'verify') not in MODES:
+        raise ValueError(f"Unknown mode: {request['mode']}")
+    if request.get('arrays', 'scalar') not in ('scalar', 'theory'):
+        raise ValueError(f"Unknown array encoding: {request['arrays']}")
+    if request.get('quantifiers', 'expand') not in QUANTIFIER_STRATEGIES:
+        raise ValueError(f"Unknown quantifier strategy: {request['quantifiers']}")
+    if not is_count(request.get('bound', 1)):
+        raise ValueError("'bound' must be a non-negative integer")
+    for name in ('rlimit', 'split_jobs'):
+        if request.get(name) is not None and not is_count(request[name]):
+            raise ValueError(f"'{name}' must be a non-negative integer")
+    timeout = request.get('timeout')
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout < 0):
+        raise ValueError("'timeout' must be a non-negative number of seconds")
+    bounds = request.get('bounds')
+    if bounds is not None and (not isinstance(bounds, dict) or not all(map(is_count, bounds.values()))):
+        raise ValueError("'bounds' must map loop headers to non-negative integers")
+    for name in ('portfolio', 'optimize', 'slicing', 'infer_bounds'):
+        if not isinstance(request.get(name, False), bool):
+            raise ValueError(f"'{name}' must be true or false")
+
+class VerificationService:
+    """A pool of worker processes that have Z3 loaded, shared by every client.
+
+    Workers are started and warmed up once, and each keeps its Z3 context
+    between requests like batch_verify's workers. Every program is checked
+    under its own deadline (its 'timeout', or default_timeout), and the
+    programs of a batch run in parallel. A pool whose worker died is
+    replaced for the next batch.
+    """
+    def __init__(self, jobs=None, default_timeout=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.default_timeout = default_timeout
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.served = 0
+        self.pool = self.start_pool()
+
+    def start_pool(self):
+        # spawn, because forking a process that already runs server threads is unsafe
+        pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=init_warm_worker)
+        # Workers are spawned on demand; one task each, submitted at once, starts all of them now
+        list(pool.map(worker_pid, range(self.jobs)))
+        return pool
+
+    def verify(self, requests):
+        """Check a batch of requests and return their records in the same order."""
+        for request in requests:
+            validate_request(request)
+        if self.default_timeout is not None:
+            requests = [dict({'timeout': self.default_timeout}, **request) for request in requests]
+        with self.lock:
+            pool = self.pool
+        try:
+            records = list(pool.map(serve_request, requests))
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = self.start_pool()
+            raise RuntimeError("A worker process died; the pool has been restarted")
+        with self.lock:
+            self.served += len(records)
+        return records
+
+    def health(self):
+        return {'status': 'ok', 'workers': self.jobs, 'served': self.served,
+                'uptime': round(time.time() - self.started, 3)}
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """POST /verify takes one request object or {"requests": [...]}; GET /health reports the pool."""
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket clients have no host address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        self.send_json(200, self.server.service.health())
+
+    def do_POST(self):
+        if self.path != '/verify':
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            batched = isinstance(payload, dict) and 'requests' in payload
+            requests = payload['requests'] if batched else [payload]
+            if not isinstance(requests, list):
+                raise ValueError("'requests' must be a list")
+            records = self.server.service.verify(requests)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, {'results': records} if batched else records[0])
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+def make_server(service, host='127.0.0.1', port=8765, unix_socket=None, verbose=False):
+    if unix_socket:
+        server = UnixHTTPServer(unix_socket, RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+def stop_serving(signum, frame):
+    # A service manager stops the server with SIGTERM; shut down like on Ctrl-C
+    raise KeyboardInterrupt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve verification requests as JSON over HTTP from warm workers.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument('--jobs', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--timeout', type=float, help="seconds allowed per program unless a request sets its own")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+    if args.socket and not hasattr(socket, 'AF_UNIX'):
+        parser.error("Unix sockets are not available on this platform")
+
+    service = VerificationService(args.jobs, args.timeout)
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    signal.signal(signal.SIGTERM, stop_serving)
+    print(f"Serving verification on {where} with {service.jobs} workers", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
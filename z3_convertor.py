@@ -1,265 +1,570 @@
-import re
+import multiprocessing
+import queue
 from z3 import *
+from program_ast import (
+    Assert, Assume, Binary, BoolConst, Index, Num, RangeAll, SSADef, Store, Ternary, Unary, Var,
+    expr_symbols, parse_expr, parse_ssa, render_expr,
+)
+from instrumentation import NO_STATS
 
-# Operator precedence and SMT operator mapping
-precedence = {
-    '==': 1, '!=': 1, '>': 1, '<': 1, '>=': 1, '<=': 1,
-    '+': 2, '-': 2,
-    '*': 3, '/': 3, '%': 3
-}
-
+# SMT-LIB function for every binary operator of the language
 smt_op_map = {
     '+': '+', '-': '-', '*': '*', '/': 'div', '%': 'mod',
-    '==': '=', '!=': 'distinct', '>': '>', '<': '<', '>=': '>=', '<=': '<='
+    '==': '=', '!=': 'distinct', '>': '>', '<': '<', '>=': '>=', '<=': '<=',
+    '&&': 'and', '||': 'or',
 }
 
-def tokenize(expr):
-    # Split by operators, parentheses, and whitespace
-    return re.findall(r'\w+|==|!=|>=|<=|[+\-*/%()<>]', expr)
-
-def validate_parentheses(expr):
-    """Check if parentheses in the expression are balanced."""
-    balance = 0
-    for char in expr:
-        if char == '(':
-            balance += 1
-        elif char == ')':
-            balance -= 1
-        if balance < 0:
-            return False
-    return balance == 0
-
-def infix_to_postfix(tokens):
-    output = []
-    stack = []
-    for token in tokens:
-        if token in precedence:
-            while (stack and stack[-1] in precedence and
-                   precedence[token] <= precedence[stack[-1]]):
-                output.append(stack.pop())
-            stack.append(token)
-        elif token == '(':
-            stack.append(token)
-        elif token == ')':
-            while stack and stack[-1] != '(':
-                output.append(stack.pop())
-            if stack and stack[-1] == '(':
-                stack.pop()  # Remove '(' if it exists
-            else:
-                raise ValueError("Mismatched parentheses: extra closing parenthesis")
-        else:
-            output.append(token)
+def convert_expr_to_smt(expr, declarations=None):
+    """Convert one SSA expression in the tool's syntax to an SMT-LIB term.
+
+    The text is tokenized once and parsed by program_ast's precedence
+    climbing parser, so ternaries, comparisons, arithmetic, unary minus and
+    negation, && and || and array reads are all handled in time linear in
+    the length of expr. declarations is accepted for compatibility; sorts
+    are not needed to render a term.
+    """
+    if not expr.strip():
+        raise ValueError("Empty expression provided")
+    try:
+        return "".join(iter_smt_text(parse_expr(expr)))
+    except ValueError as e:
+        raise ValueError(f"Failed to convert expression to SMT: {expr} (Error: {e})")
+
+BOOL_OPS = {'==', '!=', '>', '<', '>=', '<=', '&&', '||'}
+
+def smt_name(name):
+    return name.replace('φ', 'phi')
+
+COMPOUND_EXPRS = (Unary, Binary, Ternary, Index, Store, RangeAll)
+
+def expr_children(expr):
+    if isinstance(expr, (Index, Unary)):
+        return (expr.index if isinstance(expr, Index) else expr.operand,)
+    if isinstance(expr, Binary):
+        return expr.left, expr.right
+    if isinstance(expr, Ternary):
+        return expr.cond, expr.then, expr.orelse
+    if isinstance(expr, Store):
+        return expr.index, expr.value
+    return expr.bound, expr.body
+
+def expr_to_smt(expr, memo=None):
+    """Render an expression node as an SMT-LIB term.
+
+    memo maps id(node) to (node, term) so shared subterms of an expression
+    DAG are rendered once; pass the same dict to share work between calls.
+    Subterms are rendered bottom-up from an explicit stack, so deeply
+    nested expressions do not hit the recursion limit.
+    """
+    if memo is None:
+        memo = {}
+    if isinstance(expr, COMPOUND_EXPRS):
+        stack = [expr]
+        while stack:
+            node = stack[-1]
+            if id(node) in memo:
+                stack.pop()
+                continue
+            pending = [child for child in expr_children(node)
+                       if isinstance(child, COMPOUND_EXPRS) and id(child) not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            memo[id(node)] = (node, compound_to_smt(node, memo))
+        return memo[id(expr)][1]
+    if isinstance(expr, Num):
+        return str(expr.value) if expr.value >= 0 else f"(- {-expr.value})"
+    if isinstance(expr, BoolConst):
+        return 'true' if expr.value else 'false'
+    if isinstance(expr, Var):
+        return smt_name(expr.name)
+    raise TypeError(f"Not an expression: {expr!r}")
+
+def smt_head(expr):
+    # The function applied by a compound term, with any array name it takes first
+    if isinstance(expr, Index):
+        return f"select {expr.array}"
+    if isinstance(expr, Unary):
+        return 'not' if expr.op == '!' else '-'
+    if isinstance(expr, Binary):
+        return smt_op_map[expr.op]
+    if isinstance(expr, Store):
+        return f"store {expr.array}"
+    return 'ite'
+
+def iter_smt_text(expr):
+    """Yield the SMT-LIB term of an expression tree in pieces.
+
+    Unlike expr_to_smt, no subterm is turned into a string of its own, so
+    the pieces add up to the term in time linear in its size however deep
+    it is nested. Shared subterms are written out every time they occur;
+    use expr_to_smt for DAGs.
+    """
+    stack = [expr]
     while stack:
-        if stack[-1] == '(':
-            raise ValueError("Mismatched parentheses: unclosed parenthesis")
-        output.append(stack.pop())
-    return output
-
-def postfix_to_smt(postfix):
-    stack = []
-    for token in postfix:
-        if token in smt_op_map:
-            b = stack.pop()
-            a = stack.pop()
-            stack.append(f"({smt_op_map[token]} {a} {b})")
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, COMPOUND_EXPRS) and not isinstance(item, RangeAll):
+            yield f"({smt_head(item)}"
+            stack.append(")")
+            for child in reversed(expr_children(item)):
+                stack.append(child)
+                stack.append(" ")
         else:
-            stack.append(token)
-    return stack[0] if stack else ""
-
-def infix_to_smt(expr):
-    tokens = tokenize(expr)
-    postfix = infix_to_postfix(tokens)
-    return postfix_to_smt(postfix)
-
-def parse_ssa_line(line):
-    # Ignore assert and assume lines (handled elsewhere)
-    if line.strip().startswith("assert") or line.strip().startswith("assume"):
-        return None, None
-
-    # Use regex to split on the first "=" not part of "=="
-    match = re.match(r'^([^=]+?)\s*=\s*(.+)$', line)
-    if not match:
-        raise ValueError(f"Invalid SSA line format (could not parse): {line}")
-    var, expr = match.group(1), match.group(2)
-    return var.strip(), expr.strip()
-
-def infer_type(expr):
-    if re.search(r"\btrue\b|\bfalse\b", expr.lower()):
+            yield expr_to_smt(item)
+
+def compound_to_smt(expr, memo):
+    if isinstance(expr, Index):
+        return f"(select {expr.array} {expr_to_smt(expr.index, memo)})"
+    if isinstance(expr, Unary):
+        return f"({'not' if expr.op == '!' else '-'} {expr_to_smt(expr.operand, memo)})"
+    if isinstance(expr, Binary):
+        return f"({smt_op_map[expr.op]} {expr_to_smt(expr.left, memo)} {expr_to_smt(expr.right, memo)})"
+    if isinstance(expr, Store):
+        return f"(store {expr.array} {expr_to_smt(expr.index, memo)} {expr_to_smt(expr.value, memo)})"
+    if isinstance(expr, RangeAll):
+        var = smt_name(expr.var)
+        body = (f"(=> (and (<= 0 {var}) (< {var} {expr_to_smt(expr.bound, memo)})) "
+                f"{expr_to_smt(expr.body, memo)})")
+        patterns = " ".join(f":pattern ({expr_to_smt(read, memo)})" for read in quantifier_patterns(expr))
+        if patterns:
+            body = f"(! {body} {patterns})"
+        return f"(forall (({var} Int)) {body})"
+    return f"(ite {expr_to_smt(expr.cond, memo)} {expr_to_smt(expr.then, memo)} {expr_to_smt(expr.orelse, memo)})"
+
+def quantifier_patterns(expr):
+    """The array reads in the body of a range assertion whose index uses its variable.
+
+    They become the trigger patterns of the bounded quantifier, so it is
+    only instantiated for the elements the rest of the formula reads.
+    """
+    reads = []
+    stack = [expr.body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Index):
+            if expr.var in expr_symbols(node.index)[0] and node not in reads:
+                reads.append(node)
+            stack.append(node.index)
+        elif isinstance(node, Unary):
+            stack.append(node.operand)
+        elif isinstance(node, Binary):
+            stack.extend((node.left, node.right))
+        elif isinstance(node, Ternary):
+            stack.extend((node.cond, node.then, node.orelse))
+    return reads
+
+def expr_sort(expr, declarations):
+    if isinstance(expr, BoolConst):
         return 'Bool'
-    if '?' in expr and ':' in expr:
-        return 'Int'
-    if re.search(r"[<>]|==|!=|>=|<=", expr):
+    if isinstance(expr, Binary):
+        return 'Bool' if expr.op in BOOL_OPS else 'Int'
+    if isinstance(expr, Unary):
+        return 'Bool' if expr.op == '!' else 'Int'
+    if isinstance(expr, RangeAll):
         return 'Bool'
-    if 'select arr' in expr:
-        return 'Int'
+    if isinstance(expr, Ternary):
+        return expr_sort(expr.then, declarations)
+    if isinstance(expr, Store):
+        return ARRAY_SORT
+    if isinstance(expr, Var):
+        name = smt_name(expr.name)
+        return declarations.get(name) or ('Bool' if name.startswith('phi') else 'Int')
     return 'Int'
 
-def extract_variables(expr):
-    return set(re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', expr))
+def as_ssa_nodes(ssa_lines):
+    # Accept either SSA nodes from build_ssa or rendered SSA text lines
+    if any(isinstance(line, str) for line in ssa_lines):
+        return parse_ssa(ssa_lines)
+    return ssa_lines
 
-def convert_expr_to_smt(expr, declarations):
-    expr = expr.strip().replace('φ', 'phi')  # Replace φ with phi
-    if not expr:
-        raise ValueError("Empty expression provided")
+# Sort of a whole array in the array theory encoding
+ARRAY_SORT = '(Array Int Int)'
 
-    # Validate parentheses
-    if not validate_parentheses(expr):
-        raise ValueError(f"Invalid expression: unbalanced parentheses in '{expr}'")
-
-    # Remove outer parentheses if present
-    if expr.startswith('(') and expr.endswith(')'):
-        inner_expr = expr[1:-1].strip()
-        if validate_parentheses(inner_expr):
-            expr = inner_expr
-
-    # Handle ternary expressions (cond ? true_expr : false_expr)
-    parts = []
-    balance = 0
-    start = 0
-    for i, char in enumerate(expr):
-        if char == '(':
-            balance += 1
-        elif char == ')':
-            balance -= 1
-        elif char == '?' and balance == 0:
-            parts.append(expr[start:i].strip())
-            start = i + 1
-        elif char == ':' and balance == 0 and len(parts) == 1:
-            parts.append(expr[start:i].strip())
-            start = i + 1
-    parts.append(expr[start:].strip())
-
-    if len(parts) == 3:
-        cond = convert_expr_to_smt(parts[0], declarations)
-        true_expr = convert_expr_to_smt(parts[1], declarations)
-        false_expr = convert_expr_to_smt(parts[2], declarations)
-        return f"(ite {cond} {true_expr} {false_expr})"
-
-    # Handle array accesses (e.g., arr[i] -> (select arr i))
-    def replace_array_access(match):
-        array_name = match.group(1)
-        index = match.group(2)
-        return f"(select {array_name} {index})"
-
-    expr = re.sub(r'(\w+)\[(\w+)\]', replace_array_access, expr)
-
-    # Handle boolean literals
-    if expr.lower() in ['true', 'false']:
-        return expr.lower()
-
-    # Handle arithmetic and comparison expressions using infix_to_smt
-    try:
-        smt_expr = infix_to_smt(expr)
-        return smt_expr
-    except Exception as e:
-        # Fallback for simple variables or numbers
-        if re.match(r'^\w+$|^\d+$', expr):
-            return expr
-        raise ValueError(f"Failed to convert expression to SMT: {expr} (Error: {str(e)})")
+# The property is defined as this constant and asserted on its own, so check_with_z3 can tell it from the program
+PROPERTY_NAME = 'assert!property'
+
+def property_lines(properties):
+    if not properties:
+        return []
+    prop = properties[0] if len(properties) == 1 else f"(and {' '.join(properties)})"
+    return [f"(declare-const {PROPERTY_NAME} Bool)", f"(assert (= {PROPERTY_NAME} {prop}))", f"(assert {PROPERTY_NAME})"]
+
+def convert_ssa_to_smtlib(ssa_lines, array_theory=False):
+    """Render SSA as an SMT-LIB script; return (script, declarations, arrays).
 
-def convert_ssa_to_smtlib(ssa_lines):
+    Arrays are an uninterpreted IntArray sort with a select function by
+    default. With array_theory (SSA built with array_theory too) they are
+    declared as (Array Int Int) and read and written with select and store.
+    """
     declarations = {}
     assertions = []
     used_vars = set()
     arrays = set()
-
-    for line in ssa_lines:
-        if not line.strip() or '=' not in line:
+    properties = []
+    memo = {}  # Shared subterms are rendered once for the whole program
+
+    for node in as_ssa_nodes(ssa_lines):
+        if isinstance(node, SSADef):
+            var = smt_name(node.name)
+            declarations[var] = expr_sort(node.value, declarations)
+            used_vars.add(var)
+            value = node.value
+        elif isinstance(node, (Assert, Assume)):
+            value = node.expr
+        else:
             continue
-        var, expr = parse_ssa_line(line)
-        var = var.replace('φ', 'phi')  # Replace φ in variable name
-        var_type = infer_type(expr)
-        declarations[var] = var_type
 
-        tokens = extract_variables(expr)
+        tokens, accessed = expr_symbols(value)
+        arrays.update(accessed)
+        if array_theory:
+            # Versions of an array also show up as plain variables, e.g. in a φ merge
+            declarations.update(dict.fromkeys(accessed, ARRAY_SORT))
+            used_vars.update(accessed)
         for token in tokens:
-            token = token.replace('φ', 'phi')
-            if token not in declarations and token not in {"true", "false"}:
-                if '[' in token and ']' in token and token.startswith('arr'):
-                    declarations['arr'] = 'IntArray'
-                    arrays.add('arr')
-                else:
-                    declarations[token] = 'Bool' if token.startswith('phi') else 'Int'
+            token = smt_name(token)
+            if token not in declarations:
+                declarations[token] = 'Bool' if token.startswith('phi') else 'Int'
             used_vars.add(token)
 
-        used_vars.add(var)
-        smt_expr = convert_expr_to_smt(expr, declarations)
-        assertions.append(f"(assert (= {var} {smt_expr}))")
-
-    smt_code_lines = ["(set-logic QF_UFLIA)"]
-
-    for arr in sorted(arrays):
-        smt_code_lines.append(f"(declare-sort IntArray)")
-        smt_code_lines.append(f"(declare-fun select (IntArray Int) Int)")
-        smt_code_lines.append(f"(declare-fun store (IntArray Int Int) IntArray)")
+        if isinstance(node, SSADef):
+            assertions.append(f"(assert (= {var} {expr_to_smt(value, memo)}))")
+        elif isinstance(node, Assume):
+            assertions.append(f"(assert {expr_to_smt(value, memo)})")
+        else:
+            properties.append(expr_to_smt(value, memo))
+
+    if array_theory:
+        # Array versions are declared with the other constants, by their sort
+        smt_code_lines = ["(set-logic QF_AUFLIA)"]
+        uninterpreted = ()
+    else:
+        for arr in arrays:
+            declarations[arr] = 'IntArray'
+        smt_code_lines = ["(set-logic QF_UFLIA)"]
+        uninterpreted = arrays
+
+    if uninterpreted:
+        smt_code_lines.append("(declare-sort IntArray)")
+        smt_code_lines.append("(declare-fun select (IntArray Int) Int)")
+        smt_code_lines.append("(declare-fun store (IntArray Int Int) IntArray)")
+    for arr in sorted(uninterpreted):
         smt_code_lines.append(f"(declare-const {arr} IntArray)")
 
     for var in sorted(used_vars):
-        if var not in arrays:
+        if var not in uninterpreted:
             vtype = declarations[var]
             smt_code_lines.append(f"(declare-const {var} {vtype})")
 
     smt_code_lines.extend(assertions)
 
-    final_assertion_line = [line for line in ssa_lines if line.startswith("assert(")]
-    if final_assertion_line:
-        assertion_line = final_assertion_line[0].strip()
-        if not (assertion_line.startswith("assert(") and assertion_line.endswith(")")):
-            raise ValueError(f"Invalid assertion format: {assertion_line}")
-        assertion_expr_raw = assertion_line[len("assert("):-1].strip().replace('φ', 'phi')
-        if not assertion_expr_raw:
-            raise ValueError("Empty assertion expression")
-
-        # Validate the assertion expression
-        if not validate_parentheses(assertion_expr_raw):
-            raise ValueError(f"Invalid assertion expression: unbalanced parentheses in '{assertion_expr_raw}'")
-
-        def replace_array_access_assert(match):
-            array_name = match.group(1)
-            index = match.group(2)
-            return f"(select {array_name} {index})"
-
-        assertion_expr = re.sub(r'(\w+)\[(\w+)\]', replace_array_access_assert, assertion_expr_raw)
-        assertion_expr = convert_expr_to_smt(assertion_expr, declarations)
-        smt_code_lines.append(f"(assert {assertion_expr})")
+    # All assertions of the program form the property, checked as the final assert
+    smt_code_lines.extend(property_lines(properties))
 
     smt_code_lines.append("(check-sat)")
     smt_code_lines.append("(get-model)")
     return "\n".join(smt_code_lines), declarations, arrays
 
-def check_with_z3(smt_code, declarations, arrays):
-    s = Solver()
-    try:
-        parsed = parse_smt2_string(smt_code)
-        s.add(parsed)
-        result = s.check()
-        output = []
+def write_smtlib(ssa_nodes, sink, array_theory=False):
+    """Stream the SMT-LIB script of ssa_nodes (any iterable) to sink, a file-like object.
+
+    Unlike convert_ssa_to_smtlib, nothing but the declared names and the
+    property terms is kept: each constant is declared just before the first
+    assertion that uses it, and the IntArray sort when the first array shows
+    up. Returns (declarations, arrays) like convert_ssa_to_smtlib, which also
+    describes array_theory.
+    """
+    declarations = {}
+    arrays = set()
+    properties = []
+    write = sink.write
+    write("(set-logic QF_AUFLIA)\n" if array_theory else "(set-logic QF_UFLIA)\n")
+
+    def declare(name, sort):
+        declarations[name] = sort
+        write(f"(declare-const {name} {sort})\n")
+
+    for node in ssa_nodes:
+        if isinstance(node, SSADef):
+            value = node.value
+        elif isinstance(node, (Assert, Assume)):
+            value = node.expr
+        else:
+            continue
+
+        tokens, accessed = expr_symbols(value)
+        for arr in sorted(accessed - arrays):
+            if array_theory:
+                arrays.add(arr)
+                if arr not in declarations:
+                    declare(arr, ARRAY_SORT)
+                continue
+            if not arrays:
+                write("(declare-sort IntArray)\n")
+                write("(declare-fun select (IntArray Int) Int)\n")
+                write("(declare-fun store (IntArray Int Int) IntArray)\n")
+            arrays.add(arr)
+            declare(arr, 'IntArray')
+        for token in sorted(tokens):
+            token = smt_name(token)
+            if token not in declarations:
+                declare(token, 'Bool' if token.startswith('phi') else 'Int')
+
+        if isinstance(node, SSADef):
+            var = smt_name(node.name)
+            if var not in declarations:
+                declare(var, expr_sort(value, declarations))
+            write(f"(assert (= {var} {expr_to_smt(value)}))\n")
+        elif isinstance(node, Assume):
+            write(f"(assert {expr_to_smt(value)})\n")
+        else:
+            properties.append(expr_to_smt(value))
+
+    for line in property_lines(properties):
+        write(line + "\n")
+    write("(check-sat)\n(get-model)\n")
+    return declarations, arrays
+
+class Z3Builder:
+    """Builds z3 expressions directly from SSA nodes.
+
+    Every constant is declared once and cached by name, so the SSA never has to
+    go through SMT-LIB text and parse_smt2_string. Terms are created with the
+    low-level Z3_mk_* calls, which skip the sort coercion z3py's operator
+    overloads do on every node.
+
+    With array_theory, arrays are constants of the (Array Int Int) sort and
+    store expressions are supported; otherwise arrays are uninterpreted.
+    """
+    def __init__(self, ctx=None, array_theory=False):
+        self.ctx = ctx
+        self.array_theory = array_theory
+        self.context = ctx if ctx is not None else main_ctx()
+        self.int_sort = IntSort(self.context)
+        self.bool_sort = BoolSort(self.context)
+        self.constants = {}
+        self.numerals = {}
+        self.array_sort = None
+        self.select = None
+        self.terms = {}  # id(node) -> (node, z3 term), so each shared subterm is built once
+
+    def mark(self):
+        return len(self.constants), len(self.terms)
+
+    def rollback(self, mark):
+        # Forget what was cached since mark (dicts keep insertion order); anything needed again is rebuilt
+        constants, terms = mark
+        while len(self.constants) > constants:
+            self.constants.popitem()
+        while len(self.terms) > terms:
+            self.terms.popitem()
+
+    def constant(self, name, sort=None):
+        name = smt_name(name)
+        const = self.constants.get(name)
+        if const is None:
+            if sort is None:
+                sort = self.bool_sort if name.startswith('phi') else self.int_sort
+            ctx = self.context
+            ast = Z3_mk_const(ctx.ref(), Z3_mk_string_symbol(ctx.ref(), name), sort.ast)
+            if sort == self.int_sort:
+                const = ArithRef(ast, ctx)
+            elif sort == self.bool_sort:
+                const = BoolRef(ast, ctx)
+            elif isinstance(sort, ArraySortRef):
+                const = ArrayRef(ast, ctx)
+            else:
+                const = ExprRef(ast, ctx)
+            self.constants[name] = const
+        return const
+
+    def array(self, name):
+        if self.array_sort is None:
+            if self.array_theory:
+                self.array_sort = ArraySort(self.int_sort, self.int_sort)
+            else:
+                # Same uninterpreted encoding as the IntArray sort in convert_ssa_to_smtlib
+                self.array_sort = DeclareSort('IntArray', self.context)
+                self.select = Function('select', self.array_sort, IntSort(self.context), IntSort(self.context))
+        return self.constant(name, self.array_sort)
+
+    def numeral(self, value):
+        num = self.numerals.get(value)
+        if num is None:
+            num = IntVal(value, self.context)
+            self.numerals[value] = num
+        return num
+
+    def expr(self, node):
+        if isinstance(node, (Index, Unary, Binary, Ternary, Store, RangeAll)):
+            cached = self.terms.get(id(node))
+            if cached is None:
+                cached = self.terms[id(node)] = (node, self.compound(node))
+            return cached[1]
+        ctx = self.context
+        if isinstance(node, Num):
+            return self.numeral(node.value)
+        if isinstance(node, BoolConst):
+            return BoolVal(node.value, ctx)
+        if isinstance(node, Var):
+            return self.constant(node.name)
+        raise TypeError(f"Not an expression: {node!r}")
+
+    def compound(self, node):
+        ctx = self.context
+        if isinstance(node, Index):
+            array = self.array(node.array)
+            if self.array_theory:
+                index = self.expr(node.index)
+                return ArithRef(Z3_mk_select(ctx.ref(), array.as_ast(), index.as_ast()), ctx)
+            return self.select(array, self.expr(node.index))
+        if isinstance(node, Store):
+            if not self.array_theory:
+                raise ValueError(f"Array stores need the array theory encoding: {render_expr(node)}")
+            array, index, value = self.array(node.array), self.expr(node.index), self.expr(node.value)
+            return ArrayRef(Z3_mk_store(ctx.ref(), array.as_ast(), index.as_ast(), value.as_ast()), ctx)
+        if isinstance(node, RangeAll):
+            # for (i in range (n)): body holds as forall i. 0 <= i < n => body
+            var = self.constant(node.var, self.int_sort)
+            in_range = And(var >= 0, var < self.expr(node.bound))
+            patterns = [self.expr(read) for read in quantifier_patterns(node)]
+            return ForAll([var], Implies(in_range, self.expr(node.body)), patterns=patterns)
+        # Child wrappers must stay referenced until the parent term holds them
+        if isinstance(node, Unary):
+            operand_ref = self.expr(node.operand)
+            operand = operand_ref.as_ast()
+            if node.op == '!':
+                return BoolRef(Z3_mk_not(ctx.ref(), operand), ctx)
+            return ArithRef(Z3_mk_unary_minus(ctx.ref(), operand), ctx)
+        if isinstance(node, Binary):
+            left_ref, right_ref = self.expr(node.left), self.expr(node.right)
+            left, right = left_ref.as_ast(), right_ref.as_ast()
+            op = node.op
+            if op in NARY_ARITH:
+                return ArithRef(NARY_ARITH[op](ctx.ref(), 2, (Ast * 2)(left, right)), ctx)
+            if op in BINARY_ARITH:
+                return ArithRef(BINARY_ARITH[op](ctx.ref(), left, right), ctx)
+            if op in NARY_BOOL:
+                return BoolRef(NARY_BOOL[op](ctx.ref(), 2, (Ast * 2)(left, right)), ctx)
+            if op == '!=':
+                equal = BoolRef(Z3_mk_eq(ctx.ref(), left, right), ctx)
+                return BoolRef(Z3_mk_not(ctx.ref(), equal.as_ast()), ctx)
+            return BoolRef(COMPARISONS[op](ctx.ref(), left, right), ctx)
+        cond = self.expr(node.cond)
+        then, orelse = self.expr(node.then), self.expr(node.orelse)
+        return type(then)(Z3_mk_ite(ctx.ref(), cond.as_ast(), then.as_ast(), orelse.as_ast()), ctx)
+
+    def encode(self, ssa):
+        """Return (constraints, property) for a list of SSA nodes.
+
+        The constraints define every SSA variable and include assumptions; the
+        property is the conjunction of all assertions, or None if there are none.
+        """
+        constraints = []
+        properties = []
+        if self.array_theory:
+            # Declare every array version first, since φ merges refer to them as plain variables
+            ssa = list(ssa)
+            arrays = set()
+            for node in ssa:
+                if isinstance(node, (SSADef, Assert, Assume)):
+                    expr_symbols(node.value if isinstance(node, SSADef) else node.expr, arrays=arrays)
+            for name in arrays:
+                self.array(name)
+        for node in ssa:
+            if isinstance(node, SSADef):
+                value = self.expr(node.value)
+                sort = self.int_sort if isinstance(value, ArithRef) else self.bool_sort if isinstance(value, BoolRef) else value.sort()
+                const = self.constant(node.name, sort)
+                constraints.append(BoolRef(Z3_mk_eq(self.context.ref(), const.as_ast(), value.as_ast()), self.context))
+            elif isinstance(node, Assume):
+                constraints.append(self.expr(node.expr))
+            elif isinstance(node, Assert):
+                properties.append(self.expr(node.expr))
+        if not properties:
+            return constraints, None
+        return constraints, properties[0] if len(properties) == 1 else And(properties)
+
+NARY_ARITH = {'+': Z3_mk_add, '-': Z3_mk_sub, '*': Z3_mk_mul}
+BINARY_ARITH = {'/': Z3_mk_div, '%': Z3_mk_mod}
+NARY_BOOL = {'&&': Z3_mk_and, '||': Z3_mk_or}
+COMPARISONS = {'==': Z3_mk_eq, '<': Z3_mk_lt, '>': Z3_mk_gt, '<=': Z3_mk_le, '>=': Z3_mk_ge}
+
+def format_model(model, header, hidden=()):
+    lines = [header]
+    for d in model.decls():
+        if d.name() not in hidden:
+            lines.append(f"  {d.name()} = {model[d]}")
+    return lines
+
+def block_model(model, hidden=()):
+    # Only constants can be pinned down; function interpretations such as select are skipped
+    equalities = [d() == model[d] for d in model.decls() if d.arity() == 0 and d.name() not in hidden]
+    return Not(And(equalities)) if equalities else None
+
+class IncrementalSolver:
+    """A live Z3 solver that keeps the program constraints asserted across queries.
+
+    Each property is tied to a fresh literal, so the property and its negation
+    are checked as assumptions and counterexamples are enumerated inside
+    push/pop. Nothing is re-asserted or re-parsed, and learned clauses carry
+    over from one query to the next.
+
+    timeout (milliseconds) and rlimit (Z3 resource units) apply to every
+    query; config names one of the SOLVER_CONFIGS.
+    """
+    def __init__(self, ctx=None, timeout=None, rlimit=None, config='default'):
+        self.ctx = ctx
+        self.solver = SOLVER_CONFIGS[config](ctx)
+        if timeout is not None:
+            self.solver.set(timeout=int(timeout))
+        if rlimit is not None:
+            self.solver.set(rlimit=int(rlimit))
+        self.literals = {}  # literal name -> literal
+
+    def add(self, constraints):
+        self.solver.add(constraints)
+
+    def property_literal(self, prop):
+        literal = Bool(f"assert!{len(self.literals)}", self.ctx)
+        self.literals[str(literal)] = literal
+        self.solver.add(literal == prop)
+        return literal
+
+    def forget_literals(self, count):
+        # Once the scopes that defined them are popped, literals after the first count can go
+        while len(self.literals) > count:
+            self.literals.popitem()
+
+    def check(self, prop, max_counterexamples=2):
+        """Check the property, and look for counterexamples if it cannot hold."""
+        s = self.solver
+        if prop is None:
+            literal = None
+            result = s.check()
+        else:
+            literal = self.property_literal(prop)
+            result = s.check(literal)
 
         if result == sat:
-            model = s.model()
-            output.append("Satisfiable. Model where assertions hold:")
-            for d in model.decls():
-                output.append(f"  {d.name()} = {model[d]}")
-            return True, output
+            return True, format_model(s.model(), "Satisfiable. Model where assertions hold:", self.literals)
         elif result == unsat:
-            final_assertion = [line for line in smt_code.split('\n') if line.strip().startswith('(assert')][-1]
-            negated_smt_lines = smt_code.split('\n')
-            negated_smt_lines[-3] = f"(assert (not {final_assertion[7:-1]}))"
-            negated_smt = "\n".join(negated_smt_lines)
-            s.reset()
-            s.add(parse_smt2_string(negated_smt))
+            output = []
             counterexamples = []
-            for _ in range(2):
-                if s.check() == sat:
+            if literal is not None:
+                s.push()
+                for i in range(max_counterexamples):
+                    if s.check(Not(literal)) != sat:
+                        break
                     model = s.model()
-                    counterexample = [f"Counterexample {_ + 1}:"]
-                    for d in model.decls():
-                        counterexample.append(f"  {d.name()} = {model[d]}")
-                    counterexamples.append("\n".join(counterexample))
-                    block = Not(And([d() == model[d] for d in model.decls()]))
+                    counterexamples.append("\n".join(format_model(model, f"Counterexample {i + 1}:", self.literals)))
+                    block = block_model(model, self.literals)
+                    if block is None:
+                        break
                     s.add(block)
-                else:
-                    break
+                s.pop()
             if counterexamples:
                 output.append("Unsatisfiable. Counterexamples where assertions fail:")
                 output.extend(counterexamples)
@@ -267,11 +572,134 @@ def check_with_z3(smt_code, declarations, arrays):
                 output.append("Unsatisfiable. No counterexamples found.")
             return False, output
         else:
-            return False, ["Unknown result from solver."]
+            return False, ["Unknown result from solver.", f"Reason: {s.reason_unknown()}"]
+
+# Solver configurations by name; each takes a context and returns a fresh solver
+SOLVER_CONFIGS = {
+    'default': lambda ctx: Solver(ctx=ctx),
+    'qf_lia': lambda ctx: SolverFor("QF_LIA", ctx=ctx),
+    'simplify-solve-eqs-smt': lambda ctx: Then('simplify', 'solve-eqs', 'smt', ctx=ctx).solver(),
+    'propagate-values-smt': lambda ctx: Then('simplify', 'propagate-values', 'solve-eqs', 'elim-uncnstr', 'smt', ctx=ctx).solver(),
+}
+
+def solve(constraints, prop, ctx=None, timeout=None, rlimit=None, config='default'):
+    """Check the constraints with the property, and look for counterexamples if that fails."""
+    checker = IncrementalSolver(ctx, timeout, rlimit, config)
+    checker.add(constraints)
+    return checker.check(prop)
+
+def solve_with_stats(constraints, prop, ctx, timeout, rlimit, config, stats):
+    checker = IncrementalSolver(ctx, timeout, rlimit, config)
+    with stats.stage('solve'):
+        checker.add(constraints)
+        result = checker.check(prop)
+    if stats.enabled:
+        stats.add_solver_statistics(checker.solver.statistics())
+    return result
+
+def check_with_z3(smt_code, declarations, arrays, timeout=None, rlimit=None, stats=NO_STATS):
+    """Check an SMT-LIB script, e.g. one exported by convert_ssa_to_smtlib.
+
+    The property is the definition of PROPERTY_NAME; every other assert
+    defines the program. A script without one only has its program checked.
+    """
+    try:
+        with stats.stage('z3 parse'):
+            parsed = list(parse_smt2_string(smt_code))
+        constraints = []
+        prop = None
+        for formula in parsed:
+            if is_const(formula) and formula.decl().name() == PROPERTY_NAME:
+                continue
+            if is_eq(formula) and is_const(formula.arg(0)) and formula.arg(0).decl().name() == PROPERTY_NAME:
+                prop = formula.arg(1)
+            else:
+                constraints.append(formula)
+        is_sat, output = solve_with_stats(constraints, prop, None, timeout, rlimit, 'default', stats)
+        if prop is None:
+            # Like check_ssa_with_z3, only the program is checked, but say there was nothing to assert
+            output = output + ["No assertions to check."]
+        return is_sat, output
     except Exception as e:
         return False, [f"Error in Z3: {str(e)}"]
 
+def check_ssa_with_z3(ssa, ctx=None, timeout=None, rlimit=None, config='default', stats=NO_STATS, array_theory=False):
+    try:
+        builder = Z3Builder(ctx, array_theory)
+        with stats.stage('z3 encode'):
+            constraints, prop = builder.encode(ssa)
+        stats.count('declared constants', len(builder.constants))
+        return solve_with_stats(constraints, prop, ctx, timeout, rlimit, config, stats)
+    except Exception as e:
+        return False, [f"Error in Z3: {str(e)}"]
+
+def prove_ssa(ssa, ctx=None, timeout=None, rlimit=None, config='default', array_theory=False):
+    """Look for an execution that violates an assertion; return (found_counterexample, output lines).
+
+    Unlike check_ssa_with_z3, which shows a model where the assertions hold,
+    this checks the constraints with the negated property, so the program
+    only passes if its assertions hold for every input.
+    """
+    try:
+        builder = Z3Builder(ctx, array_theory)
+        constraints, prop = builder.encode(ssa)
+        if prop is None:
+            return False, ["No counterexample found. Assertions hold for every execution."]
+        checker = IncrementalSolver(ctx, timeout, rlimit, config)
+        checker.add(constraints)
+        checker.add(Not(prop))
+        solver = checker.solver
+        result = solver.check()
+        if result == sat:
+            return True, format_model(solver.model(), "Counterexample:")
+        if result == unsat:
+            return False, ["No counterexample found. Assertions hold for every execution."]
+        return False, ["Unknown result from solver.", f"Reason: {solver.reason_unknown()}"]
+    except Exception as e:
+        return False, [f"Error in Z3: {str(e)}"]
+
+def portfolio_worker(check, config, ssa, timeout, rlimit, array_theory, results):
+    results.put((config, check(ssa, timeout=timeout, rlimit=rlimit, config=config, array_theory=array_theory)))
+
+def check_ssa_portfolio(ssa, configs=None, timeout=None, rlimit=None, array_theory=False, check=check_ssa_with_z3):
+    """Race several solver configurations in separate processes and keep the first definitive answer.
+
+    Every process runs check (check_ssa_with_z3 or prove_ssa) with its own
+    configuration. The remaining processes are killed as soon as one of them
+    decides the query. If none does, the first unknown (or error) result is
+    returned.
+    """
+    configs = list(configs or SOLVER_CONFIGS)
+    # spawn, because forking a process that already runs Z3 or GUI threads is unsafe
+    mp = multiprocessing.get_context('spawn')
+    results = mp.Queue()
+    workers = [mp.Process(target=portfolio_worker, args=(check, config, ssa, timeout, rlimit, array_theory, results),
+                          daemon=True)
+               for config in configs]
+    for worker in workers:
+        worker.start()
+    fallback = None
+    pending = len(workers)
+    try:
+        while pending:
+            try:
+                config, (is_sat, output) = results.get(timeout=0.1)
+            except queue.Empty:
+                # A worker that died without answering (e.g. out of memory) must not hang the race
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    break
+                continue
+            pending -= 1
+            if not output[0].startswith(("Unknown result", "Error in Z3")):
+                return is_sat, output + [f"Solved by: {config}"]
+            if fallback is None:
+                fallback = (is_sat, output + [f"Reported by: {config}"])
+        return fallback or (False, ["Unknown result from solver.", "Reason: no portfolio worker answered"])
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.kill()
+            worker.join()
+
 def convert_to_z3_and_check(ssa_lines):
-    smt_output, declarations, arrays = convert_ssa_to_smtlib(ssa_lines)
-    is_sat, z3_result = check_with_z3(smt_output, declarations, arrays)
-    return is_sat, z3_result
\ No newline at end of file
+    return check_ssa_with_z3(as_ssa_nodes(ssa_lines))